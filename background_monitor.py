@@ -1,50 +1,239 @@
+import logging
 import os
+import sys
+import threading
 import time
 import django
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # Set up Django environment
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server_checker.settings')
 django.setup()
 
-from monitoring.models import Website, InternalApp, MonitoringSettings
 from monitoring.services import MonitoringService
+from monitoring.config import get_config
+from monitoring.http2 import batch_by_origin
+from monitoring.retention import RetentionService
+from monitoring.scheduler import probe_scheduler
+from monitoring.spool import get_spool
+from monitoring.daemon import MonitorLoop, reap, drain
+from monitoring import anomaly, statuspage
+from django.conf import settings
 
-def check_target(target, is_website=True):
-    """Worker function to check a single target in a thread."""
+# Seconds between scheduler ticks; confirmation probes can't run more often than this
+SCHEDULER_TICK = 5
+
+def check_batch(batch):
+    """Worker function to probe the URLs of one origin in a thread and record them for all their targets."""
     service = MonitoringService()
     try:
-        if is_website:
-            service.check_website(target)
-        else:
-            service.check_internal_app(target)
+        service.check_batch(batch)
     except Exception as e:
-        print(f"Error checking {target.name}: {e}")
+        print(f"Error checking {batch[0]}: {e}")
+
+def check_fixed_batch(batch, in_flight, lock):
+    """Worker: check one batch, then let the next cycles probe its groups again."""
+    try:
+        check_batch(batch)
+    finally:
+        with lock:
+            in_flight.difference_update(group.key for group in batch)
 
-def run_professional_monitoring():
+def run_professional_monitoring(deadline=None, loop=None, in_flight=None, lock=None):
+    """
+    One full cycle; batches not started by the deadline (a monotonic time) are cancelled.
+    in_flight holds the group keys still being probed (shared across cycles with lock).
+    Returns (cancelled, still running) batch counts.
+    """
     print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Starting professional monitoring cycle...", flush=True)
+    in_flight = set() if in_flight is None else in_flight
+    lock = lock or threading.Lock()
+    
+    # Settings and active targets come from the shared snapshot, reloaded only after edits
+    config = get_config()
     
-    # Get active targets
-    websites = list(Website.objects.filter(status='active'))
-    internal_apps = list(InternalApp.objects.filter(is_active=True, website__status='active'))
+    # Resolve every host once up front; probes then hit the shared DNS cache
+    MonitoringService().prefetch_dns(config.targets)
+    
+    # Targets sharing a URL, method, expected status and timeout class are probed once; none in maintenance
+    groups = config.active_groups()
+    # Groups an earlier cycle's stragglers are still probing are left to them, not probed twice
+    with lock:
+        busy = sum(1 for group in groups if group.key in in_flight)
+        groups = [group for group in groups if group.key not in in_flight]
+        in_flight.update(group.key for group in groups)
+    if busy:
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {busy} probes still running from an earlier cycle, skipped.", flush=True)
     
     # Use ThreadPool to check everything in parallel
     # max_workers=10 ensures we don't overwhelm the local system or SQLite
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        for site in websites:
-            executor.submit(check_target, site, True)
-        for app in internal_apps:
-            executor.submit(check_target, app, False)
-
+    executor = ThreadPoolExecutor(max_workers=10)
+    # Groups on one HTTPS origin share a batch (and an HTTP/2 connection when enabled)
+    batches = {executor.submit(check_fixed_batch, batch, in_flight, lock): batch for batch in batch_by_origin(groups)}
+    not_done = set(batches)
+    # Wake up every second to honour the deadline and shutdown signals
+    while not_done and not (loop and loop.stopping):
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        _, not_done = wait(not_done, timeout=1)
+    if loop is not None and loop.stopping:
+        loop.report_stop()
+        not_done = drain(executor, not_done, settings.MONITORING_DRAIN_TIMEOUT)
+    cancelled = 0
+    for future in not_done:
+        if future.cancel():
+            # Never started, so its worker won't release the groups
+            with lock:
+                in_flight.difference_update(group.key for group in batches[future])
+            cancelled += 1
+    # Stragglers finish in the background and keep their groups in flight, so the next cycle skips them
+    executor.shutdown(wait=False)
+    
+    if not_done:
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Cycle deadline passed: {cancelled} batches cancelled, {len(not_done) - cancelled} still running.", flush=True)
     print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Cycle completed.", flush=True)
+    return cancelled, len(not_done) - cancelled
+
+def run_fixed_cycles(loop):
+    """
+    Full cycles every MONITORING_INTERVAL on a fixed grid, each with the interval as its deadline.
+    Returns the number of probes still running once stopped.
+    """
+    in_flight = set()
+    lock = threading.Lock()
+    
+    def tick(deadline):
+        cancelled, stragglers = run_professional_monitoring(deadline, loop, in_flight, lock)
+        loop.stats.cancelled += cancelled
+        loop.stats.stragglers = stragglers
+        loop.stats.in_flight = len(in_flight)
+        run_anomaly_detection(anomaly.run_detection)
+        run_status_page_if_due()
+        run_spool_replay_if_due()
+        run_retention_if_due()
+    loop.run(tick)
+    
+    # The last cycle was drained; stragglers of earlier ones may still be stuck
+    with lock:
+        still_running = len(in_flight)
+    if still_running:
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {still_running} probes still running after the drain.", flush=True)
+    return still_running
+
+def check_scheduled_batch(batch, in_flight, lock):
+    """Worker: probe one batch of due groups, then schedule each group's next probe from its outcome."""
+    service = MonitoringService()
+    results = {}
+    try:
+        results = service.check_batch(batch)
+    except Exception as e:
+        print(f"Error checking {batch[0]}: {e}")
+    finally:
+        for group in batch:
+            checks = results.get(group.key)
+            is_online = any(check.is_online for check in checks) if checks else None
+            probe_scheduler.record(group, is_online, service.settings)
+        with lock:
+            in_flight.difference_update(group.key for group in batch)
+
+def run_scheduled_monitoring(loop):
+    """
+    Probe each group on its own cadence: fast confirmations after failures, slower when stable.
+    Returns the number of batches still running once stopped.
+    """
+    in_flight = set()
+    lock = threading.Lock()
+    futures = {}
+    executor = ThreadPoolExecutor(max_workers=10)
+    
+    def release(batch):
+        with lock:
+            in_flight.difference_update(group.key for group in batch)
+    
+    def tick(deadline):
+        # Batches still queued a full interval after submission are cancelled; their groups stay due
+        cancelled, stragglers = reap(futures)
+        loop.stats.cancelled += cancelled
+        loop.stats.stragglers = stragglers
+        
+        # Targets in a maintenance window drop out here and are due again as soon as it ends
+        groups = get_config().active_groups()
+        with lock:
+            due = [group for group in probe_scheduler.due(groups) if group.key not in in_flight]
+            in_flight.update(group.key for group in due)
+        if due:
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Probing {len(due)} of {len(groups)} targets...", flush=True)
+            MonitoringService().prefetch_dns(target for group in due for target in group.targets)
+            batch_deadline = time.monotonic() + settings.MONITORING_INTERVAL
+            for batch in batch_by_origin(due):
+                future = executor.submit(check_scheduled_batch, batch, in_flight, lock)
+                futures[future] = (batch_deadline, lambda batch=batch: release(batch))
+        loop.stats.in_flight = len(in_flight)
+        run_anomaly_detection(anomaly.run_detection_if_due)
+        run_status_page_if_due()
+        run_spool_replay_if_due()
+        run_retention_if_due()
+    
+    try:
+        loop.run(tick)
+    finally:
+        still_running = drain(executor, futures, settings.MONITORING_DRAIN_TIMEOUT)
+        if still_running:
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {len(still_running)} batches still running after {settings.MONITORING_DRAIN_TIMEOUT}s drain.", flush=True)
+    return len(still_running)
+
+def run_anomaly_detection(detector):
+    """Score every target's recent latency and flag (optionally alert on) degraded ones."""
+    config = get_config()
+    run = detector(config.settings, config.targets)
+    if run is not None and (run.degraded or run.recovered):
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Latency anomalies: {run}", flush=True)
+
+def run_status_page_if_due():
+    """Re-render the static public status page when checks came in since the last run."""
+    written = statuspage.publish_if_dirty()
+    if written:
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Status page updated: {', '.join(written)}", flush=True)
+
+def run_spool_replay_if_due():
+    """Load check results spooled during a database outage once the database answers again."""
+    try:
+        replayed = get_spool().replay_if_due()
+        if replayed:
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Replayed {replayed} spooled checks.", flush=True)
+    except Exception as e:
+        print(f"Error replaying spooled checks: {e}")
+
+def run_retention_if_due():
+    """Trim check history outside the probe path once the retention interval has elapsed."""
+    try:
+        if RetentionService.is_due():
+            run = RetentionService().run()
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Retention: {run.rows_deleted} rows deleted in {run.duration}s.", flush=True)
+    except Exception as e:
+        print(f"Error running retention: {e}")
 
 
 
 #replace this with celery
 if __name__ == "__main__":
     print("--- Professional Health Checker Started ---", flush=True)
-    print("Checking 30+ sites in parallel every 5 minutes.", flush=True)
     
-    while True:
-        run_professional_monitoring()
-        time.sleep(300)
+    if '--fixed-cycle' in sys.argv:
+        print(f"Checking every target every {settings.MONITORING_INTERVAL}s.", flush=True)
+        loop = MonitorLoop(settings.MONITORING_INTERVAL)
+        loop.install_signal_handlers()
+        still_running = run_fixed_cycles(loop)
+    else:
+        print("Checking each target on its own interval, with fast confirmation after failures.", flush=True)
+        loop = MonitorLoop(SCHEDULER_TICK)
+        loop.install_signal_handlers()
+        still_running = run_scheduled_monitoring(loop)
+    
+    # Flush anything spooled during a database outage before exiting
+    get_spool().close()
+    print("--- Professional Health Checker Stopped ---", flush=True)
+    if still_running:
+        # Executor threads aren't daemons, so a normal exit would wait on probes stuck past the drain timeout
+        logging.shutdown()
+        os._exit(0)
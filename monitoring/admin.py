@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
-from .models import Website, InternalApp, MonitoringCheck, AlertLog, MonitoringSettings
+from .models import Website, InternalApp, MonitoringCheck, AlertLog, MonitoringSettings, RetentionRun, ResponseAssertion, DailyUptime, MaintenanceWindow
 
 
 @admin.register(Website)
@@ -10,20 +10,27 @@ class WebsiteAdmin(admin.ModelAdmin):
     list_display = ['name', 'url', 'status', 'is_online_display', 'uptime_percentage', 'last_check_time', 'alert_email']
     list_filter = ['status', 'created_at', 'send_recovery_email']
     search_fields = ['name', 'url', 'description']
-    readonly_fields = ['created_at', 'updated_at', 'is_online_display', 'uptime_percentage', 'last_check_time']
+    readonly_fields = ['created_at', 'updated_at', 'is_online_display', 'is_degraded', 'uptime_percentage', 'last_check_time']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_check_summary()
     
     fieldsets = (
         ('Basic Information', {
             'fields': ('name', 'url', 'description', 'status')
         }),
         ('Monitoring Configuration', {
-            'fields': ('check_interval', 'timeout', 'expected_status_code', 'send_recovery_email')
+            'fields': ('probe_type', 'allow_http2', 'check_interval', 'timeout', 'expected_status_code', 'send_recovery_email')
+        }),
+        ('Retention', {
+            'fields': ('retention_max_checks', 'retention_days'),
+            'classes': ('collapse',)
         }),
         ('Email Configuration', {
             'fields': ('alert_email', 'recovery_email')
         }),
         ('Status Information', {
-            'fields': ('is_online_display', 'uptime_percentage', 'last_check_time'),
+            'fields': ('is_online_display', 'is_degraded', 'uptime_percentage', 'last_check_time'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
@@ -42,32 +49,72 @@ class WebsiteAdmin(admin.ModelAdmin):
     def uptime_percentage(self, obj):
         uptime = obj.uptime_percentage
         color = 'green' if uptime >= 99 else 'orange' if uptime >= 95 else 'red'
-        return format_html('<span style="color: {};">{:.2f}%</span>', color, uptime)
+        return format_html('<span style="color: {};">{}%</span>', color, f'{uptime:.2f}')
     uptime_percentage.short_description = 'Uptime (24h)'
+    uptime_percentage.admin_order_field = 'recent_uptime'
+    
+    def last_check_time(self, obj):
+        return obj.last_check_time
+    last_check_time.short_description = 'Last check time'
+    last_check_time.admin_order_field = 'latest_check_time'
+
+
+class WebsiteAssertionInline(admin.TabularInline):
+    model = ResponseAssertion
+    fk_name = 'website'
+    extra = 0
+    fields = ['assertion_type', 'target', 'value', 'is_active']
+    verbose_name = 'Response assertion'
+
+
+class InternalAppAssertionInline(WebsiteAssertionInline):
+    fk_name = 'internal_app'
+
+
+class WebsiteMaintenanceInline(admin.TabularInline):
+    model = MaintenanceWindow
+    fk_name = 'website'
+    extra = 0
+    fields = ['name', 'starts_at', 'ends_at', 'recurrence', 'repeat_until', 'is_active']
+    verbose_name = 'Maintenance window'
+
+
+class InternalAppMaintenanceInline(WebsiteMaintenanceInline):
+    fk_name = 'internal_app'
 
 
 class InternalAppInline(admin.TabularInline):
     model = InternalApp
     extra = 0
-    fields = ['name', 'app_type', 'url', 'is_active', 'expected_status_code', 'timeout']
+    fields = ['name', 'app_type', 'url', 'is_active', 'probe_type', 'expected_status_code', 'timeout']
 
 
 @admin.register(InternalApp)
 class InternalAppAdmin(admin.ModelAdmin):
     list_display = ['name', 'website', 'app_type', 'url', 'is_active', 'is_online_display']
-    list_filter = ['app_type', 'is_active', 'website', 'created_at']
+    list_filter = ['app_type', 'probe_type', 'is_active', 'website', 'created_at']
     search_fields = ['name', 'url', 'description', 'website__name']
-    readonly_fields = ['created_at', 'updated_at', 'is_online_display']
+    readonly_fields = ['created_at', 'updated_at', 'is_online_display', 'is_degraded']
+    list_select_related = ['website']
+    
+    inlines = [InternalAppAssertionInline, InternalAppMaintenanceInline]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_check_summary()
     
     fieldsets = (
         ('Basic Information', {
             'fields': ('website', 'name', 'app_type', 'url', 'description', 'is_active')
         }),
         ('Monitoring Configuration', {
-            'fields': ('expected_status_code', 'timeout')
+            'fields': ('probe_type', 'allow_http2', 'expected_status_code', 'timeout')
+        }),
+        ('Retention', {
+            'fields': ('retention_max_checks', 'retention_days'),
+            'classes': ('collapse',)
         }),
         ('Status Information', {
-            'fields': ('is_online_display',),
+            'fields': ('is_online_display', 'is_degraded'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
@@ -84,12 +131,20 @@ class InternalAppAdmin(admin.ModelAdmin):
     is_online_display.short_description = 'Status'
 
 
+class InternalAppListFilter(admin.RelatedFieldListFilter):
+    """Related filter whose choices load each app's website in the same query."""
+    
+    def field_choices(self, field, request, model_admin):
+        return [(app.pk, str(app)) for app in InternalApp.objects.select_related('website')]
+
+
 @admin.register(MonitoringCheck)
 class MonitoringCheckAdmin(admin.ModelAdmin):
     list_display = ['check_time', 'website', 'internal_app', 'is_online_display', 'status_code', 'response_time']
-    list_filter = ['is_online', 'check_time', 'website', 'internal_app']
+    list_filter = ['is_online', 'check_time', 'website', ('internal_app', InternalAppListFilter)]
+    list_select_related = ['website', 'internal_app__website']
     search_fields = ['website__name', 'internal_app__name', 'error_message']
-    readonly_fields = ['check_time', 'is_online', 'response_time', 'status_code', 'error_message', 'response_content']
+    readonly_fields = ['check_time', 'is_online', 'response_time', 'dns_time', 'status_code', 'error_message', 'response_content', 'attempts', 'cert_expires_at']
     date_hierarchy = 'check_time'
     
     fieldsets = (
@@ -97,7 +152,11 @@ class MonitoringCheckAdmin(admin.ModelAdmin):
             'fields': ('website', 'internal_app', 'check_time', 'is_online')
         }),
         ('Response Details', {
-            'fields': ('status_code', 'response_time', 'error_message')
+            'fields': ('status_code', 'response_time', 'dns_time', 'cert_expires_at', 'error_message')
+        }),
+        ('Attempts', {
+            'fields': ('attempts',),
+            'classes': ('collapse',)
         }),
         ('Response Content', {
             'fields': ('response_content',),
@@ -120,6 +179,7 @@ class MonitoringCheckAdmin(admin.ModelAdmin):
 class AlertLogAdmin(admin.ModelAdmin):
     list_display = ['website', 'alert_type', 'sent_at', 'email_sent_to', 'is_sent_display']
     list_filter = ['alert_type', 'is_sent', 'sent_at', 'website']
+    list_select_related = ['website']
     search_fields = ['website__name', 'email_sent_to', 'subject', 'message']
     readonly_fields = ['sent_at', 'is_sent', 'email_sent_to', 'subject', 'message']
     date_hierarchy = 'sent_at'
@@ -152,11 +212,65 @@ class MonitoringSettingsAdmin(admin.ModelAdmin):
         ('Global Settings', {
             'fields': ('is_monitoring_active', 'global_check_interval', 'max_concurrent_checks', 'alert_cooldown_minutes')
         }),
+        ('Retention', {
+            'fields': ('retention_max_checks', 'retention_days')
+        }),
+        ('Adaptive Timeouts', {
+            'fields': ('adaptive_timeouts', 'adaptive_timeout_factor', 'adaptive_timeout_floor')
+        }),
+        ('Circuit Breaker', {
+            'fields': ('breaker_failure_threshold', 'breaker_base_backoff', 'breaker_max_backoff')
+        }),
+        ('Probe Cadence', {
+            'fields': ('adaptive_cadence', 'confirm_interval', 'max_check_interval', 'flap_threshold', 'flap_window_minutes')
+        }),
+        ('Hedging & Retries', {
+            'fields': ('hedged_probes', 'probe_retries')
+        }),
+        ('Certificates', {
+            'fields': ('cert_expiry_thresholds',)
+        }),
+        ('Latency Anomalies', {
+            'fields': ('latency_anomaly_detection', 'latency_anomaly_alerts', 'latency_anomaly_threshold', 'latency_anomaly_ratio')
+        }),
     )
     
     def has_add_permission(self, request):
         return not MonitoringSettings.objects.exists()  # Only allow one settings instance
 
 
+@admin.register(RetentionRun)
+class RetentionRunAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'rows_deleted', 'targets_processed', 'duration', 'vacuumed', 'analyzed']
+    list_filter = ['vacuumed', 'analyzed', 'started_at']
+    readonly_fields = ['started_at', 'duration', 'targets_processed', 'rows_deleted', 'vacuumed', 'analyzed']
+    date_hierarchy = 'started_at'
+    
+    def has_add_permission(self, request):
+        return False  # Runs are recorded by the retention engine
+
+
+@admin.register(MaintenanceWindow)
+class MaintenanceWindowAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'website', 'internal_app', 'starts_at', 'ends_at', 'recurrence', 'repeat_until', 'is_active']
+    list_filter = ['recurrence', 'is_active', 'website']
+    search_fields = ['name', 'website__name', 'internal_app__name']
+    list_select_related = ['website', 'internal_app']
+    date_hierarchy = 'starts_at'
+
+
+@admin.register(DailyUptime)
+class DailyUptimeAdmin(admin.ModelAdmin):
+    list_display = ['date', 'website', 'internal_app', 'uptime_percentage', 'checks', 'failed_checks', 'maintenance_checks']
+    list_filter = ['date', 'website']
+    readonly_fields = ['website', 'internal_app', 'date', 'checks', 'failed_checks', 'maintenance_checks',
+                       'monitored_seconds', 'downtime_seconds', 'last_check_at']
+    date_hierarchy = 'date'
+    list_select_related = ['website', 'internal_app']
+    
+    def has_add_permission(self, request):
+        return False  # Totals are maintained as checks are recorded
+
+
 # Update Website admin to include inline
-WebsiteAdmin.inlines = [InternalAppInline]
+WebsiteAdmin.inlines = [InternalAppInline, WebsiteAssertionInline, WebsiteMaintenanceInline]
@@ -0,0 +1,273 @@
+"""
+Latency anomaly detection across every target at once.
+
+Each target's recent latencies (newest first, up to RESULTS_PER_TARGET) form one
+row of a matrix. The newest RECENT_SAMPLES are compared with the rest: a target
+is degraded when their median sits more than latency_anomaly_threshold MADs
+above the baseline median and is at least latency_anomaly_ratio times it. All
+of it is NumPy over the whole matrix; the rows come straight from the shared
+recent-result rings, with a vectorized seqlock check; targets the rings can't
+answer for are read from the database. Without NumPy (see requirements.txt)
+detection is skipped.
+"""
+import threading
+import time
+from .models import Website, InternalApp, AlertLog
+from .ringbuffer import (
+    ENTRY, SLOT_HEADER, RESULTS_PER_TARGET, WEBSITE, INTERNAL_APP, get_recent_results,
+)
+from . import statuspage
+import logging
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Newest samples that make up the "current" latency
+RECENT_SAMPLES = 3
+
+# Baseline samples needed before a target can be judged
+MIN_BASELINE = 8
+
+# MAD is floored at this share of the median (and MIN_SCALE seconds) so steady targets don't alarm on jitter
+SCALE_FLOOR_RATIO = 0.05
+MIN_SCALE = 0.005
+
+# Scale factor making the MAD comparable to a standard deviation
+MAD_TO_SIGMA = 1.4826
+
+# Seconds between runs when driven by the scheduler tick instead of full cycles
+DETECTION_INTERVAL = 60
+
+_numpy_warned = False
+
+
+def _key(target):
+    return (INTERNAL_APP if isinstance(target, InternalApp) else WEBSITE), target.pk
+
+
+def _slot_dtype(capacity):
+    entry = np.dtype([('time', '<f8'), ('response_time', '<f4'), ('status_code', '<u2'), ('is_online', '?'), ('pad', 'V1')])
+    slot = np.dtype([
+        ('seq', '<u4'), ('kind', 'u1'), ('complete', 'u1'), ('pad', 'V2'), ('target_id', '<u4'), ('count', '<u8'),
+        ('entries', entry, (capacity,)),
+    ])
+    assert entry.itemsize == ENTRY.size and slot.itemsize == SLOT_HEADER.size + capacity * ENTRY.size
+    return slot
+
+
+def _row_median(values, n):
+    """Median of each row given n, its count of non-NaN values (NaN sorts last); rows need n > 0."""
+    ordered = np.sort(values, axis=1)
+    rows = np.arange(len(values))
+    return (ordered[rows, (n - 1) // 2] + ordered[rows, n // 2]) / 2
+
+
+def _recent_median(recent):
+    if recent.shape[1] == 3:
+        # Median of three without sorting
+        a, b, c = recent.T
+        return np.maximum(np.minimum(a, b), np.minimum(np.maximum(a, b), c))
+    return np.median(recent, axis=1)
+
+
+def detect(latencies, threshold, ratio):
+    """
+    latencies: (targets, samples) array, newest first, NaN where a check failed or is missing.
+    Returns two boolean arrays: which rows are degraded, and which rows had enough samples to judge.
+    """
+    missing = np.isnan(latencies)
+    samples = latencies.shape[1] - RECENT_SAMPLES - missing[:, RECENT_SAMPLES:].sum(axis=1)
+    judged = ~missing[:, :RECENT_SAMPLES].any(axis=1) & (samples >= MIN_BASELINE)
+    degraded = np.zeros(len(latencies), dtype=bool)
+    if not judged.any():
+        return degraded, judged
+
+    rows = latencies[judged]
+    n = samples[judged]
+    baseline = rows[:, RECENT_SAMPLES:]
+    median = _row_median(baseline, n)
+    mad = _row_median(np.abs(baseline - median[:, None]), n) * MAD_TO_SIGMA
+    scale = np.maximum(mad, np.maximum(median * SCALE_FLOOR_RATIO, MIN_SCALE))
+    current = _recent_median(rows[:, :RECENT_SAMPLES])
+    degraded[judged] = ((current - median) / scale > threshold) & (current >= median * ratio)
+    return degraded, judged
+
+
+def latency_matrix_from_rings(ring):
+    """(kinds, target ids, latencies) for every complete, untorn ring slot."""
+    with ring.raw_slots(copy=False) as live:
+        slots = np.frombuffer(live, dtype=_slot_dtype(ring.capacity))
+        # Seqlock, vectorized: read the sequences, then only the used slots' data, then their sequences again
+        seq = slots['seq'].copy()
+        used = (seq % 2 == 0) & (slots['complete'] == 1) & \
+            ((slots['kind'] == WEBSITE) | (slots['kind'] == INTERNAL_APP))
+        kinds = slots['kind'][used]
+        ids = slots['target_id'][used]
+        count = slots['count'][used]
+        entries = slots['entries']
+        response_time = entries['response_time'][used]
+        is_online = entries['is_online'][used]
+        untorn = slots['seq'][used] == seq[used]
+        del slots, entries
+    if not untorn.all():
+        kinds, ids, count = kinds[untorn], ids[untorn], count[untorn]
+        response_time, is_online = response_time[untorn], is_online[untorn]
+
+    # Mask in ring order (position p holds a result once count > p), then reorder newest first:
+    # reversed and doubled, each row's newest-first run is one contiguous window
+    capacity = ring.capacity
+    valid = is_online
+    if (count < capacity).any():
+        valid = valid & (np.arange(capacity, dtype=np.int32)[None, :] < np.minimum(count, capacity)[:, None])
+    reversed_ring = np.where(valid, response_time, np.float32(np.nan))[:, ::-1]
+    doubled = np.concatenate([reversed_ring, reversed_ring], axis=1)
+    start = ((capacity - count % capacity) % capacity).astype(np.intp)
+    latencies = sliding_window_view(doubled, capacity, axis=1)[np.arange(len(count)), start]
+    return kinds, ids, latencies
+
+
+def latency_matrix_from_history(targets):
+    """Fallback without the shared rings: per-target reads of the recent checks."""
+    from .services import recent_checks
+    kinds, ids, rows = [], [], []
+    for target in targets:
+        checks = recent_checks(target)
+        kind, target_id = _key(target)
+        kinds.append(kind)
+        ids.append(target_id)
+        row = [c.response_time if c.is_online and c.response_time is not None else np.nan for c in checks]
+        rows.append(row + [np.nan] * (RESULTS_PER_TARGET - len(row)))
+    latencies = np.array(rows, dtype=np.float32).reshape(len(rows), RESULTS_PER_TARGET)
+    return np.array(kinds, dtype=np.uint8), np.array(ids, dtype=np.uint32), latencies
+
+
+class AnomalyRun:
+    def __init__(self):
+        self.targets = 0
+        self.degraded = []
+        self.recovered = []
+        self.duration = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.targets} targets scored in {self.duration * 1000:.1f}ms; "
+            f"{len(self.degraded)} newly degraded, {len(self.recovered)} recovered"
+        )
+
+
+class LatencyAnomalyDetector:
+    def __init__(self, monitoring_settings):
+        self.settings = monitoring_settings
+
+    def run(self, targets):
+        """Score every target, store is_degraded changes and alert on new degradations. None without NumPy."""
+        global _numpy_warned
+        if np is None:
+            if not _numpy_warned:
+                logger.warning("Latency anomaly detection needs NumPy (pip install numpy); skipping")
+                _numpy_warned = True
+            return None
+        result = AnomalyRun()
+        if not self.settings.latency_anomaly_detection:
+            return result
+
+        monitored = {_key(t): t for t in targets}
+        result.targets = len(monitored)
+        started = time.perf_counter()
+        ring = get_recent_results()
+        if ring is not None:
+            kinds, ids, latencies = latency_matrix_from_rings(ring)
+            # Targets without a usable slot (file full, seeding failed, torn read) are read from the database
+            codes = (kinds.astype(np.int64) << 32) | ids
+            wanted = np.array([(kind << 32) | target_id for kind, target_id in monitored], dtype=np.int64)
+            missing = [monitored[key] for key, found in zip(monitored, np.isin(wanted, codes).tolist()) if not found]
+            if missing:
+                extra = latency_matrix_from_history(missing)
+                kinds, ids, latencies = (np.concatenate(parts) for parts in zip((kinds, ids, latencies), extra))
+        else:
+            kinds, ids, latencies = latency_matrix_from_history(targets)
+        flagged, judged = detect(latencies, self.settings.latency_anomaly_threshold, self.settings.latency_anomaly_ratio)
+        result.duration = time.perf_counter() - started
+
+        series = {(int(kinds[row]), int(ids[row])): latencies[row] for row in np.flatnonzero(flagged)}
+        for kind, model in ((WEBSITE, Website), (INTERNAL_APP, InternalApp)):
+            of_kind = kinds == kind
+            now_degraded = {target_id for key_kind, target_id in series if key_kind == kind and (kind, target_id) in monitored}
+            was_degraded = set(model.objects.filter(is_degraded=True).values_list('id', flat=True))
+            # Only targets judged healthy this run recover; unjudged ones (gaps, failed checks) keep their flag.
+            # Targets no longer monitored are cleared too.
+            healthy = ids[judged & ~flagged & of_kind]
+            recovered = {i for i in was_degraded if (kind, i) not in monitored}
+            if was_degraded:
+                was = np.fromiter(was_degraded, dtype=np.int64)
+                recovered |= set(was[np.isin(was, healthy)].tolist())
+            if now_degraded - was_degraded:
+                model.objects.filter(id__in=now_degraded - was_degraded).update(is_degraded=True)
+            if recovered:
+                model.objects.filter(id__in=recovered).update(is_degraded=False)
+            result.degraded += [monitored[(kind, i)] for i in now_degraded - was_degraded]
+            result.recovered += sorted(recovered)
+
+        if result.degraded or result.recovered:
+            statuspage.mark_dirty()
+        if self.settings.latency_anomaly_alerts:
+            for target in result.degraded:
+                self.send_alert(target, series[_key(target)])
+        return result
+
+    def send_alert(self, target, latencies):
+        website = target.website if isinstance(target, InternalApp) else target
+        if website.status != 'active' or not AlertLog.should_send_alert(website, 'degraded'):
+            return
+        recent = np.nanmedian(latencies[:RECENT_SAMPLES])
+        baseline = np.nanmedian(latencies[RECENT_SAMPLES:])
+        subject = f"🐢 {target.name} is responding slowly"
+        message = f"""
+Dear Administrator,
+
+Monitoring Alert: {target.name} is up but its response time is well above normal.
+
+Details:
+- URL: {target.url}
+- Recent response time: {recent:.3f}s
+- Usual response time: {baseline:.3f}s ({recent / baseline:.1f}x slower)
+
+This is an early warning; no down alert has been sent.
+
+Best regards,
+Web Health Checker System
+        """
+        AlertLog.send_alert(
+            website=website,
+            alert_type='degraded',
+            subject=subject,
+            message=message,
+            email_to=website.alert_email
+        )
+
+
+_last_run = 0.0
+_run_lock = threading.Lock()
+
+
+def run_detection(monitoring_settings, targets):
+    """Run the detector once; errors are logged, never raised."""
+    global _last_run
+    with _run_lock:
+        _last_run = time.monotonic()
+        try:
+            return LatencyAnomalyDetector(monitoring_settings).run(targets)
+        except Exception as e:
+            logger.error(f"Error detecting latency anomalies: {str(e)}")
+            return None
+
+
+def run_detection_if_due(monitoring_settings, targets):
+    if time.monotonic() - _last_run < DETECTION_INTERVAL:
+        return None
+    return run_detection(monitoring_settings, targets)
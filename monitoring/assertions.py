@@ -0,0 +1,323 @@
+"""
+Response assertions: per-target conditions compiled once, cached, and evaluated
+over the streamed response body so reading stops as soon as every one is decided.
+"""
+import json
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Characters of body kept for MonitoringCheck.response_content
+PREVIEW_CHARS = 1000
+
+# Bodies are never read past this many characters
+MAX_BODY_CHARS = 1024 * 1024
+
+# Seconds a compiled set is trusted; edits made in another process show up within this
+ASSERTION_CACHE_TTL = 60
+
+# Regexes are tried on each chunk plus this much of the previous one; the full body is searched at the end
+REGEX_WINDOW = 1024
+
+# Anchors, word boundaries and lookarounds would see the window's edges, so those patterns only run on the full body
+CONTEXT_SENSITIVE = re.compile(r'[\^$]|\\[AZbB]|\(\?<?[=!]')
+
+
+class Matcher:
+    """A compiled assertion. Per-probe state lives in the object returned by start()."""
+
+    needs_body = False
+    needs_full_body = False
+
+    def __init__(self, label):
+        self.label = label
+
+    def start(self):
+        return None
+
+    def feed(self, state, chunk):
+        pass
+
+    def decided(self, state):
+        return True
+
+    def failure(self, state, status_code, headers, body, response_time):
+        return None
+
+
+class _SearchState:
+    def __init__(self):
+        self.found = False
+        self.tail = ''
+
+
+class BodyContains(Matcher):
+    needs_body = True
+
+    def __init__(self, label, needle, negate=False):
+        super().__init__(label)
+        self.needle = needle
+        self.negate = negate
+
+    def start(self):
+        return _SearchState()
+
+    def feed(self, state, chunk):
+        if state.found:
+            return
+        text = state.tail + chunk
+        state.found = self.needle in text
+        # Keep enough of the end to catch a match split across chunks
+        state.tail = text[-(len(self.needle) - 1):] if len(self.needle) > 1 else ''
+
+    def decided(self, state):
+        return state.found
+
+    def failure(self, state, status_code, headers, body, response_time):
+        if self.negate and state.found:
+            return f"Body contains {self.needle!r}"
+        if not self.negate and not state.found:
+            return f"Body does not contain {self.needle!r}"
+        return None
+
+
+class BodyRegex(Matcher):
+    needs_body = True
+    needs_full_body = True
+
+    def __init__(self, label, pattern):
+        super().__init__(label)
+        try:
+            self.regex = re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid regex: {e}")
+        # A window match implies a full-body match only without zero-width context checks
+        self.streamable = CONTEXT_SENSITIVE.search(pattern) is None
+
+    def start(self):
+        return _SearchState()
+
+    def feed(self, state, chunk):
+        if state.found or not self.streamable:
+            return
+        text = state.tail + chunk
+        state.found = self.regex.search(text) is not None
+        state.tail = text[-REGEX_WINDOW:]
+
+    def decided(self, state):
+        return state.found
+
+    def failure(self, state, status_code, headers, body, response_time):
+        if state.found or self.regex.search(body):
+            return None
+        return f"Body does not match /{self.regex.pattern}/"
+
+
+class JSONPathEquals(Matcher):
+    needs_body = True
+    needs_full_body = True
+
+    def __init__(self, label, path, expected):
+        super().__init__(label)
+        self.path = [int(p) if p.isdigit() else p for p in path.lstrip('$').strip('.').split('.') if p]
+        try:
+            self.expected = json.loads(expected)
+        except ValueError:
+            # Unquoted strings compare as strings
+            self.expected = expected
+
+    def decided(self, state):
+        return False
+
+    def failure(self, state, status_code, headers, body, response_time):
+        try:
+            value = json.loads(body)
+            for part in self.path:
+                value = value[part]
+        except ValueError:
+            return "Body is not valid JSON"
+        except (KeyError, IndexError, TypeError):
+            return f"JSON path {self.label} not found"
+        if value != self.expected:
+            return f"JSON path {self.label}: expected {self.expected!r}, got {value!r}"
+        return None
+
+
+class HeaderMatches(Matcher):
+    def __init__(self, label, header, pattern):
+        super().__init__(label)
+        self.header = header
+        try:
+            self.regex = re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid regex: {e}")
+
+    def failure(self, state, status_code, headers, body, response_time):
+        value = headers.get(self.header)
+        if value is None:
+            return f"Header {self.header} missing"
+        if not self.regex.search(value):
+            return f"Header {self.header}: {value!r} does not match /{self.regex.pattern}/"
+        return None
+
+
+class MaxResponseTime(Matcher):
+    def __init__(self, label, seconds):
+        super().__init__(label)
+        try:
+            self.seconds = float(seconds)
+        except ValueError:
+            raise ValueError("Max response time must be a number of seconds")
+
+    def failure(self, state, status_code, headers, body, response_time):
+        if response_time is not None and response_time > self.seconds:
+            return f"Response took {response_time}s (max {self.seconds}s)"
+        return None
+
+
+class StatusIn(Matcher):
+    def __init__(self, label, spec):
+        super().__init__(label)
+        self.ranges = []
+        try:
+            for part in spec.replace(' ', '').split(','):
+                low, _, high = part.partition('-')
+                self.ranges.append((int(low), int(high or low)))
+        except ValueError:
+            raise ValueError("Status list must look like 200-299,301,302")
+
+    def allows(self, status_code):
+        return any(low <= status_code <= high for low, high in self.ranges)
+
+    def failure(self, state, status_code, headers, body, response_time):
+        if not self.allows(status_code):
+            return f"Status {status_code} not in {self.label}"
+        return None
+
+
+def compile_assertion(assertion):
+    """Build the matcher for a ResponseAssertion row; raises ValueError if it can't be compiled."""
+    kind, target, value = assertion.assertion_type, assertion.target, assertion.value
+    if kind == 'body_contains':
+        return BodyContains(value, value)
+    if kind == 'body_not_contains':
+        return BodyContains(value, value, negate=True)
+    if kind == 'body_regex':
+        return BodyRegex(value, value)
+    if kind == 'json_path_equals':
+        return JSONPathEquals(target, target, value)
+    if kind == 'header_matches':
+        return HeaderMatches(target, target, value)
+    if kind == 'max_response_time':
+        return MaxResponseTime(value, value)
+    if kind == 'status_in':
+        return StatusIn(value, value)
+    raise ValueError(f"Unknown assertion type {kind}")
+
+
+class Evaluation:
+    """One probe's pass over a compiled assertion set."""
+
+    def __init__(self, assertions, status_code, headers, expected_status_code):
+        self.assertions = assertions
+        self.status_code = status_code
+        self.headers = headers
+        self.expected_status_code = expected_status_code
+        self.states = [m.start() for m in assertions.matchers]
+        self.body = ''
+
+    def read(self, chunks):
+        """Consume text chunks until every body assertion is decided; returns the preview text."""
+        body_matchers = [(m, s) for m, s in zip(self.assertions.matchers, self.states) if m.needs_body]
+        keep_body = any(m.needs_full_body for m, _ in body_matchers)
+        parts, preview, read = [], '', 0
+
+        for chunk in chunks:
+            read += len(chunk)
+            if len(preview) < PREVIEW_CHARS:
+                preview += chunk[:PREVIEW_CHARS - len(preview)]
+            if keep_body:
+                parts.append(chunk)
+            for matcher, state in body_matchers:
+                matcher.feed(state, chunk)
+            if len(preview) >= PREVIEW_CHARS and all(m.decided(s) for m, s in body_matchers):
+                break
+            if read >= MAX_BODY_CHARS:
+                break
+
+        self.body = ''.join(parts) if keep_body else preview
+        return preview
+
+    def failures(self, response_time):
+        failures = []
+        if self.assertions.status is None and self.status_code != self.expected_status_code:
+            failures.append(f"Expected status {self.expected_status_code}, got {self.status_code}")
+        for matcher, state in zip(self.assertions.matchers, self.states):
+            failure = matcher.failure(state, self.status_code, self.headers, self.body, response_time)
+            if failure:
+                failures.append(failure)
+        return failures
+
+
+class CompiledAssertions:
+    """A target's active assertions, compiled. Falsy when the target has none."""
+
+    def __init__(self, matchers, key=()):
+        self.matchers = matchers
+        self.key = key
+        # An explicit status set replaces the expected_status_code comparison
+        self.status = next((m for m in matchers if isinstance(m, StatusIn)), None)
+
+    def __len__(self):
+        return len(self.matchers)
+
+    def start(self, status_code, headers, expected_status_code):
+        return Evaluation(self, status_code, headers, expected_status_code)
+
+
+NO_ASSERTIONS = CompiledAssertions([])
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cache_key(target):
+    return (target._meta.model_name, target.pk)
+
+
+def assertions_for(target):
+    """Compiled assertions for a website or internal app, loaded and compiled once per process."""
+    if target.pk is None:
+        return NO_ASSERTIONS
+    key = _cache_key(target)
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+
+    from .models import InternalApp, ResponseAssertion
+    if isinstance(target, InternalApp):
+        rows = ResponseAssertion.objects.filter(internal_app=target, is_active=True)
+    else:
+        rows = ResponseAssertion.objects.filter(website=target, is_active=True)
+
+    matchers, spec = [], []
+    for row in rows:
+        try:
+            matchers.append(compile_assertion(row))
+            spec.append((row.assertion_type, row.target, row.value))
+        except ValueError as e:
+            logger.warning(f"Skipping assertion {row.pk} on {target}: {str(e)}")
+
+    compiled = CompiledAssertions(matchers, tuple(spec)) if matchers else NO_ASSERTIONS
+    with _cache_lock:
+        _cache[key] = (compiled, time.monotonic() + ASSERTION_CACHE_TTL)
+    return compiled
+
+
+def invalidate(target):
+    with _cache_lock:
+        _cache.pop(_cache_key(target), None)
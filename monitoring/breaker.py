@@ -0,0 +1,67 @@
+"""
+Per-target circuit breaker that backs off probing of persistently-down targets.
+"""
+import threading
+import time
+
+# Decisions returned by CircuitBreaker.before_probe()
+PROBE = 'probe'
+PRECHECK = 'precheck'
+SKIP = 'skip'
+
+
+class CircuitState:
+    def __init__(self):
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.backoff = 0
+
+
+class CircuitBreaker:
+    """Process-wide breaker keyed by probe (so targets sharing a URL share a breaker)."""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def before_probe(self, key, settings):
+        """Decide whether to probe normally, run a cheap pre-check, or skip this attempt."""
+        threshold = settings.breaker_failure_threshold
+        with self._lock:
+            state = self._states.get(key)
+        if not threshold or state is None or state.failures < threshold:
+            return PROBE
+        if time.monotonic() < state.next_attempt:
+            return SKIP
+        return PRECHECK
+
+    def record(self, key, is_online, settings):
+        """Update the breaker after an attempt; recovery closes it immediately."""
+        with self._lock:
+            if is_online:
+                self._states.pop(key, None)
+                return None
+
+            state = self._states.setdefault(key, CircuitState())
+            state.failures += 1
+            threshold = settings.breaker_failure_threshold
+            if threshold and state.failures >= threshold:
+                exponent = state.failures - threshold
+                state.backoff = min(
+                    settings.breaker_max_backoff,
+                    settings.breaker_base_backoff * (2 ** min(exponent, 16))
+                )
+                state.next_attempt = time.monotonic() + state.backoff
+            return state
+
+    def is_open(self, key, settings):
+        with self._lock:
+            state = self._states.get(key)
+        return bool(settings.breaker_failure_threshold and state and state.failures >= settings.breaker_failure_threshold)
+
+    def reset(self):
+        with self._lock:
+            self._states.clear()
+
+
+circuit_breaker = CircuitBreaker()
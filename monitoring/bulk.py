@@ -0,0 +1,291 @@
+"""
+Bulk import, export and delete of monitored targets.
+
+Rows are validated with the same forms the UI uses, then upserted with
+bulk_create/bulk_update keyed by URL (websites) or website + URL (internal
+apps). Per-website add/remove emails are suppressed; one summary is sent instead.
+"""
+import csv
+import io
+import json
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.utils import timezone
+from .forms import WebsiteForm, InternalAppForm
+from .models import Website, InternalApp
+from .signals import suppress_notifications
+from . import config
+import logging
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+TARGET_FORMATS = ['csv', 'json', 'yaml']
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'yaml': 'application/x-yaml',
+}
+
+WEBSITE_FIELDS = list(WebsiteForm._meta.fields)
+APP_FIELDS = list(InternalAppForm._meta.fields)
+
+# Flat CSV layout: internal app rows name their website in website_url
+CSV_COLUMNS = ['website_url'] + WEBSITE_FIELDS + [f for f in APP_FIELDS if f not in WEBSITE_FIELDS]
+
+BATCH_SIZE = 500
+
+
+class TargetImportError(ValueError):
+    pass
+
+
+class ImportResult:
+    def __init__(self):
+        self.websites_created = []
+        self.websites_updated = []
+        self.apps_created = []
+        self.apps_updated = []
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def as_dict(self):
+        return {
+            'websites_created': len(self.websites_created),
+            'websites_updated': len(self.websites_updated),
+            'internal_apps_created': len(self.apps_created),
+            'internal_apps_updated': len(self.apps_updated),
+            'errors': [{'row': row, 'errors': errors} for row, errors in self.errors],
+        }
+
+    def __str__(self):
+        return (
+            f"{len(self.websites_created)} websites added, {len(self.websites_updated)} updated; "
+            f"{len(self.apps_created)} internal apps added, {len(self.apps_updated)} updated; "
+            f"{len(self.errors)} rows rejected"
+        )
+
+
+def parse_targets(content, fmt):
+    """Return (website rows, internal app rows); app rows carry their website's URL in website_url."""
+    if fmt == 'csv':
+        rows = [
+            # Empty cells mean "not given": keep the existing value or the default
+            {k.strip(): v.strip() for k, v in row.items() if k and v is not None and v.strip() != ''}
+            for row in csv.DictReader(io.StringIO(content))
+        ]
+        return [r for r in rows if not r.get('website_url')], [r for r in rows if r.get('website_url')]
+
+    if fmt == 'json':
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            raise TargetImportError(f"Invalid JSON: {e}")
+    elif fmt == 'yaml':
+        if yaml is None:
+            raise TargetImportError("YAML import needs PyYAML (pip install pyyaml)")
+        try:
+            data = yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            raise TargetImportError(f"Invalid YAML: {e}")
+    else:
+        raise TargetImportError(f"Unknown format {fmt}; use one of {', '.join(TARGET_FORMATS)}")
+
+    if isinstance(data, dict):
+        data = data.get('websites', [])
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise TargetImportError("Expected a list of websites (or {\"websites\": [...]})")
+
+    websites, apps = [], []
+    for row in data:
+        row = dict(row)
+        for app in row.pop('internal_apps', None) or []:
+            apps.append({**app, 'website_url': row.get('url')})
+        websites.append(row)
+    return websites, apps
+
+
+def _form_data(row, instance, model, fields):
+    # Start from the current values (or model defaults) so partial rows only change what they give
+    data = model_to_dict(instance or model(), fields=fields)
+    data.update({k: v for k, v in row.items() if k in fields})
+    return {k: v for k, v in data.items() if v is not None}
+
+
+def _validate(form_class, model, fields, row, instance, label, result):
+    form = form_class(data=_form_data(row, instance, model, fields), instance=instance)
+    if not form.is_valid():
+        result.errors.append((label, {f: [str(e) for e in errs] for f, errs in form.errors.items()}))
+        return None
+    return form.instance
+
+
+def _upsert_websites(rows, result, now):
+    existing = {w.url: w for w in Website.objects.filter(url__in=[r.get('url') for r in rows])}
+    to_create, to_update, seen = [], [], set()
+    for number, row in enumerate(rows, 1):
+        label = row.get('url') or f"website #{number}"
+        if row.get('url') in seen:
+            result.errors.append((label, {'url': ["Duplicate URL in import"]}))
+            continue
+        seen.add(row.get('url'))
+        instance = _validate(WebsiteForm, Website, WEBSITE_FIELDS, row, existing.get(row.get('url')), label, result)
+        if instance is None:
+            continue
+        if instance.pk:
+            instance.updated_at = now
+            to_update.append(instance)
+        else:
+            to_create.append(instance)
+
+    Website.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+    Website.objects.bulk_update(to_update, WEBSITE_FIELDS + ['updated_at'], batch_size=BATCH_SIZE)
+    result.websites_created = to_create
+    result.websites_updated = to_update
+
+
+def _upsert_apps(rows, result, now):
+    # Re-read by URL: not every backend returns primary keys from bulk_create
+    websites = {w.url: w for w in Website.objects.filter(url__in=[r['website_url'] for r in rows])}
+    existing = {
+        (app.website_id, app.url): app
+        for app in InternalApp.objects.filter(website__in=websites.values())
+    }
+    names = {(website_id, app.name): url for (website_id, url), app in existing.items()}
+    to_create, to_update, seen = [], [], set()
+
+    for number, row in enumerate(rows, 1):
+        label = f"{row['website_url']} -> {row.get('url') or f'internal app #{number}'}"
+        website = websites.get(row['website_url'])
+        if website is None:
+            result.errors.append((label, {'website_url': ["No website with this URL"]}))
+            continue
+        key = (website.id, row.get('url'))
+        if key in seen:
+            result.errors.append((label, {'url': ["Duplicate internal app URL in import"]}))
+            continue
+        seen.add(key)
+
+        instance = _validate(InternalAppForm, InternalApp, APP_FIELDS, row, existing.get(key), label, result)
+        if instance is None:
+            continue
+        # unique_together (website, name) isn't checked by the form, which has no website field
+        if names.setdefault((website.id, instance.name), instance.url) != instance.url:
+            result.errors.append((label, {'name': ["Another internal app of this website has this name"]}))
+            continue
+        instance.website = website
+        if instance.pk:
+            instance.updated_at = now
+            to_update.append(instance)
+        else:
+            to_create.append(instance)
+
+    InternalApp.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+    InternalApp.objects.bulk_update(to_update, APP_FIELDS + ['updated_at'], batch_size=BATCH_SIZE)
+    result.apps_created = to_create
+    result.apps_updated = to_update
+
+
+def import_targets(content, fmt, dry_run=False, notify=True):
+    """Validate and upsert targets; with dry_run everything is rolled back. Returns an ImportResult."""
+    website_rows, app_rows = parse_targets(content, fmt)
+    result = ImportResult()
+    now = timezone.now()
+
+    with transaction.atomic(), suppress_notifications():
+        _upsert_websites(website_rows, result, now)
+        if app_rows:
+            _upsert_apps(app_rows, result, now)
+        if dry_run:
+            transaction.set_rollback(True)
+
+    if not dry_run:
+        config.invalidate()
+        if notify:
+            send_import_summary(result)
+    return result
+
+
+def delete_targets(urls, notify=True):
+    """Delete websites (and their apps and history) by URL without per-website emails."""
+    websites = list(Website.objects.filter(url__in=urls))
+    if websites:
+        with transaction.atomic(), suppress_notifications():
+            Website.objects.filter(pk__in=[w.pk for w in websites]).delete()
+        config.invalidate()
+        if notify:
+            send_summary(
+                websites,
+                f"🗑️ {len(websites)} Websites Removed from Monitoring",
+                "The following websites have been permanently removed from the Web Health Checker monitoring system:",
+            )
+    return websites
+
+
+def send_summary(websites, subject, intro):
+    """One email to every affected alert address instead of one email per website."""
+    recipients = sorted({w.alert_email for w in websites if w.alert_email})
+    if not recipients:
+        return
+    lines = "\n".join(f"- {w.name}: {w.url}" for w in websites)
+    message = f"""
+Dear Administrator,
+
+{intro}
+
+{lines}
+
+Best regards,
+Web Health Checker System
+    """
+    try:
+        send_mail(subject, message.strip(), settings.DEFAULT_FROM_EMAIL, recipients, fail_silently=True)
+    except Exception as e:
+        logger.error(f"Failed to send bulk summary email: {str(e)}")
+
+
+def send_import_summary(result):
+    if result.websites_created:
+        send_summary(
+            result.websites_created,
+            f"🆕 {len(result.websites_created)} Websites Added to Monitoring",
+            f"A bulk import added these websites to the Web Health Checker monitoring system ({result}):",
+        )
+
+
+def export_targets(fmt):
+    """Serialize every website with its internal apps in an importable format."""
+    websites = Website.objects.prefetch_related('internal_apps').order_by('name')
+
+    if fmt == 'csv':
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for website in websites:
+            writer.writerow(model_to_dict(website, fields=WEBSITE_FIELDS))
+            for app in website.internal_apps.all():
+                writer.writerow({**model_to_dict(app, fields=APP_FIELDS), 'website_url': website.url})
+        return out.getvalue()
+
+    data = [
+        {
+            **model_to_dict(website, fields=WEBSITE_FIELDS),
+            'internal_apps': [model_to_dict(app, fields=APP_FIELDS) for app in website.internal_apps.all()],
+        }
+        for website in websites
+    ]
+    if fmt == 'yaml':
+        if yaml is None:
+            raise TargetImportError("YAML export needs PyYAML (pip install pyyaml)")
+        return yaml.safe_dump({'websites': data}, sort_keys=False, allow_unicode=True)
+    return json.dumps({'websites': data}, indent=2)
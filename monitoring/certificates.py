@@ -0,0 +1,121 @@
+"""
+Peer certificates captured from the TLS handshakes probes already perform.
+
+Nothing here opens a connection: HTTPS and TLS probes hand over the socket they
+just negotiated, and the certificate is parsed once per host per TTL. Hosts
+serving the same certificate (same issuer and serial) share one parsed entry.
+"""
+import ssl
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CertificateInfo:
+    """The parts of a peer certificate the monitor cares about."""
+
+    def __init__(self, subject, issuer, serial, not_after, sans):
+        self.subject = subject
+        self.issuer = issuer
+        self.serial = serial
+        self.not_after = not_after
+        self.sans = sans
+
+    @classmethod
+    def from_peercert(cls, cert):
+        """Build from ssl.SSLSocket.getpeercert() output."""
+        def name(rdns):
+            fields = dict(pair for rdn in rdns for pair in rdn)
+            return fields.get('commonName') or fields.get('organizationName') or ''
+
+        issuer = dict(pair for rdn in cert.get('issuer', ()) for pair in rdn)
+        return cls(
+            subject=name(cert.get('subject', ())),
+            issuer=issuer.get('organizationName') or issuer.get('commonName') or '',
+            serial=cert.get('serialNumber', ''),
+            not_after=datetime.fromtimestamp(ssl.cert_time_to_seconds(cert['notAfter']), tz=dt_timezone.utc),
+            sans=[value for kind, value in cert.get('subjectAltName', ()) if kind == 'DNS'],
+        )
+
+    def days_left(self, now=None):
+        now = now or datetime.now(tz=dt_timezone.utc)
+        return (self.not_after - now).total_seconds() / 86400
+
+    def __str__(self):
+        return f"{self.subject} (issued by {self.issuer}, expires {self.not_after:%Y-%m-%d})"
+
+
+class CertificateCache:
+    """Per host:port certificate metadata with a TTL."""
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._entries = {}
+        self._certificates = {}
+        self._lock = threading.Lock()
+
+    def is_fresh(self, host, port):
+        with self._lock:
+            entry = self._entries.get((host.lower(), port))
+        return entry is not None and entry[1] > time.monotonic()
+
+    def capture(self, host, port, sock):
+        """Record the certificate of an already-handshaken socket, unless this host's entry is fresh."""
+        if not host or self.is_fresh(host, port):
+            return
+        try:
+            cert = sock.getpeercert()
+        except (AttributeError, ValueError, OSError):
+            return
+        if cert:
+            self.store(host, port, cert)
+
+    def store(self, host, port, cert):
+        try:
+            key = (str(cert.get('issuer')), cert.get('serialNumber'))
+            with self._lock:
+                info = self._certificates.get(key)
+            if info is None:
+                info = CertificateInfo.from_peercert(cert)
+        except (KeyError, ValueError) as e:
+            logger.warning(f"Could not parse certificate for {host}: {str(e)}")
+            return
+
+        with self._lock:
+            self._certificates[key] = info
+            self._entries[(host.lower(), port)] = (info, time.monotonic() + self.ttl)
+            # Forget certificates no host points at any more (e.g. after renewal)
+            live = {id(entry[0]) for entry in self._entries.values()}
+            for cert_key in [k for k, v in self._certificates.items() if id(v) not in live]:
+                del self._certificates[cert_key]
+
+    def get(self, host, port):
+        """Last certificate seen for host:port (even if older than the TTL), or None."""
+        if not host:
+            return None
+        with self._lock:
+            entry = self._entries.get((host.lower(), port))
+        return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._certificates.clear()
+
+
+_certificate_cache = None
+_certificate_cache_lock = threading.Lock()
+
+
+def get_certificate_cache():
+    """Return the certificate cache shared by every probe in this process."""
+    global _certificate_cache
+    if _certificate_cache is None:
+        with _certificate_cache_lock:
+            if _certificate_cache is None:
+                _certificate_cache = CertificateCache(ttl=settings.MONITORING_CERT_CACHE_TTL)
+    return _certificate_cache
@@ -0,0 +1,126 @@
+"""
+Process-wide monitoring configuration snapshot.
+
+Settings and every active target are loaded once and shared by all workers.
+A snapshot is rebuilt only when its version moves: in this process, model
+signals drop it immediately; edits made elsewhere (admin in the web process)
+are picked up by a cheap updated_at/count watermark query, run at most every
+MONITORING_CONFIG_REFRESH seconds. Maintenance windows ride along as an
+interval index, so skipping targets in maintenance costs a bisect each.
+"""
+import threading
+import time
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Count, Max
+from .models import Website, InternalApp, MonitoringSettings, ResponseAssertion, MaintenanceWindow
+from .planner import plan_cycle
+from .maintenance import compile_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigSnapshot:
+    """Read-only view of settings and active targets at one version. Do not mutate the instances."""
+
+    __slots__ = ('version', 'settings', 'websites', 'internal_apps', 'maintenance_windows', 'loaded_at', '_groups', '_maintenance', '_active_groups')
+
+    def __init__(self, version, monitoring_settings, websites, internal_apps, maintenance_windows=()):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'settings', monitoring_settings)
+        object.__setattr__(self, 'websites', tuple(websites))
+        object.__setattr__(self, 'internal_apps', tuple(internal_apps))
+        object.__setattr__(self, 'maintenance_windows', tuple(maintenance_windows))
+        object.__setattr__(self, 'loaded_at', time.monotonic())
+        object.__setattr__(self, '_groups', None)
+        object.__setattr__(self, '_maintenance', None)
+        object.__setattr__(self, '_active_groups', (None, None))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is immutable")
+
+    @property
+    def targets(self):
+        return self.websites + self.internal_apps
+
+    @property
+    def groups(self):
+        """Probe groups for every active target, planned once per snapshot."""
+        if self._groups is None:
+            object.__setattr__(self, '_groups', tuple(plan_cycle(self.targets)))
+        return self._groups
+
+    @property
+    def maintenance(self):
+        """Interval index of the maintenance windows, recompiled once its horizon has passed."""
+        if self._maintenance is None or time.time() >= self._maintenance.valid_until:
+            object.__setattr__(self, '_maintenance', compile_index(self.maintenance_windows))
+        return self._maintenance
+
+    def active_groups(self, at=None):
+        """Probe groups minus the targets inside a maintenance window; reused until a window starts or ends."""
+        index = self.maintenance
+        marker = index.marker(at)
+        cached_marker, groups = self._active_groups
+        if marker != cached_marker:
+            groups = tuple(index.filter_groups(self.groups, at))
+            object.__setattr__(self, '_active_groups', (marker, groups))
+        return groups
+
+
+def config_version():
+    """Watermark of every config table: changes whenever a row is saved or deleted."""
+    version = []
+    for model in (MonitoringSettings, Website, InternalApp, ResponseAssertion, MaintenanceWindow):
+        watermark = model.objects.aggregate(updated=Max('updated_at'), rows=Count('pk'))
+        version.append((watermark['updated'], watermark['rows']))
+    return tuple(version)
+
+
+def load_snapshot(version=None):
+    version = version or config_version()
+    websites = Website.objects.filter(status='active')
+    internal_apps = InternalApp.objects.filter(is_active=True, website__status='active').select_related('website')
+    windows = MaintenanceWindow.objects.filter(is_active=True)
+    return ConfigSnapshot(version, MonitoringSettings.get_settings(), websites, internal_apps, windows)
+
+
+_snapshot = None
+_checked_at = 0.0
+_lock = threading.RLock()  # re-entrant: loading can create the settings row, whose signal invalidates
+
+
+def get_config():
+    """Current snapshot; reloads only if the watermark moved since the last check."""
+    global _snapshot, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if _snapshot is not None and now - _checked_at < settings.MONITORING_CONFIG_REFRESH:
+            return _snapshot
+
+        try:
+            version = config_version()
+        except DatabaseError as e:
+            if _snapshot is None:
+                raise
+            # Keep probing with the last known config while the database is unavailable
+            logger.warning(f"Config refresh failed, using snapshot loaded earlier: {str(e)}")
+            _checked_at = now
+            return _snapshot
+        if _snapshot is None or version != _snapshot.version:
+            _snapshot = load_snapshot(version)
+        _checked_at = now
+        return _snapshot
+
+
+def get_settings():
+    """Cached MonitoringSettings for the probe path."""
+    return get_config().settings
+
+
+def invalidate():
+    """Drop the snapshot so the next get_config() reloads (called from model signals)."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
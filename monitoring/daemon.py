@@ -0,0 +1,181 @@
+"""
+Fixed-rate loop for the background monitor.
+
+Ticks are scheduled on a start + n * interval grid, so a slow tick doesn't push
+every later one back: the next tick starts late (recorded as lag) and slots
+missed entirely are skipped. Ticks longer than the interval count as overruns.
+Each tick gets a deadline (its slot's end). SIGTERM/SIGINT stop the loop and
+the caller drains in-flight work. Loop metrics are written to
+MONITORING_LOOP_STATS_FILE so the web process can report them.
+"""
+import json
+import math
+import os
+import signal
+import threading
+import time
+from concurrent.futures import wait
+from django.conf import settings
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LoopStats:
+    """Lag, duration and overrun counters of a MonitorLoop."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.started_at = timezone.now()
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.cancelled = 0
+        self.stragglers = 0
+        self.in_flight = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.last_tick_at = None
+        self.state = 'running'
+
+    def as_dict(self):
+        return {
+            'state': self.state,
+            'interval': self.interval,
+            'started_at': self.started_at.isoformat(),
+            'last_tick_at': self.last_tick_at.isoformat() if self.last_tick_at else None,
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'skipped_ticks': self.skipped_ticks,
+            'cancelled': self.cancelled,
+            'stragglers': self.stragglers,
+            'in_flight': self.in_flight,
+            'last_lag': round(self.last_lag, 3),
+            'max_lag': round(self.max_lag, 3),
+            'last_duration': round(self.last_duration, 3),
+            'max_duration': round(self.max_duration, 3),
+        }
+
+    def write(self, path=None):
+        """Atomically replace the stats file; errors are logged, never raised."""
+        path = str(path or settings.MONITORING_LOOP_STATS_FILE)
+        try:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self.as_dict(), f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write loop stats to {path}: {str(e)}")
+
+
+def read_loop_stats(path=None):
+    """Last stats written by the background monitor, or None if it hasn't run."""
+    try:
+        with open(str(path or settings.MONITORING_LOOP_STATS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class MonitorLoop:
+    """Run tick(deadline) at a fixed rate until stop() is called."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stats = LoopStats(interval)
+        self._stop = threading.Event()
+        self._signal = None
+        self._stop_reported = False
+
+    @property
+    def stopping(self):
+        return self._stop.is_set()
+
+    def stop(self, signum=None, frame=None):
+        # Also the signal handler: only set flags here, logging could deadlock on a lock the main thread holds
+        if signum is not None and self._signal is None:
+            self._signal = signum
+        self._stop.set()
+
+    def report_stop(self):
+        """Log the signal that stopped the loop (once); called from the loop, never the handler."""
+        if self._signal is None or self._stop_reported:
+            return
+        self._stop_reported = True
+        name = signal.Signals(self._signal).name
+        logger.info(f"Received {name}, draining in-flight checks")
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Received {name}, draining in-flight checks...", flush=True)
+
+    def install_signal_handlers(self):
+        """Stop on SIGTERM (docker stop) and SIGINT (Ctrl+C). Only possible from the main thread."""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.stop)
+
+    def sleep(self, seconds):
+        """Sleep that wakes up early on stop(); returns True if stopping."""
+        return self._stop.wait(max(0.0, seconds))
+
+    def run(self, tick):
+        scheduled = time.monotonic()
+        while not self.stopping:
+            started = time.monotonic()
+            deadline = scheduled + self.interval
+            self.stats.last_lag = started - scheduled
+            self.stats.max_lag = max(self.stats.max_lag, self.stats.last_lag)
+            self.stats.last_tick_at = timezone.now()
+            try:
+                tick(deadline)
+            except Exception as e:
+                logger.error(f"Monitor tick failed: {str(e)}")
+                print(f"Error in monitor tick: {e}")
+
+            finished = time.monotonic()
+            self.stats.ticks += 1
+            self.stats.last_duration = finished - started
+            self.stats.max_duration = max(self.stats.max_duration, self.stats.last_duration)
+
+            # Next slot on the grid: a late tick starts at once (with lag), slots wholly missed are skipped
+            slots = max(1, math.floor((finished - scheduled) / self.interval))
+            if finished > deadline:
+                self.stats.overruns += 1
+                self.stats.skipped_ticks += slots - 1
+                logger.warning(f"Monitor tick overran its {self.interval}s interval by {finished - deadline:.1f}s")
+                print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Tick took {finished - started:.1f}s, over the {self.interval}s interval; {slots - 1} ticks skipped.", flush=True)
+            scheduled += slots * self.interval
+            self.stats.write()
+            self.sleep(scheduled - time.monotonic())
+
+        self.report_stop()
+        self.stats.state = 'stopped'
+        self.stats.write()
+
+
+def reap(futures, now=None):
+    """
+    Cancel queued work whose deadline has passed. futures maps future -> (deadline, on_cancel).
+    Returns (cancelled, stragglers): late work that hadn't started, and late work still running.
+    """
+    now = now or time.monotonic()
+    cancelled = stragglers = 0
+    for future, (deadline, on_cancel) in list(futures.items()):
+        if future.done():
+            del futures[future]
+        elif now > deadline:
+            if future.cancel():
+                del futures[future]
+                on_cancel()
+                cancelled += 1
+            else:
+                stragglers += 1
+    return cancelled, stragglers
+
+
+def drain(executor, futures, timeout):
+    """Stop taking work, let running futures finish for up to timeout seconds; returns those still running."""
+    executor.shutdown(wait=False, cancel_futures=True)
+    running = [f for f in futures if not f.cancelled()]
+    _, not_done = wait(running, timeout=timeout)
+    return not_done
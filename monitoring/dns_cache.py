@@ -0,0 +1,158 @@
+"""
+Process-wide DNS resolution cache shared by all probes.
+
+Record TTLs are honoured when dnspython is installed; otherwise every entry
+lives for MONITORING_DNS_CACHE_TTL seconds.
+"""
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+import logging
+
+try:
+    import dns.resolver
+    import dns.exception
+except ImportError:
+    dns = None
+
+logger = logging.getLogger(__name__)
+
+
+class DNSCache:
+    """Size-bounded LRU cache of getaddrinfo results with TTL and stale-while-revalidate."""
+
+    def __init__(self, ttl=300, min_ttl=5, max_size=1024, stale_ttl=0):
+        self.ttl = ttl
+        self.min_ttl = min_ttl
+        self.max_size = max_size
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_executor = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def _query(self, host, port):
+        """Resolve host and return (addrinfo list, ttl in seconds)."""
+        if dns is not None:
+            addresses = []
+            ttls = []
+            for rdtype, family in (('A', socket.AF_INET), ('AAAA', socket.AF_INET6)):
+                try:
+                    answer = dns.resolver.resolve(host, rdtype)
+                except dns.exception.DNSException:
+                    continue
+                ttls.append(answer.rrset.ttl)
+                for record in answer:
+                    sockaddr = (record.address, port) if family == socket.AF_INET else (record.address, port, 0, 0)
+                    addresses.append((family, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', sockaddr))
+            if addresses:
+                return addresses, max(self.min_ttl, min(min(ttls), self.ttl))
+
+        # IP literals, /etc/hosts entries and hosts dnspython could not answer
+        return socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM), self.ttl
+
+    def _store(self, key, addresses, ttl):
+        with self._lock:
+            self._entries[key] = (addresses, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, key):
+        addresses, ttl = self._query(*key)
+        self._store(key, addresses, ttl)
+        return addresses
+
+    def _refresh(self, key):
+        try:
+            self._lookup(key)
+        except OSError as e:
+            logger.warning(f"Background DNS refresh failed for {key[0]}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh_in_background(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='dns-refresh')
+        self._refresh_executor.submit(self._refresh, key)
+
+    def resolve(self, host, port):
+        """Return a getaddrinfo-style list for (host, port), resolving only on a miss."""
+        key = (host.lower(), port)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            addresses, expires_at = entry
+            if now < expires_at:
+                self.hits += 1
+                return addresses
+            if now < expires_at + self.stale_ttl:
+                # Serve the stale answer now; refresh it off the probe path
+                self.stale_hits += 1
+                self._refresh_in_background(key)
+                return addresses
+
+        self.misses += 1
+        return self._lookup(key)
+
+    def prefetch(self, host_ports, max_workers=10):
+        """Resolve many (host, port) pairs concurrently, e.g. at the start of a cycle."""
+        host_ports = set(host_ports)
+        if not host_ports:
+            return 0
+
+        def warm(host_port):
+            try:
+                self.resolve(*host_port)
+                return True
+            except OSError:
+                return False
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dns-prefetch') as executor:
+            return sum(executor.map(warm, host_ports))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits,
+        }
+
+
+_dns_cache = None
+_dns_cache_lock = threading.Lock()
+
+
+def get_dns_cache():
+    """Return the DNS cache shared by every probe in this process."""
+    global _dns_cache
+    if _dns_cache is None:
+        with _dns_cache_lock:
+            if _dns_cache is None:
+                _dns_cache = DNSCache(
+                    ttl=settings.MONITORING_DNS_CACHE_TTL,
+                    max_size=settings.MONITORING_DNS_CACHE_SIZE,
+                    stale_ttl=settings.MONITORING_DNS_STALE_TTL,
+                )
+    return _dns_cache
@@ -0,0 +1,126 @@
+"""
+Streaming export of check history and alerts using keyset pagination.
+"""
+import csv
+import json
+from .models import MonitoringCheck, AlertLog
+from .pagination import seek
+
+CHECK_EXPORT_FIELDS = [
+    'id', 'check_time', 'website_id', 'internal_app_id', 'is_online',
+    'response_time', 'status_code', 'error_message',
+]
+
+ALERT_EXPORT_FIELDS = [
+    'id', 'sent_at', 'website_id', 'alert_type', 'email_sent_to',
+    'subject', 'is_sent', 'is_cleared',
+]
+
+EXPORTS = {
+    'checks': (MonitoringCheck, 'check_time', CHECK_EXPORT_FIELDS),
+    'alerts': (AlertLog, 'sent_at', ALERT_EXPORT_FIELDS),
+}
+
+EXPORT_FORMATS = ['csv', 'ndjson', 'parquet']
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """File-like object that returns what is written, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(kind, website_id=None, since=None, until=None):
+    model, field, fields = EXPORTS[kind]
+    queryset = model.objects.all()
+    if website_id:
+        queryset = queryset.filter(website_id=website_id)
+    if since:
+        queryset = queryset.filter(**{f'{field}__gte': since})
+    if until:
+        queryset = queryset.filter(**{f'{field}__lt': until})
+    return queryset
+
+
+def iter_export_batches(kind, batch_size=1000, **filters):
+    """Yield lists of row dicts, oldest first, seeking past the last (timestamp, id) each batch."""
+    _, field, fields = EXPORTS[kind]
+    queryset = export_queryset(kind, **filters)
+    cursor = None
+
+    while True:
+        page = queryset if cursor is None else seek(queryset, field, cursor, descending=False)
+        rows = list(page.order_by(field, 'pk').values(*fields)[:batch_size])
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        cursor = (rows[-1][field], rows[-1]['id'])
+
+
+def iter_export_rows(kind, batch_size=1000, **filters):
+    for rows in iter_export_batches(kind, batch_size=batch_size, **filters):
+        yield from rows
+
+
+def _serialize(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def iter_csv(kind, batch_size=1000, **filters):
+    fields = EXPORTS[kind][2]
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in iter_export_rows(kind, batch_size=batch_size, **filters):
+        yield writer.writerow([_serialize(row[f]) for f in fields])
+
+
+def iter_ndjson(kind, batch_size=1000, **filters):
+    for row in iter_export_rows(kind, batch_size=batch_size, **filters):
+        yield json.dumps({k: _serialize(v) for k, v in row.items()}, separators=(',', ':')) + '\n'
+
+
+def iter_export(kind, export_format, batch_size=1000, **filters):
+    """Return a generator of text chunks for a streamable format (csv or ndjson)."""
+    if export_format == 'csv':
+        return iter_csv(kind, batch_size=batch_size, **filters)
+    return iter_ndjson(kind, batch_size=batch_size, **filters)
+
+
+def write_parquet(kind, path, batch_size=10000, **filters):
+    """Write an export to a Parquet file one row group per batch. Requires pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    model, _, fields = EXPORTS[kind]
+    arrow_types = {
+        'BigAutoField': pa.int64(),
+        'ForeignKey': pa.int64(),
+        'PositiveIntegerField': pa.int64(),
+        'FloatField': pa.float64(),
+        'BooleanField': pa.bool_(),
+        'DateTimeField': pa.timestamp('us', tz='UTC'),
+    }
+    # Fixed schema so batches with all-null columns still line up
+    schema = pa.schema([
+        (f, arrow_types.get(model._meta.get_field(f).get_internal_type(), pa.string()))
+        for f in fields
+    ])
+
+    writer = pq.ParquetWriter(path, schema)
+    total = 0
+    try:
+        for rows in iter_export_batches(kind, batch_size=batch_size, **filters):
+            table = pa.Table.from_pydict({f: [row[f] for row in rows] for f in fields}, schema=schema)
+            writer.write_table(table)
+            total += len(rows)
+    finally:
+        writer.close()
+    return total
@@ -12,7 +12,7 @@ class WebsiteForm(forms.ModelForm):
         model = Website
         fields = [
             'name', 'url', 'description', 'status', 'check_interval',
-            'timeout', 'expected_status_code', 'send_recovery_email',
+            'timeout', 'expected_status_code', 'probe_type', 'send_recovery_email',
             'alert_email', 'recovery_email'
         ]
         widgets = {
@@ -23,6 +23,7 @@ class WebsiteForm(forms.ModelForm):
             'check_interval': forms.NumberInput(attrs={'class': 'form-control'}),
             'timeout': forms.NumberInput(attrs={'class': 'form-control'}),
             'expected_status_code': forms.NumberInput(attrs={'class': 'form-control'}),
+            'probe_type': forms.Select(attrs={'class': 'form-control'}),
             'send_recovery_email': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'alert_email': forms.EmailInput(attrs={'class': 'form-control'}),
             'recovery_email': forms.EmailInput(attrs={'class': 'form-control'}),
@@ -47,7 +48,7 @@ class InternalAppForm(forms.ModelForm):
         model = InternalApp
         fields = [
             'name', 'app_type', 'url', 'description', 'is_active',
-            'expected_status_code', 'timeout'
+            'probe_type', 'expected_status_code', 'timeout'
         ]
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
@@ -55,6 +56,7 @@ class InternalAppForm(forms.ModelForm):
             'url': forms.URLInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+            'probe_type': forms.Select(attrs={'class': 'form-control'}),
             'expected_status_code': forms.NumberInput(attrs={'class': 'form-control'}),
             'timeout': forms.NumberInput(attrs={'class': 'form-control'}),
         }
@@ -0,0 +1,96 @@
+"""
+Hedged and retried probes: a slow first attempt gets a second one racing it, and a
+refused or reset connection gets a bounded immediate retry. Every attempt is timed.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from .probes import run_probe
+
+# Attempts run here so a hedge can race a primary that is still waiting on the network
+HEDGE_WORKERS = 20
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='probe-hedge')
+    return _executor
+
+
+def _attempt(target, timeout, kind, started):
+    """Run one probe attempt; returns (result, attempt record)."""
+    offset = time.monotonic() - started
+    result = run_probe(target, timeout=timeout)
+    record = {
+        'kind': kind,
+        'started': round(offset, 3),
+        'duration': round(time.monotonic() - started - offset, 3),
+        'is_online': result.is_online,
+        'status_code': result.status_code,
+        'error': result.error_message[:200],
+    }
+    return result, record
+
+
+def probe_with_hedging(target, timeout=None, hedge_after=None, retries=0):
+    """
+    Probe a target, returning the first successful attempt (or the last failure).
+
+    hedge_after: seconds after which a still-running first attempt is hedged (None = never).
+    retries: immediate retries allowed after connection errors.
+    """
+    started = time.monotonic()
+    attempts = []
+
+    if hedge_after is None:
+        # Nothing to race: run attempts inline
+        kind = 'primary'
+        while True:
+            result, record = _attempt(target, timeout, kind, started)
+            attempts.append(record)
+            if result.is_online or not result.connection_error or retries <= 0:
+                break
+            retries -= 1
+            kind = 'retry'
+        result.attempts = attempts
+        return result
+
+    executor = _get_executor()
+    pending = {executor.submit(_attempt, target, timeout, 'primary', started)}
+    hedged = False
+    result = None
+
+    while pending:
+        wait_for = None if hedged else max(0, hedge_after - (time.monotonic() - started))
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        if not done:
+            # First attempt is past the target's p95: race a second one
+            hedged = True
+            pending.add(executor.submit(_attempt, target, timeout, 'hedge', started))
+            continue
+
+        for future in done:
+            attempt_result, record = future.result()
+            attempts.append(record)
+            if result is None or not result.is_online:
+                result = attempt_result
+        if result.is_online:
+            break
+        if result.connection_error and retries > 0:
+            retries -= 1
+            # A retry replaces a fast failure; no need to hedge it as well
+            hedged = True
+            pending.add(executor.submit(_attempt, target, timeout, 'retry', started))
+
+    for future in pending:
+        # Losing attempts keep running in the background; record that they were abandoned
+        attempts.append({'kind': 'abandoned'})
+
+    result.attempts = attempts
+    return result
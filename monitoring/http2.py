@@ -0,0 +1,119 @@
+"""
+Optional HTTP/2 transport: HTTP probes for many paths on one HTTPS origin share a
+single multiplexed connection, with each stream timed separately.
+
+Requires httpx with HTTP/2 support (pip install 'httpx[http2]') and
+MONITORING_HTTP2=True; otherwise every probe uses the HTTP/1.1 engine in probes.py.
+Servers that do not negotiate h2 are answered over HTTP/1.1 by httpx itself.
+"""
+import asyncio
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from .probes import ProbeResult, DEFAULT_PORTS
+from .assertions import assertions_for
+from .certificates import get_certificate_cache
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+except ImportError:
+    httpx = None
+
+
+def http2_enabled():
+    return httpx is not None and settings.MONITORING_HTTP2
+
+
+def origin(url):
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    return (scheme, (parts.hostname or '').lower(), parts.port or DEFAULT_PORTS.get(scheme))
+
+
+def can_multiplex(group):
+    """HTTPS GET probes whose targets all allow HTTP/2 (h2 is only negotiated over TLS)."""
+    leader = group.leader
+    return (
+        leader.probe_type == 'http'
+        and urlsplit(leader.url).scheme.lower() == 'https'
+        and all(target.allow_http2 for target in group.targets)
+    )
+
+
+def batch_by_origin(groups):
+    """Split probe groups into batches; multiplexable groups on one origin share a batch."""
+    if not http2_enabled():
+        return [[group] for group in groups]
+
+    batches = {}
+    for group in groups:
+        key = ('h2',) + origin(group.leader.url) if can_multiplex(group) else group.key
+        batches.setdefault(key, []).append(group)
+    return list(batches.values())
+
+
+def _capture_certificate(url, response):
+    """Peer certificate of the connection this stream used, via the shared certificate cache."""
+    host, port = origin(url)[1:]
+    certificates = get_certificate_cache()
+    stream = response.extensions.get('network_stream')
+    if stream is not None:
+        certificates.capture(host, port, stream.get_extra_info('ssl_object'))
+    return certificates.get(host, port)
+
+
+async def _probe_stream(client, target, assertions, started):
+    offset = time.monotonic() - started
+    start_time = time.time()
+    protocol = None
+    try:
+        response = await client.get(target.url, timeout=target.timeout)
+        end_time = time.time()
+    except httpx.TimeoutException:
+        result = ProbeResult(error_message=f"Request timed out after {target.timeout} seconds", timed_out=True)
+    except httpx.ConnectError as e:
+        result = ProbeResult(error_message=f"Error: {str(e)}", connection_error=True)
+    except Exception as e:
+        result = ProbeResult(error_message=f"Error: {str(e)}")
+    else:
+        response_time = round(end_time - start_time, 3)
+        evaluation = assertions.start(response.status_code, response.headers, target.expected_status_code)
+        content = evaluation.read([response.text])
+        failures = evaluation.failures(response_time)
+        result = ProbeResult(
+            is_online=not failures,
+            status_code=response.status_code,
+            response_time=response_time,
+            error_message="; ".join(failures),
+            response_content=content,
+        )
+        protocol = response.http_version
+        result.certificate = _capture_certificate(target.url, response)
+
+    result.attempts = [{
+        'kind': 'primary',
+        'protocol': protocol,
+        'started': round(offset, 3),
+        'duration': round(time.monotonic() - started - offset, 3),
+        'is_online': result.is_online,
+        'status_code': result.status_code,
+        'error': result.error_message[:200],
+    }]
+    return result
+
+
+async def _probe_origin(targets, assertions):
+    started = time.monotonic()
+    async with httpx.AsyncClient(http2=True, follow_redirects=True) as client:
+        return await asyncio.gather(*(
+            _probe_stream(client, target, target_assertions, started)
+            for target, target_assertions in zip(targets, assertions)
+        ))
+
+
+def probe_many(targets):
+    """Probe same-origin HTTPS targets concurrently over one client; results in target order."""
+    # Load assertions here: the ORM can't be used inside the event loop
+    assertions = [assertions_for(target) for target in targets]
+    return asyncio.run(_probe_origin(targets, assertions))
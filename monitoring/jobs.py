@@ -0,0 +1,143 @@
+"""
+Manual check jobs: probe a website and its internal apps concurrently, off the request thread.
+
+Job state lives in the database (ManualCheckJob) so whichever process runs the
+job, any web worker can report its progress. Jobs go to Celery when a real
+broker is reachable, otherwise to an in-process executor.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import ManualCheckJob
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How long job results stay pollable
+JOB_TTL = 3600
+
+# How long a broker reachability check is trusted
+BROKER_CHECK_TTL = 30
+
+# Concurrent manual-check jobs per process; each job probes its targets in parallel
+JOB_WORKERS = 4
+TARGET_WORKERS = 10
+
+_executor = None
+_executor_lock = threading.Lock()
+_state_lock = threading.Lock()
+_broker_checked = (0.0, False)
+
+
+def get_job(job_id):
+    """State of a job submitted within JOB_TTL, or None."""
+    job = ManualCheckJob.objects.filter(
+        job_id=job_id, created_at__gte=timezone.now() - timedelta(seconds=JOB_TTL)
+    ).first()
+    return job.as_dict() if job else None
+
+
+def _update_job(job_id, **changes):
+    # A job runs wholly in one process (its targets report from threads), so a process lock serializes its writes
+    with _state_lock:
+        job = ManualCheckJob.objects.get(job_id=job_id)
+        result = changes.pop('result', None)
+        for field, value in changes.items():
+            setattr(job, field, value)
+        if result is not None:
+            job.results = job.results + [result]
+        job.save()
+        return job.as_dict()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='manual-check')
+    return _executor
+
+
+def _broker_available():
+    """True when Celery would really queue the task (not eager) and its broker answers; checked every BROKER_CHECK_TTL."""
+    global _broker_checked
+    if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+        return False
+    checked_at, available = _broker_checked
+    if time.monotonic() - checked_at < BROKER_CHECK_TTL:
+        return available
+    try:
+        from server_checker.celery import app
+        with app.connection_for_write() as conn:
+            conn.ensure_connection(max_retries=1, timeout=2)
+        available = True
+    except Exception as e:
+        logger.warning(f"Celery broker unavailable, running manual checks in-process: {str(e)}")
+        available = False
+    _broker_checked = (time.monotonic(), available)
+    return available
+
+
+def _check_target(job_id, target):
+    from .models import InternalApp
+    from .services import MonitoringService
+
+    service = MonitoringService()
+    try:
+        if isinstance(target, InternalApp):
+            check = service.check_internal_app(target)
+            name = f"{target.website.name} - {target.name}"
+        else:
+            check = service.check_website(target)
+            name = target.name
+        _update_job(job_id, result={
+            'target': name,
+            'is_online': check.is_online,
+            'status_code': check.status_code,
+            'response_time': check.response_time,
+            'error_message': check.error_message,
+        })
+    except Exception as e:
+        logger.error(f"Manual check of {target} failed: {str(e)}")
+        _update_job(job_id, result={'target': str(target), 'is_online': False, 'error_message': str(e)})
+    finally:
+        connection.close()
+
+
+def run_manual_check(job_id, website_id):
+    """Probe a website and all its active internal apps concurrently, recording progress."""
+    from .models import Website
+
+    try:
+        website = Website.objects.get(id=website_id)
+        targets = [website] + list(website.internal_apps.filter(is_active=True).select_related('website'))
+        _update_job(job_id, status='running', total=len(targets))
+        with ThreadPoolExecutor(max_workers=min(TARGET_WORKERS, len(targets))) as executor:
+            list(executor.map(lambda target: _check_target(job_id, target), targets))
+        return _update_job(job_id, status='done')
+    except Exception as e:
+        logger.error(f"Manual check job {job_id} failed: {str(e)}")
+        return _update_job(job_id, status='failed', error=str(e))
+    finally:
+        connection.close()
+
+
+def submit_manual_check(website):
+    """Queue a manual check and return its job id immediately."""
+    job_id = uuid.uuid4().hex
+    # Expired jobs are no longer pollable; drop them as new ones come in
+    ManualCheckJob.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=JOB_TTL)).delete()
+    ManualCheckJob.objects.create(job_id=job_id, website=website)
+
+    if _broker_available():
+        from .tasks import run_manual_check_job
+        run_manual_check_job.delay(job_id, website.id)
+    else:
+        _get_executor().submit(run_manual_check, job_id, website.id)
+    return job_id
@@ -0,0 +1,166 @@
+"""
+Scheduled maintenance windows, compiled into an interval index.
+
+Active windows (one-off and recurring) are expanded into concrete intervals
+over a horizon and merged per target into sorted start/end arrays, so asking
+whether a target is in maintenance is one or two bisects. A website's windows
+cover its internal apps too. The index lives on the config snapshot: it is
+recompiled when windows are edited or the horizon runs out, and probes, check
+writes and alerts are skipped for targets inside a window.
+"""
+import itertools
+import time
+from bisect import bisect_right
+from datetime import timedelta
+from django.utils import timezone
+from .models import InternalApp
+from .planner import ProbeGroup
+import logging
+
+logger = logging.getLogger(__name__)
+
+RECURRENCE_PERIODS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+# How far ahead recurring windows are expanded before the index is recompiled
+HORIZON = timedelta(days=1)
+
+_compiled = itertools.count(1)
+
+
+def _epoch(at):
+    """Epoch seconds for None (now), a datetime or a number."""
+    if at is None:
+        return time.time()
+    return at.timestamp() if hasattr(at, 'timestamp') else at
+
+
+def target_key(target):
+    if isinstance(target, InternalApp):
+        return ('internal_app', target.pk)
+    return ('website', target.pk)
+
+
+def occurrences(window, start, end):
+    """(starts_at, ends_at) of each occurrence of a window overlapping start..end."""
+    period = RECURRENCE_PERIODS.get(window.recurrence)
+    if period is None:
+        if window.starts_at < end and window.ends_at > start:
+            yield window.starts_at, window.ends_at
+        return
+
+    # First occurrence that hasn't ended by start
+    n = max(0, (start - window.ends_at) // period + 1)
+    while True:
+        starts_at = window.starts_at + n * period
+        if starts_at >= end or (window.repeat_until is not None and starts_at > window.repeat_until):
+            return
+        yield starts_at, window.ends_at + n * period
+        n += 1
+
+
+class MaintenanceIndex:
+    """Merged maintenance intervals per target (epoch seconds), valid until valid_until."""
+
+    def __init__(self, intervals, valid_until):
+        self.version = next(_compiled)
+        self.valid_until = valid_until
+        self._starts = {}
+        self._ends = {}
+        boundaries = set()
+        for key, spans in intervals.items():
+            starts, ends = [], []
+            for start, end in sorted(spans):
+                if ends and start <= ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self._starts[key] = starts
+            self._ends[key] = ends
+            boundaries.update(starts)
+            boundaries.update(ends)
+        self._boundaries = sorted(boundaries)
+
+    def __bool__(self):
+        return bool(self._starts)
+
+    def _window_end(self, key, at):
+        starts = self._starts.get(key)
+        if not starts:
+            return None
+        i = bisect_right(starts, at) - 1
+        if i >= 0 and at < self._ends[key][i]:
+            return self._ends[key][i]
+        return None
+
+    def window_end(self, target, at=None):
+        """Epoch time the target's current maintenance ends, or None if it isn't in maintenance."""
+        at = _epoch(at)
+        end = self._window_end(target_key(target), at)
+        if end is None and isinstance(target, InternalApp):
+            end = self._window_end(('website', target.website_id), at)
+        return end
+
+    def active(self, target, at=None):
+        return self.window_end(target, at) is not None
+
+    def marker(self, at=None):
+        """Changes whenever any window starts or ends (or the index is recompiled)."""
+        return self.version, bisect_right(self._boundaries, _epoch(at))
+
+    def filter_groups(self, groups, at=None):
+        """Probe groups without their targets in maintenance; groups left empty are dropped."""
+        if not self:
+            return list(groups)
+
+        at = _epoch(at)
+        # One bisect per target with windows, then a set lookup per probed target
+        paused = {key for key in self._starts if self._window_end(key, at) is not None}
+        if not paused:
+            return list(groups)
+
+        def is_paused(target):
+            if isinstance(target, InternalApp):
+                return ('internal_app', target.pk) in paused or ('website', target.website_id) in paused
+            return ('website', target.pk) in paused
+
+        active = []
+        for group in groups:
+            targets = [target for target in group.targets if not is_paused(target)]
+            if len(targets) == len(group.targets):
+                active.append(group)
+            elif targets:
+                subset = ProbeGroup(group.key)
+                subset.targets = targets
+                active.append(subset)
+        return active
+
+
+def compile_index(windows, now=None):
+    """Expand windows over [now - a day, now + HORIZON] into a MaintenanceIndex."""
+    now = now or timezone.now()
+    start, end = now - timedelta(days=1), now + HORIZON
+    intervals = {}
+    for window in windows:
+        key = ('internal_app', window.internal_app_id) if window.internal_app_id else ('website', window.website_id)
+        for starts_at, ends_at in occurrences(window, start, end):
+            intervals.setdefault(key, []).append((starts_at.timestamp(), ends_at.timestamp()))
+    return MaintenanceIndex(intervals, end.timestamp())
+
+
+def get_index():
+    """Maintenance index of the current config snapshot."""
+    from .config import get_config
+    return get_config().maintenance
+
+
+def in_maintenance(target, at=None):
+    """True while a scheduled window covers the target; never raises (logs and says no)."""
+    try:
+        return get_index().active(target, at)
+    except Exception as e:
+        logger.warning(f"Could not check maintenance windows for {target}: {str(e)}")
+        return False
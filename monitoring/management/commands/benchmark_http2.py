@@ -0,0 +1,105 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from django.core.management.base import BaseCommand, CommandError
+from monitoring.models import Website, InternalApp
+from monitoring.probes import http_probe
+from monitoring import http2
+
+
+class Command(BaseCommand):
+    help = 'Compare HTTP/1.1 probing with HTTP/2 multiplexing per origin (wall time, CPU time, connections)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='HTTPS origin to benchmark with synthetic paths (default: all active HTTPS targets)',
+        )
+        parser.add_argument(
+            '--paths',
+            type=int,
+            default=12,
+            help='Number of paths to probe on --url (default: 12)',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=3,
+            help='Rounds per transport; the best round is reported (default: 3)',
+        )
+
+    def get_targets(self, options):
+        if options['url']:
+            # Unsaved targets: the benchmark never writes checks
+            return [
+                InternalApp(url=urljoin(options['url'], f'/?probe={i}'), timeout=30, expected_status_code=200)
+                for i in range(options['paths'])
+            ]
+        websites = Website.objects.filter(status='active', probe_type='http', url__startswith='https://')
+        apps = InternalApp.objects.filter(
+            is_active=True, website__status='active', probe_type='http', url__startswith='https://'
+        )
+        return list(websites) + list(apps)
+
+    def run_http1(self, targets):
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(
+                lambda t: http_probe(t.url, t.expected_status_code, t.timeout), targets
+            ))
+        # probe_session() never reuses connections: one per probe
+        return results, len(targets)
+
+    def run_http2(self, targets):
+        by_origin = {}
+        for target in targets:
+            by_origin.setdefault(http2.origin(target.url), []).append(target)
+
+        results, connections = [], 0
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            for origin_results in executor.map(http2.probe_many, by_origin.values()):
+                results.extend(origin_results)
+                protocols = [r.attempts[0]['protocol'] for r in origin_results]
+                # One shared connection for every HTTP/2 stream, one per HTTP/1.1 fallback
+                connections += ('HTTP/2' in protocols) + sum(1 for p in protocols if p and p != 'HTTP/2')
+        return results, connections
+
+    def measure(self, runner, targets, rounds):
+        best = None
+        for _ in range(rounds):
+            wall, cpu = time.perf_counter(), time.process_time()
+            results, connections = runner(targets)
+            sample = {
+                'wall': time.perf_counter() - wall,
+                'cpu': time.process_time() - cpu,
+                'connections': connections,
+                'online': sum(1 for r in results if r.is_online),
+            }
+            if best is None or sample['wall'] < best['wall']:
+                best = sample
+        return best
+
+    def handle(self, *args, **options):
+        if http2.httpx is None:
+            raise CommandError("HTTP/2 needs httpx with h2 support: pip install 'httpx[http2]'")
+
+        targets = self.get_targets(options)
+        if not targets:
+            raise CommandError('No active HTTPS targets to benchmark; pass --url')
+        origins = len({http2.origin(t.url) for t in targets})
+        self.stdout.write(f'{len(targets)} probes across {origins} origins, {options["rounds"]} rounds each')
+
+        rows = [
+            ('HTTP/1.1', self.measure(self.run_http1, targets, options['rounds'])),
+            ('HTTP/2', self.measure(self.run_http2, targets, options['rounds'])),
+        ]
+        for name, sample in rows:
+            self.stdout.write(
+                f'{name:<9} wall {sample["wall"]:.3f}s  cpu {sample["cpu"]:.3f}s  '
+                f'connections {sample["connections"]}  online {sample["online"]}/{len(targets)}'
+            )
+
+        h1, h2 = rows[0][1], rows[1][1]
+        self.stdout.write(self.style.SUCCESS(
+            f'HTTP/2 saved {h1["connections"] - h2["connections"]} connections and '
+            f'{h1["cpu"] - h2["cpu"]:.3f}s CPU per round'
+        ))
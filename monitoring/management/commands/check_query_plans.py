@@ -0,0 +1,167 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Min, Value
+from django.utils import timezone
+from monitoring.models import Website, InternalApp, MonitoringCheck, AlertLog
+from monitoring.pagination import seek
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Seed synthetic history and fail if any hot monitoring query uses a table scan or temp sort'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000000,
+            help='Number of synthetic monitoring checks to seed (default: 1,000,000)',
+        )
+        parser.add_argument(
+            '--websites',
+            type=int,
+            default=200,
+            help='Number of synthetic websites to spread the checks over',
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full plan for every query shape',
+        )
+
+    def get_query_shapes(self, website, internal_app):
+        """Every hot query shape in services.py, models.py, retention.py and views.py."""
+        now = timezone.now()
+        return [
+            ('website latest checks', MonitoringCheck.objects.filter(
+                website=website, internal_app__isnull=True
+            ).order_by('-check_time')[:20]),
+            ('internal app latest checks', MonitoringCheck.objects.filter(
+                internal_app=internal_app
+            ).order_by('-check_time')[:20]),
+            ('internal app online projection', MonitoringCheck.objects.filter(
+                internal_app=internal_app, is_online=True
+            ).order_by('-check_time').values('is_online', 'response_time')[:20]),
+            ('website detail checks', MonitoringCheck.objects.filter(
+                website=website
+            ).order_by('-check_time')[:20]),
+            ('retention age cutoff', MonitoringCheck.objects.filter(
+                website=website, internal_app__isnull=True, check_time__lt=now - timedelta(days=1)
+            ).order_by('check_time').values_list('check_time', flat=True)[:500]),
+            ('global age cutoff', MonitoringCheck.objects.filter(
+                check_time__lt=now - timedelta(days=30)
+            ).order_by('check_time').values_list('check_time', flat=True)[:500]),
+            ('active websites', Website.objects.filter(status='active')),
+            ('active internal apps', InternalApp.objects.filter(website=website, is_active=True)),
+            ('alert cooldown', AlertLog.objects.filter(
+                website=website, alert_type='down', sent_at__gte=now - timedelta(minutes=5)
+            )),
+            ('dashboard recent alerts', AlertLog.objects.filter(
+                is_cleared=False, sent_at__gte=now - timedelta(hours=24)
+            ).order_by('-sent_at')[:10]),
+            ('website recent alerts', AlertLog.objects.filter(
+                website=website, is_cleared=False, sent_at__gte=now - timedelta(days=7)
+            ).order_by('-sent_at')[:20]),
+            ('alerts page', AlertLog.objects.filter(is_cleared=False).order_by('-sent_at', '-pk')[:51]),
+            ('alerts page with cleared', AlertLog.objects.order_by('-sent_at', '-pk')[:51]),
+            ('alerts deep page', seek(
+                AlertLog.objects.filter(is_cleared=False), 'sent_at', (now - timedelta(days=1), 1)
+            ).order_by('-sent_at', '-pk')[:51]),
+            ('alerts newer page', seek(
+                AlertLog.objects.all(), 'sent_at', (now - timedelta(days=1), 1), descending=False
+            ).order_by('sent_at', 'pk')[:51]),
+        ]
+
+    def get_plan_problems(self, plan):
+        vendor = connection.vendor
+        problems = []
+        for line in plan.splitlines():
+            if vendor == 'sqlite':
+                if ' SCAN ' in f' {line} ' and 'INDEX' not in line:
+                    problems.append(line.strip())
+                elif 'USE TEMP B-TREE' in line:
+                    problems.append(line.strip())
+            elif vendor == 'postgresql':
+                if 'Seq Scan' in line or line.strip().startswith('Sort'):
+                    problems.append(line.strip())
+        return problems
+
+    def seed(self, rows, website_count):
+        now = timezone.now()
+        websites = Website.objects.bulk_create([
+            Website(name=f'plan-check-{i}', url=f'https://plan-check-{i}.example.com', alert_email='plan@example.com')
+            for i in range(website_count)
+        ])
+        apps = InternalApp.objects.bulk_create([
+            InternalApp(website=website, name=f'{app_type}-{i}', app_type=app_type, url=f'{website.url}/{app_type}')
+            for i, website in enumerate(websites)
+            for app_type in ('backend', 'landing', 'admin')
+        ])
+        targets = [(website, None) for website in websites] + [(app.website, app) for app in apps]
+
+        batch = []
+        for i in range(rows):
+            website, app = targets[i % len(targets)]
+            batch.append(MonitoringCheck(
+                website=website,
+                internal_app=app,
+                check_time=now - timedelta(seconds=i),
+                is_online=i % 17 != 0,
+                response_time=0.1,
+            ))
+            if len(batch) >= 10000:
+                MonitoringCheck.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            MonitoringCheck.objects.bulk_create(batch)
+
+        AlertLog.objects.bulk_create([
+            AlertLog(website=websites[i % len(websites)], alert_type='down', email_sent_to='plan@example.com',
+                     subject='Down', message='Down', is_cleared=i % 3 == 0)
+            for i in range(min(rows // 10, 100000))
+        ])
+        # sent_at is auto_now_add, so every alert got the same time; spread them back a minute apart
+        alerts = AlertLog.objects.filter(website__in=websites)
+        first_id = alerts.aggregate(first_id=Min('id'))['first_id']
+        if first_id is not None:
+            alerts.update(sent_at=F('sent_at') - ExpressionWrapper(
+                (F('id') - first_id) * Value(timedelta(minutes=1)), output_field=DurationField(),
+            ))
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return websites[0], apps[0]
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Query plan checks are not supported on {connection.vendor}')
+
+        failures = []
+        try:
+            with transaction.atomic():
+                self.stdout.write(f'Seeding {options["rows"]} checks...')
+                website, internal_app = self.seed(options['rows'], options['websites'])
+
+                for name, queryset in self.get_query_shapes(website, internal_app):
+                    plan = queryset.explain()
+                    problems = self.get_plan_problems(plan)
+                    if options['verbose_plans']:
+                        self.stdout.write(f'{name}:\n{plan}\n')
+                    if problems:
+                        failures.append((name, problems))
+                        self.stdout.write(self.style.ERROR(f'FAIL {name}: {"; ".join(problems)}'))
+                    else:
+                        self.stdout.write(self.style.SUCCESS(f'OK   {name}'))
+
+                # Never keep the synthetic data
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f'{len(failures)} query shape(s) fell back to a table scan or temp sort')
+        self.stdout.write(self.style.SUCCESS('All query shapes use indexes'))
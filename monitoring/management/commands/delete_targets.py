@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from monitoring.bulk import delete_targets
+
+
+class Command(BaseCommand):
+    help = 'Delete websites by URL in bulk, sending one summary email instead of one per website'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls',
+            nargs='*',
+            help='Website URLs to delete',
+        )
+        parser.add_argument(
+            '--file',
+            help='File with one website URL per line',
+        )
+        parser.add_argument(
+            '--no-email',
+            action='store_true',
+            help='Do not send the summary email',
+        )
+
+    def handle(self, *args, **options):
+        urls = list(options['urls'])
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as f:
+                urls += [line.strip() for line in f if line.strip()]
+        if not urls:
+            raise CommandError('Give at least one URL or --file')
+
+        deleted = delete_targets(urls, notify=not options['no_email'])
+        missing = set(urls) - {w.url for w in deleted}
+        for url in sorted(missing):
+            self.stdout.write(self.style.WARNING(f'No website with URL {url}'))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {len(deleted)} websites'))
@@ -0,0 +1,81 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from monitoring.exports import EXPORTS, EXPORT_FORMATS, iter_export, write_parquet
+
+
+class Command(BaseCommand):
+    help = 'Stream check history or alerts to CSV, NDJSON or Parquet with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kind',
+            choices=sorted(EXPORTS),
+            help='What to export',
+        )
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='csv',
+            help='Output format (default: csv)',
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write to (default: stdout; required for parquet)',
+        )
+        parser.add_argument(
+            '--website-id',
+            type=int,
+            help='Export only rows for a specific website by ID',
+        )
+        parser.add_argument(
+            '--since',
+            help='Only rows at or after this ISO datetime',
+        )
+        parser.add_argument(
+            '--until',
+            help='Only rows before this ISO datetime',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows fetched per keyset page (default: 5000)',
+        )
+
+    def parse_time(self, value, option):
+        if not value:
+            return None
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f'Invalid datetime for {option}: {value}')
+        return parsed
+
+    def handle(self, *args, **options):
+        filters = {
+            'website_id': options['website_id'],
+            'since': self.parse_time(options['since'], '--since'),
+            'until': self.parse_time(options['until'], '--until'),
+        }
+
+        if options['format'] == 'parquet':
+            if not options['output']:
+                raise CommandError('--output is required for parquet exports')
+            try:
+                total = write_parquet(options['kind'], options['output'], batch_size=options['batch_size'], **filters)
+            except ImportError:
+                raise CommandError('Parquet export requires pyarrow (pip install pyarrow)')
+            self.stderr.write(self.style.SUCCESS(f'Exported {total} rows to {options["output"]}'))
+            return
+
+        chunks = iter_export(options['kind'], options['format'], batch_size=options['batch_size'], **filters)
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f'Exported {options["kind"]} to {options["output"]}'))
+        else:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
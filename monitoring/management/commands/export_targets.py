@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from monitoring.bulk import TARGET_FORMATS, TargetImportError, export_targets
+
+
+class Command(BaseCommand):
+    help = 'Export all websites and internal apps in a format import_targets accepts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=TARGET_FORMATS,
+            default='json',
+            help='Output format (default: json)',
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write to (default: stdout)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            content = export_targets(options['format'])
+        except TargetImportError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            self.stdout.write(self.style.SUCCESS(f'Exported targets to {options["output"]}'))
+        else:
+            self.stdout.write(content, ending='')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from monitoring.statuspage import StatusPageGenerator, get_generator
+
+
+class Command(BaseCommand):
+    help = 'Render the public status page and its JSON to static files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Directory to write to (default: MONITORING_STATUS_PAGE_DIR)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite every file, even unchanged ones',
+        )
+
+    def handle(self, *args, **options):
+        generator = StatusPageGenerator(options['output']) if options['output'] else get_generator()
+        if generator is None:
+            raise CommandError('MONITORING_STATUS_PAGE_DIR is empty; pass --output')
+        written = generator.generate(force=options['force'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Status page in {generator.directory}: {len(written)} files written')
+        )
@@ -0,0 +1,55 @@
+import os
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from monitoring.bulk import TARGET_FORMATS, TargetImportError, import_targets
+
+
+class Command(BaseCommand):
+    help = 'Bulk import or update websites and internal apps from CSV, JSON or YAML (upsert by URL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='File to import, or - for stdin',
+        )
+        parser.add_argument(
+            '--format',
+            choices=TARGET_FORMATS,
+            help='Input format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate and report without saving anything',
+        )
+        parser.add_argument(
+            '--no-email',
+            action='store_true',
+            help='Do not send the summary email',
+        )
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        if not fmt:
+            extension = os.path.splitext(options['path'])[1].lstrip('.').lower()
+            fmt = 'yaml' if extension == 'yml' else extension
+            if fmt not in TARGET_FORMATS:
+                raise CommandError('Cannot tell the format from the file name; pass --format')
+
+        try:
+            if options['path'] == '-':
+                content = sys.stdin.read()
+            else:
+                with open(options['path'], encoding='utf-8-sig') as f:
+                    content = f.read()
+            result = import_targets(content, fmt, dry_run=options['dry_run'], notify=not options['no_email'])
+        except (OSError, TargetImportError) as e:
+            raise CommandError(str(e))
+
+        for row, errors in result.errors:
+            for field, messages in errors.items():
+                self.stdout.write(self.style.ERROR(f'{row}: {field}: {" ".join(messages)}'))
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        style = self.style.SUCCESS if result.ok else self.style.WARNING
+        self.stdout.write(style(f'{prefix}{result}'))
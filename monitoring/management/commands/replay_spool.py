@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from monitoring.spool import get_spool
+
+
+class Command(BaseCommand):
+    help = 'Load check results spooled locally during a database outage into the database'
+
+    def handle(self, *args, **options):
+        spool = get_spool()
+        pending = spool.pending()
+        if not pending:
+            self.stdout.write(self.style.SUCCESS('Spool is empty'))
+            return
+        replayed = spool.replay()
+        left = spool.pending()
+        self.stdout.write(
+            self.style.SUCCESS(f'Replayed {replayed} checks from {len(pending)} spool files ({len(left)} left)')
+        )
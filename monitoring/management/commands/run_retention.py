@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from monitoring.retention import RetentionService
+
+
+class Command(BaseCommand):
+    help = 'Trim monitoring history according to the retention policy and maintain the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Rows to delete per range delete (default: MONITORING_RETENTION_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Force an incremental VACUUM regardless of schedule',
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Force ANALYZE regardless of schedule',
+        )
+
+    def handle(self, *args, **options):
+        service = RetentionService(batch_size=options['batch_size'])
+        run = service.run(
+            vacuum=True if options['vacuum'] else None,
+            analyze=True if options['analyze'] else None,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Retention completed: {run.rows_deleted} rows deleted across '
+                f'{run.targets_processed} targets in {run.duration}s '
+                f'(vacuum: {run.vacuumed}, analyze: {run.analyzed})'
+            )
+        )
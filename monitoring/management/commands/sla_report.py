@@ -0,0 +1,95 @@
+import json
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from monitoring.models import Website
+from monitoring.sla import REPORT_FORMATS, build_report, month_range, report_csv
+
+
+class Command(BaseCommand):
+    help = 'Report uptime % and downtime per website for a month or date range from the daily SLA totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            help='Month to report as YYYY-MM (default: the current month)',
+        )
+        parser.add_argument(
+            '--start',
+            type=date.fromisoformat,
+            help='First day to report (YYYY-MM-DD); use with --end instead of --month',
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Last day to report, inclusive (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--website',
+            action='append',
+            help='Website id or name to include (repeatable; default: all but inactive)',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['text'] + REPORT_FORMATS,
+            default='text',
+            help='Output format (default: text)',
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write to (default: stdout)',
+        )
+
+    def handle(self, *args, **options):
+        if options['start'] or options['end']:
+            if options['month'] or not (options['start'] and options['end']):
+                raise CommandError('Use --start and --end together, without --month')
+            start, end = options['start'], options['end']
+            if start > end:
+                raise CommandError('--start must not be after --end')
+        else:
+            try:
+                start, end = month_range(options['month'] or timezone.now().strftime('%Y-%m'))
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        websites = None
+        if options['website']:
+            query = Q()
+            for value in options['website']:
+                query |= Q(id=int(value)) if value.isdigit() else Q(name=value)
+            websites = Website.objects.filter(query)
+
+        report = build_report(start, end, websites)
+        if options['format'] == 'json':
+            content = json.dumps(report, indent=2) + '\n'
+        elif options['format'] == 'csv':
+            content = report_csv(report)
+        else:
+            content = self.format_text(report)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            self.stdout.write(self.style.SUCCESS(
+                f'SLA report for {start} to {end} ({len(report["websites"])} websites) written to {options["output"]}'
+            ))
+        else:
+            self.stdout.write(content, ending='')
+
+    def format_text(self, report):
+        lines = [f'SLA report {report["start"]} to {report["end"]}', '']
+        lines.append(f'{"Target":<40} {"Uptime":>9} {"Downtime":>10} {"Checks":>8} {"Failed":>7}')
+        for website in report['websites']:
+            lines.append(self.format_row(website['name'], website))
+            for app in website['internal_apps']:
+                lines.append(self.format_row(f'  {app["name"]}', app))
+        return '\n'.join(lines) + '\n'
+
+    def format_row(self, name, totals):
+        uptime = '-' if totals['uptime_percentage'] is None else f'{totals["uptime_percentage"]:.3f}%'
+        return (
+            f'{name[:40]:<40} {uptime:>9} {totals["downtime_minutes"]:>8.1f}m '
+            f'{totals["checks"]:>8} {totals["failed_checks"]:>7}'
+        )
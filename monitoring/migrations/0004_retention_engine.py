@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0003_alter_internalapp_app_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetentionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('duration', models.FloatField(default=0, help_text='Time spent in seconds')),
+                ('targets_processed', models.PositiveIntegerField(default=0)),
+                ('rows_deleted', models.PositiveIntegerField(default=0)),
+                ('vacuumed', models.BooleanField(default=False)),
+                ('analyzed', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='internalapp',
+            name='retention_days',
+            field=models.PositiveIntegerField(blank=True, help_text='Delete checks older than this many days (blank = use website/global setting, 0 = keep forever)', null=True),
+        ),
+        migrations.AddField(
+            model_name='internalapp',
+            name='retention_max_checks',
+            field=models.PositiveIntegerField(blank=True, help_text='Checks to keep for this app (blank = use website/global setting, 0 = unlimited)', null=True),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='retention_days',
+            field=models.PositiveIntegerField(default=0, help_text='Delete checks older than this many days (0 = keep forever)'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='retention_max_checks',
+            field=models.PositiveIntegerField(default=20, help_text='Checks to keep per target (0 = unlimited)'),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='retention_days',
+            field=models.PositiveIntegerField(blank=True, help_text='Delete checks older than this many days (blank = use global setting, 0 = keep forever)', null=True),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='retention_max_checks',
+            field=models.PositiveIntegerField(blank=True, help_text='Checks to keep for this website (blank = use global setting, 0 = unlimited)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='monitoringcheck',
+            index=models.Index(fields=['check_time'], name='monitoring__check_t_6ef6ce_idx'),
+        ),
+    ]
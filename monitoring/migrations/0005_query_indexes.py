@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0004_retention_engine'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='monitoringcheck',
+            name='monitoring__interna_69f9ab_idx',
+        ),
+        migrations.AddIndex(
+            model_name='alertlog',
+            index=models.Index(fields=['-sent_at'], name='monitoring__sent_at_cf2d6c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alertlog',
+            index=models.Index(fields=['website', 'alert_type', 'sent_at'], name='alert_cooldown_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alertlog',
+            index=models.Index(condition=models.Q(('is_cleared', False)), fields=['-sent_at'], name='alert_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alertlog',
+            index=models.Index(condition=models.Q(('is_cleared', False)), fields=['website', '-sent_at'], name='alert_website_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='internalapp',
+            index=models.Index(fields=['website', 'is_active', 'name'], name='monitoring__website_3b0a43_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monitoringcheck',
+            index=models.Index(condition=models.Q(('internal_app__isnull', True)), fields=['website', '-check_time', 'is_online', 'response_time'], name='check_website_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monitoringcheck',
+            index=models.Index(condition=models.Q(('internal_app__isnull', False)), fields=['internal_app', '-check_time', 'is_online', 'response_time'], name='check_app_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='website',
+            index=models.Index(fields=['status', 'name'], name='monitoring__status_1c09aa_idx'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:33
+
+from django.db import migrations, models
+
+FTS_TABLE = 'monitoring_alertlog_fts'
+
+SQLITE_FORWARD = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(subject, message, content='monitoring_alertlog', content_rowid='id')",
+    f"""CREATE TRIGGER monitoring_alertlog_fts_insert AFTER INSERT ON monitoring_alertlog BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, subject, message) VALUES (new.id, new.subject, new.message);
+    END""",
+    f"""CREATE TRIGGER monitoring_alertlog_fts_delete AFTER DELETE ON monitoring_alertlog BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, subject, message) VALUES ('delete', old.id, old.subject, old.message);
+    END""",
+    f"""CREATE TRIGGER monitoring_alertlog_fts_update AFTER UPDATE OF subject, message ON monitoring_alertlog BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, subject, message) VALUES ('delete', old.id, old.subject, old.message);
+        INSERT INTO {FTS_TABLE}(rowid, subject, message) VALUES (new.id, new.subject, new.message);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS monitoring_alertlog_fts_insert",
+    "DROP TRIGGER IF EXISTS monitoring_alertlog_fts_delete",
+    "DROP TRIGGER IF EXISTS monitoring_alertlog_fts_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX monitoring_alertlog_search_idx ON monitoring_alertlog "
+    "USING GIN (to_tsvector('simple', subject || ' ' || message))",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS monitoring_alertlog_search_idx",
+]
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                # Search falls back to icontains when FTS5 is not compiled in
+                return
+        statements = SQLITE_FORWARD
+    elif connection.vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='alertlog',
+            name='monitoring__sent_at_cf2d6c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='alertlog',
+            name='alert_active_idx',
+        ),
+        migrations.AddIndex(
+            model_name='alertlog',
+            index=models.Index(fields=['-sent_at', '-id'], name='alert_sent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alertlog',
+            index=models.Index(condition=models.Q(('is_cleared', False)), fields=['-sent_at', '-id'], name='alert_active_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
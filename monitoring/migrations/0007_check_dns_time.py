@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0006_alert_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoringcheck',
+            name='dns_time',
+            field=models.FloatField(blank=True, help_text='DNS resolution time in seconds (excluded from response time)', null=True),
+        ),
+    ]
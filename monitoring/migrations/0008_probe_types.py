@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0007_check_dns_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='internalapp',
+            name='probe_type',
+            field=models.CharField(choices=[('http', 'HTTP GET'), ('tcp', 'TCP connect'), ('tls', 'TLS handshake'), ('dns', 'DNS query'), ('postgres', 'PostgreSQL ping'), ('mysql', 'MySQL ping'), ('redis', 'Redis ping')], default='http', help_text='How to check the target. Non-HTTP probes only use the host and port of the URL.', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='probe_type',
+            field=models.CharField(choices=[('http', 'HTTP GET'), ('tcp', 'TCP connect'), ('tls', 'TLS handshake'), ('dns', 'DNS query'), ('postgres', 'PostgreSQL ping'), ('mysql', 'MySQL ping'), ('redis', 'Redis ping')], default='http', help_text='How to check the target. Non-HTTP probes only use the host and port of the URL.', max_length=20),
+        ),
+    ]
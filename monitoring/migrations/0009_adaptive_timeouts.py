@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0008_probe_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='adaptive_timeout_factor',
+            field=models.FloatField(default=4.0, help_text='Adaptive deadline = p95 latency x this factor (capped at the target timeout)'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='adaptive_timeout_floor',
+            field=models.FloatField(default=1.0, help_text='Minimum adaptive deadline in seconds'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='adaptive_timeouts',
+            field=models.BooleanField(default=False, help_text="Derive probe deadlines from each target's recent latency"),
+        ),
+    ]
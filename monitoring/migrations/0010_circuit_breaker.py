@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0009_adaptive_timeouts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='breaker_base_backoff',
+            field=models.PositiveIntegerField(default=600, help_text='First backoff in seconds once the circuit opens'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='breaker_failure_threshold',
+            field=models.PositiveIntegerField(default=5, help_text='Consecutive failures before backing off a target (0 = never)'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='breaker_max_backoff',
+            field=models.PositiveIntegerField(default=3600, help_text='Maximum backoff in seconds between attempts'),
+        ),
+    ]
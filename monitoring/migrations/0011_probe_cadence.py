@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0010_circuit_breaker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='adaptive_cadence',
+            field=models.BooleanField(default=False, help_text='Re-probe quickly after a failure and slow down stable targets'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='confirm_interval',
+            field=models.PositiveIntegerField(default=15, help_text='Seconds between confirmation probes after a state change'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='flap_threshold',
+            field=models.PositiveIntegerField(default=4, help_text='State changes within the flap window that mark a target as flapping (0 = off)'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='flap_window_minutes',
+            field=models.PositiveIntegerField(default=30, help_text='Window in minutes for flap detection'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='max_check_interval',
+            field=models.PositiveIntegerField(default=900, help_text='Slowest interval in seconds a stable target backs off to'),
+        ),
+    ]
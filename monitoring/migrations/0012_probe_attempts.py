@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0011_probe_cadence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoringcheck',
+            name='attempts',
+            field=models.JSONField(blank=True, default=list, help_text='Timing and outcome of each probe attempt (hedges and retries)'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='hedged_probes',
+            field=models.BooleanField(default=False, help_text="Send a second attempt when the first is slower than the target's p95 latency"),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='probe_retries',
+            field=models.PositiveIntegerField(default=1, help_text='Immediate retries after a connection error (0 = none)'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0012_probe_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='internalapp',
+            name='allow_http2',
+            field=models.BooleanField(default=True, help_text='Allow multiplexing this probe over a shared HTTP/2 connection (untick to force HTTP/1.1)'),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='allow_http2',
+            field=models.BooleanField(default=True, help_text='Allow multiplexing this probe over a shared HTTP/2 connection (untick to force HTTP/1.1)'),
+        ),
+    ]
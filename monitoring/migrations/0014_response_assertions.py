@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0013_allow_http2'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseAssertion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assertion_type', models.CharField(choices=[('body_contains', 'Body contains'), ('body_not_contains', 'Body does not contain'), ('body_regex', 'Body matches regex'), ('json_path_equals', 'JSON path equals'), ('header_matches', 'Header matches regex'), ('max_response_time', 'Max response time (seconds)'), ('status_in', 'Status in (e.g. 200-299,301)')], max_length=30)),
+                ('target', models.CharField(blank=True, help_text='Header name or JSON path (e.g. data.status or items.0.id)', max_length=200)),
+                ('value', models.CharField(help_text='Text, regex, expected JSON value, seconds or status list', max_length=500)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('internal_app', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='assertions', to='monitoring.internalapp')),
+                ('website', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='assertions', to='monitoring.website')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
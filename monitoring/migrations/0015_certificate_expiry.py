@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0014_response_assertions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoringcheck',
+            name='cert_expires_at',
+            field=models.DateTimeField(blank=True, help_text='Expiry of the TLS certificate seen during the probe', null=True),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='cert_expiry_thresholds',
+            field=models.CharField(blank=True, default='30,14,7,1', help_text='Days before certificate expiry to alert at, comma-separated (blank = off)', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='alertlog',
+            name='alert_type',
+            field=models.CharField(choices=[('down', 'Server Down'), ('recovery', 'Server Recovery'), ('error', 'Error Alert'), ('cert_expiry', 'Certificate Expiry')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0015_certificate_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:59
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0016_settings_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoringcheck',
+            name='spool_id',
+            field=models.UUIDField(blank=True, editable=False, help_text='Id assigned at probe time; makes spool replays idempotent', null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='monitoringcheck',
+            name='check_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0017_check_spool_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='internalapp',
+            name='is_degraded',
+            field=models.BooleanField(default=False, editable=False, help_text='Latency is well above its recent baseline (set by the anomaly detector)'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='latency_anomaly_alerts',
+            field=models.BooleanField(default=False, help_text='Email when a target becomes degraded'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='latency_anomaly_detection',
+            field=models.BooleanField(default=True, help_text='Flag targets whose latency jumps well above their recent baseline as degraded'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='latency_anomaly_ratio',
+            field=models.FloatField(default=2.0, help_text='Latency must also be at least this multiple of the baseline median'),
+        ),
+        migrations.AddField(
+            model_name='monitoringsettings',
+            name='latency_anomaly_threshold',
+            field=models.FloatField(default=4.0, help_text='Robust z-score (distance from the median in MADs) above which latency is anomalous'),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='is_degraded',
+            field=models.BooleanField(default=False, editable=False, help_text='Latency is well above its recent baseline (set by the anomaly detector)'),
+        ),
+        migrations.AlterField(
+            model_name='alertlog',
+            name='alert_type',
+            field=models.CharField(choices=[('down', 'Server Down'), ('recovery', 'Server Recovery'), ('error', 'Error Alert'), ('cert_expiry', 'Certificate Expiry'), ('degraded', 'Performance Degraded')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0018_latency_anomalies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUptime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('checks', models.PositiveIntegerField(default=0)),
+                ('failed_checks', models.PositiveIntegerField(default=0)),
+                ('maintenance_checks', models.PositiveIntegerField(default=0, help_text='Checks taken during maintenance (not counted towards uptime)')),
+                ('monitored_seconds', models.FloatField(default=0, help_text='Time covered by checks, in seconds')),
+                ('downtime_seconds', models.FloatField(default=0, help_text='Time covered by failed checks, in seconds')),
+                ('last_check_at', models.DateTimeField(blank=True, null=True)),
+                ('internal_app', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_uptime', to='monitoring.internalapp')),
+                ('website', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_uptime', to='monitoring.website')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='monitoring__date_946150_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyuptime',
+            constraint=models.UniqueConstraint(condition=models.Q(('internal_app__isnull', True)), fields=('website', 'date'), name='daily_uptime_website_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyuptime',
+            constraint=models.UniqueConstraint(condition=models.Q(('internal_app__isnull', False)), fields=('internal_app', 'date'), name='daily_uptime_app_uniq'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0019_daily_uptime'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, help_text='What the maintenance is for (e.g. weekly deploy)', max_length=200)),
+                ('starts_at', models.DateTimeField(help_text='Start of the (first) window, UTC')),
+                ('ends_at', models.DateTimeField(help_text='End of the (first) window, UTC')),
+                ('recurrence', models.CharField(choices=[('none', 'One-off'), ('daily', 'Daily'), ('weekly', 'Weekly')], default='none', max_length=10)),
+                ('repeat_until', models.DateTimeField(blank=True, help_text='No recurring window starts after this (blank = repeat forever)', null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('internal_app', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_windows', to='monitoring.internalapp')),
+                ('website', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_windows', to='monitoring.website')),
+            ],
+            options={
+                'ordering': ['starts_at'],
+            },
+        ),
+    ]
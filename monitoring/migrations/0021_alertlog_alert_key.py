@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0020_maintenance_windows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertlog',
+            name='alert_key',
+            field=models.CharField(blank=True, default='', help_text="What the alert is about within the website (e.g. one target's certificate); alerts are deduplicated per key", max_length=200),
+        ),
+    ]
@@ -1,13 +1,73 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.validators import URLValidator
 from django.core.mail import send_mail
 from django.conf import settings
+from django.utils import timezone
 import requests
 import time
 from datetime import datetime, timedelta
 
 
+def _latest_check(check_filter, field):
+    """Subquery for a field of the newest check matching check_filter (relative to the outer row)."""
+    return models.Subquery(
+        MonitoringCheck.objects.filter(**check_filter).order_by('-check_time').values(field)[:1]
+    )
+
+
+def _recent_uptime(target_field, limit=20):
+    """Subquery for the uptime percentage over the newest `limit` checks of the outer target."""
+    recent_ids = MonitoringCheck.objects.filter(
+        **{target_field: models.OuterRef(models.OuterRef('pk'))}
+    ).order_by('-check_time').values('pk')[:limit]
+    uptime = MonitoringCheck.objects.filter(pk__in=models.Subquery(recent_ids)).order_by().values(
+        target_field
+    ).annotate(
+        pct=models.Avg(models.Case(
+            models.When(is_online=True, then=models.Value(100.0)),
+            default=models.Value(0.0),
+            output_field=models.FloatField(),
+        ))
+    ).values('pct')
+    return Coalesce(models.Subquery(uptime), models.Value(0.0))
+
+
+PROBE_TYPE_CHOICES = [
+    ('http', 'HTTP GET'),
+    ('tcp', 'TCP connect'),
+    ('tls', 'TLS handshake'),
+    ('dns', 'DNS query'),
+    ('postgres', 'PostgreSQL ping'),
+    ('mysql', 'MySQL ping'),
+    ('redis', 'Redis ping'),
+]
+
+PROBE_TYPE_HELP = "How to check the target. Non-HTTP probes only use the host and port of the URL."
+
+
+class WebsiteQuerySet(models.QuerySet):
+    def with_check_summary(self):
+        """Annotate latest status, last check time and recent uptime in the same query."""
+        check_filter = {'website': models.OuterRef('pk')}
+        return self.annotate(
+            latest_is_online=_latest_check(check_filter, 'is_online'),
+            latest_check_time=_latest_check(check_filter, 'check_time'),
+            recent_uptime=_recent_uptime('website'),
+        )
+
+
+class InternalAppQuerySet(models.QuerySet):
+    def with_check_summary(self):
+        """Annotate the latest status and last check time in the same query."""
+        check_filter = {'internal_app': models.OuterRef('pk')}
+        return self.annotate(
+            latest_is_online=_latest_check(check_filter, 'is_online'),
+            latest_check_time=_latest_check(check_filter, 'check_time'),
+        )
+
+
 class Website(models.Model):
     """Model to store website information and monitoring configuration."""
     
@@ -24,7 +84,12 @@ class Website(models.Model):
     check_interval = models.PositiveIntegerField(default=300, help_text="Check interval in seconds (default: 5 minutes)")
     timeout = models.PositiveIntegerField(default=30, help_text="Request timeout in seconds")
     expected_status_code = models.PositiveIntegerField(default=200, help_text="Expected HTTP status code")
+    probe_type = models.CharField(max_length=20, choices=PROBE_TYPE_CHOICES, default='http', help_text=PROBE_TYPE_HELP)
+    allow_http2 = models.BooleanField(default=True, help_text="Allow multiplexing this probe over a shared HTTP/2 connection (untick to force HTTP/1.1)")
     send_recovery_email = models.BooleanField(default=True, help_text="Send email when server recovers")
+    retention_max_checks = models.PositiveIntegerField(null=True, blank=True, help_text="Checks to keep for this website (blank = use global setting, 0 = unlimited)")
+    retention_days = models.PositiveIntegerField(null=True, blank=True, help_text="Delete checks older than this many days (blank = use global setting, 0 = keep forever)")
+    is_degraded = models.BooleanField(default=False, editable=False, help_text="Latency is well above its recent baseline (set by the anomaly detector)")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -32,8 +97,13 @@ class Website(models.Model):
     alert_email = models.EmailField(help_text="Email address to send alerts to")
     recovery_email = models.EmailField(blank=True, help_text="Email address for recovery notifications (if different from alert email)")
     
+    objects = WebsiteQuerySet.as_manager()
+    
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['status', 'name']),
+        ]
     
     def __str__(self):
         return self.name
@@ -41,18 +111,24 @@ class Website(models.Model):
     @property
     def is_online(self):
         """Check if the website is currently online based on the very latest check."""
+        if hasattr(self, 'latest_is_online'):
+            return bool(self.latest_is_online)
         latest_check = self.checks.first()
         return latest_check.is_online if latest_check else False
     
     @property
     def last_check_time(self):
         """Get the time of the last check."""
+        if hasattr(self, 'latest_check_time'):
+            return self.latest_check_time
         latest_check = self.checks.first()
         return latest_check.check_time if latest_check else None
     
     @property
     def uptime_percentage(self):
         """Calculate uptime percentage for the last 20 checks (as configured)."""
+        if hasattr(self, 'recent_uptime'):
+            return round(self.recent_uptime, 2)
         checks = self.checks.all()[:20]
         if not checks:
             return 0
@@ -81,13 +157,23 @@ class InternalApp(models.Model):
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     expected_status_code = models.PositiveIntegerField(default=200)
+    probe_type = models.CharField(max_length=20, choices=PROBE_TYPE_CHOICES, default='http', help_text=PROBE_TYPE_HELP)
+    allow_http2 = models.BooleanField(default=True, help_text="Allow multiplexing this probe over a shared HTTP/2 connection (untick to force HTTP/1.1)")
     timeout = models.PositiveIntegerField(default=30)
+    retention_max_checks = models.PositiveIntegerField(null=True, blank=True, help_text="Checks to keep for this app (blank = use website/global setting, 0 = unlimited)")
+    retention_days = models.PositiveIntegerField(null=True, blank=True, help_text="Delete checks older than this many days (blank = use website/global setting, 0 = keep forever)")
+    is_degraded = models.BooleanField(default=False, editable=False, help_text="Latency is well above its recent baseline (set by the anomaly detector)")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = InternalAppQuerySet.as_manager()
+    
     class Meta:
         ordering = ['name']
         unique_together = ['website', 'name']
+        indexes = [
+            models.Index(fields=['website', 'is_active', 'name']),
+        ]
     
     def __str__(self):
         return f"{self.website.name} - {self.name}"
@@ -95,6 +181,12 @@ class InternalApp(models.Model):
     @property
     def is_online(self):
         """Check if the internal app is currently online based on the very latest check."""
+        if hasattr(self, 'latest_is_online'):
+            return bool(self.latest_is_online)
+        from .ringbuffer import recent_results
+        recent = recent_results(self, 1)
+        if recent is not None:
+            return recent[0].is_online if recent else False
         latest_check = self.checks.first()
         return latest_check.is_online if latest_check else False
 
@@ -104,41 +196,34 @@ class MonitoringCheck(models.Model):
     
     website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name='checks', null=True, blank=True)
     internal_app = models.ForeignKey(InternalApp, on_delete=models.CASCADE, related_name='checks', null=True, blank=True)
-    check_time = models.DateTimeField(auto_now_add=True)
+    check_time = models.DateTimeField(default=timezone.now, editable=False)
     is_online = models.BooleanField(default=False)
     response_time = models.FloatField(null=True, blank=True, help_text="Response time in seconds")
+    dns_time = models.FloatField(null=True, blank=True, help_text="DNS resolution time in seconds (excluded from response time)")
     status_code = models.PositiveIntegerField(null=True, blank=True)
     error_message = models.TextField(blank=True)
     response_content = models.TextField(blank=True, help_text="First 1000 characters of response")
+    attempts = models.JSONField(default=list, blank=True, help_text="Timing and outcome of each probe attempt (hedges and retries)")
+    cert_expires_at = models.DateTimeField(null=True, blank=True, help_text="Expiry of the TLS certificate seen during the probe")
+    spool_id = models.UUIDField(null=True, blank=True, unique=True, editable=False, help_text="Id assigned at probe time; makes spool replays idempotent")
     
     class Meta:
         ordering = ['-check_time']
         indexes = [
             models.Index(fields=['website', 'check_time']),
-            models.Index(fields=['internal_app', 'check_time']),
+            models.Index(fields=['check_time']),
+            # Covering indexes for "latest N checks" per target, including is_online/response_time
+            models.Index(
+                fields=['website', '-check_time', 'is_online', 'response_time'],
+                condition=models.Q(internal_app__isnull=True),
+                name='check_website_latest_idx',
+            ),
+            models.Index(
+                fields=['internal_app', '-check_time', 'is_online', 'response_time'],
+                condition=models.Q(internal_app__isnull=False),
+                name='check_app_latest_idx',
+            ),
         ]
-
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        
-        # Keep only the last 20 checks for this specific target
-        if self.website and not self.internal_app:
-            # Website checks
-            old_checks = MonitoringCheck.objects.filter(
-                website=self.website, 
-                internal_app__isnull=True
-            ).order_by('-check_time')[20:]
-            if old_checks:
-                old_ids = [c.id for c in old_checks]
-                MonitoringCheck.objects.filter(id__in=old_ids).delete()
-        elif self.internal_app:
-            # Internal App checks
-            old_checks = MonitoringCheck.objects.filter(
-                internal_app=self.internal_app
-            ).order_by('-check_time')[20:]
-            if old_checks:
-                old_ids = [c.id for c in old_checks]
-                MonitoringCheck.objects.filter(id__in=old_ids).delete()
     
     def __str__(self):
         target = self.website or self.internal_app
@@ -186,6 +271,91 @@ class MonitoringCheck(models.Model):
         return check
 
 
+class ResponseAssertion(models.Model):
+    """A condition a probe response must meet for the target to count as up."""
+    
+    ASSERTION_TYPES = [
+        ('body_contains', 'Body contains'),
+        ('body_not_contains', 'Body does not contain'),
+        ('body_regex', 'Body matches regex'),
+        ('json_path_equals', 'JSON path equals'),
+        ('header_matches', 'Header matches regex'),
+        ('max_response_time', 'Max response time (seconds)'),
+        ('status_in', 'Status in (e.g. 200-299,301)'),
+    ]
+    
+    website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name='assertions', null=True, blank=True)
+    internal_app = models.ForeignKey(InternalApp, on_delete=models.CASCADE, related_name='assertions', null=True, blank=True)
+    assertion_type = models.CharField(max_length=30, choices=ASSERTION_TYPES)
+    target = models.CharField(max_length=200, blank=True, help_text="Header name or JSON path (e.g. data.status or items.0.id)")
+    value = models.CharField(max_length=500, help_text="Text, regex, expected JSON value, seconds or status list")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        if self.target:
+            return f"{self.get_assertion_type_display()} {self.target}: {self.value}"
+        return f"{self.get_assertion_type_display()}: {self.value}"
+    
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .assertions import compile_assertion
+        
+        if self.website_id and self.internal_app_id:
+            raise ValidationError("An assertion belongs to either a website or an internal app, not both.")
+        if self.assertion_type in ('json_path_equals', 'header_matches') and not self.target:
+            raise ValidationError({'target': "This assertion type needs a header name or JSON path."})
+        try:
+            compile_assertion(self)
+        except ValueError as e:
+            raise ValidationError({'value': str(e)})
+
+
+class MaintenanceWindow(models.Model):
+    """Scheduled maintenance for a website (and its internal apps) or one internal app: no probes, writes or alerts."""
+    
+    RECURRENCE_CHOICES = [
+        ('none', 'One-off'),
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+    ]
+    
+    website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name='maintenance_windows', null=True, blank=True)
+    internal_app = models.ForeignKey(InternalApp, on_delete=models.CASCADE, related_name='maintenance_windows', null=True, blank=True)
+    name = models.CharField(max_length=200, blank=True, help_text="What the maintenance is for (e.g. weekly deploy)")
+    starts_at = models.DateTimeField(help_text="Start of the (first) window, UTC")
+    ends_at = models.DateTimeField(help_text="End of the (first) window, UTC")
+    recurrence = models.CharField(max_length=10, choices=RECURRENCE_CHOICES, default='none')
+    repeat_until = models.DateTimeField(null=True, blank=True, help_text="No recurring window starts after this (blank = repeat forever)")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['starts_at']
+    
+    def __str__(self):
+        target = self.internal_app or self.website
+        return f"{self.name or 'Maintenance'} for {target} ({self.get_recurrence_display()})"
+    
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .maintenance import RECURRENCE_PERIODS
+        
+        if bool(self.website_id) == bool(self.internal_app_id):
+            raise ValidationError("A maintenance window belongs to either a website or an internal app.")
+        if self.starts_at and self.ends_at:
+            if self.ends_at <= self.starts_at:
+                raise ValidationError({'ends_at': "The window must end after it starts."})
+            period = RECURRENCE_PERIODS.get(self.recurrence)
+            if period and self.ends_at - self.starts_at >= period:
+                raise ValidationError({'ends_at': f"A {self.recurrence} window must be shorter than its {period.days}-day period."})
+
+
 class AlertLog(models.Model):
     """Model to track sent alerts and prevent spam."""
     
@@ -193,6 +363,8 @@ class AlertLog(models.Model):
         ('down', 'Server Down'),
         ('recovery', 'Server Recovery'),
         ('error', 'Error Alert'),
+        ('cert_expiry', 'Certificate Expiry'),
+        ('degraded', 'Performance Degraded'),
     ]
     
     website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name='alerts')
@@ -203,15 +375,26 @@ class AlertLog(models.Model):
     message = models.TextField()
     is_sent = models.BooleanField(default=True)
     is_cleared = models.BooleanField(default=False)
+    alert_key = models.CharField(max_length=200, blank=True, default='', help_text="What the alert is about within the website (e.g. one target's certificate); alerts are deduplicated per key")
     
     class Meta:
         ordering = ['-sent_at']
+        indexes = [
+            models.Index(fields=['-sent_at', '-id'], name='alert_sent_idx'),
+            models.Index(fields=['website', 'alert_type', 'sent_at'], name='alert_cooldown_idx'),
+            models.Index(fields=['-sent_at', '-id'], condition=models.Q(is_cleared=False), name='alert_active_idx'),
+            models.Index(
+                fields=['website', '-sent_at'],
+                condition=models.Q(is_cleared=False),
+                name='alert_website_active_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.website.name} - {self.alert_type} at {self.sent_at}"
     
     @classmethod
-    def should_send_alert(cls, website, alert_type):
+    def should_send_alert(cls, website, alert_type, alert_key=''):
         """Check if we should send an alert (prevent spam)."""
         from django.utils import timezone
         
@@ -219,15 +402,16 @@ class AlertLog(models.Model):
         recent_alert = cls.objects.filter(
             website=website,
             alert_type=alert_type,
+            alert_key=alert_key,
             sent_at__gte=timezone.now() - timedelta(minutes=5)
         ).exists()
         
         return not recent_alert
     
     @classmethod
-    def send_alert(cls, website, alert_type, subject, message, email_to=None):
+    def send_alert(cls, website, alert_type, subject, message, email_to=None, alert_key=''):
         """Send an alert email and log it."""
-        if not cls.should_send_alert(website, alert_type):
+        if not cls.should_send_alert(website, alert_type, alert_key):
             return False
         
         email_to = email_to or website.alert_email
@@ -247,7 +431,8 @@ class AlertLog(models.Model):
                 alert_type=alert_type,
                 email_sent_to=email_to,
                 subject=subject,
-                message=message
+                message=message,
+                alert_key=alert_key
             )
             return True
             
@@ -259,7 +444,8 @@ class AlertLog(models.Model):
                 email_sent_to=email_to,
                 subject=subject,
                 message=message,
-                is_sent=False
+                is_sent=False,
+                alert_key=alert_key
             )
             return False
 
@@ -271,6 +457,27 @@ class MonitoringSettings(models.Model):
     global_check_interval = models.PositiveIntegerField(default=300, help_text="Global check interval in seconds")
     max_concurrent_checks = models.PositiveIntegerField(default=10, help_text="Maximum concurrent monitoring checks")
     alert_cooldown_minutes = models.PositiveIntegerField(default=5, help_text="Minutes to wait before sending duplicate alerts")
+    retention_max_checks = models.PositiveIntegerField(default=20, help_text="Checks to keep per target (0 = unlimited)")
+    retention_days = models.PositiveIntegerField(default=0, help_text="Delete checks older than this many days (0 = keep forever)")
+    adaptive_timeouts = models.BooleanField(default=False, help_text="Derive probe deadlines from each target's recent latency")
+    adaptive_timeout_factor = models.FloatField(default=4.0, help_text="Adaptive deadline = p95 latency x this factor (capped at the target timeout)")
+    adaptive_timeout_floor = models.FloatField(default=1.0, help_text="Minimum adaptive deadline in seconds")
+    breaker_failure_threshold = models.PositiveIntegerField(default=5, help_text="Consecutive failures before backing off a target (0 = never)")
+    breaker_base_backoff = models.PositiveIntegerField(default=600, help_text="First backoff in seconds once the circuit opens")
+    breaker_max_backoff = models.PositiveIntegerField(default=3600, help_text="Maximum backoff in seconds between attempts")
+    adaptive_cadence = models.BooleanField(default=False, help_text="Re-probe quickly after a failure and slow down stable targets")
+    confirm_interval = models.PositiveIntegerField(default=15, help_text="Seconds between confirmation probes after a state change")
+    max_check_interval = models.PositiveIntegerField(default=900, help_text="Slowest interval in seconds a stable target backs off to")
+    flap_threshold = models.PositiveIntegerField(default=4, help_text="State changes within the flap window that mark a target as flapping (0 = off)")
+    flap_window_minutes = models.PositiveIntegerField(default=30, help_text="Window in minutes for flap detection")
+    hedged_probes = models.BooleanField(default=False, help_text="Send a second attempt when the first is slower than the target's p95 latency")
+    probe_retries = models.PositiveIntegerField(default=1, help_text="Immediate retries after a connection error (0 = none)")
+    cert_expiry_thresholds = models.CharField(max_length=100, default='30,14,7,1', blank=True, help_text="Days before certificate expiry to alert at, comma-separated (blank = off)")
+    latency_anomaly_detection = models.BooleanField(default=True, help_text="Flag targets whose latency jumps well above their recent baseline as degraded")
+    latency_anomaly_alerts = models.BooleanField(default=False, help_text="Email when a target becomes degraded")
+    latency_anomaly_threshold = models.FloatField(default=4.0, help_text="Robust z-score (distance from the median in MADs) above which latency is anomalous")
+    latency_anomaly_ratio = models.FloatField(default=2.0, help_text="Latency must also be at least this multiple of the baseline median")
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Monitoring Settings"
@@ -282,8 +489,112 @@ class MonitoringSettings(models.Model):
             return
         super().save(*args, **kwargs)
     
+    def get_cert_expiry_thresholds(self):
+        """Alert thresholds in days, smallest first."""
+        return sorted({int(part) for part in self.cert_expiry_thresholds.split(',') if part.strip().isdigit()})
+    
     @classmethod
     def get_settings(cls):
         """Get the monitoring settings, creating if they don't exist."""
         settings, created = cls.objects.get_or_create(pk=1)
         return settings
+
+
+class RetentionRun(models.Model):
+    """Statistics for a single run of the retention engine."""
+    
+    started_at = models.DateTimeField(auto_now_add=True)
+    duration = models.FloatField(default=0, help_text="Time spent in seconds")
+    targets_processed = models.PositiveIntegerField(default=0)
+    rows_deleted = models.PositiveIntegerField(default=0)
+    vacuumed = models.BooleanField(default=False)
+    analyzed = models.BooleanField(default=False)
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"Retention run at {self.started_at} ({self.rows_deleted} rows deleted)"
+
+
+class DailyUptime(models.Model):
+    """Running uptime totals for one website or internal app on one day (UTC), the basis of SLA reports."""
+    
+    website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name='daily_uptime')
+    internal_app = models.ForeignKey(InternalApp, on_delete=models.CASCADE, related_name='daily_uptime', null=True, blank=True)
+    date = models.DateField()
+    checks = models.PositiveIntegerField(default=0)
+    failed_checks = models.PositiveIntegerField(default=0)
+    maintenance_checks = models.PositiveIntegerField(default=0, help_text="Checks taken during maintenance (not counted towards uptime)")
+    monitored_seconds = models.FloatField(default=0, help_text="Time covered by checks, in seconds")
+    downtime_seconds = models.FloatField(default=0, help_text="Time covered by failed checks, in seconds")
+    last_check_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['website', 'date'],
+                condition=models.Q(internal_app__isnull=True),
+                name='daily_uptime_website_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['internal_app', 'date'],
+                condition=models.Q(internal_app__isnull=False),
+                name='daily_uptime_app_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.internal_app or self.website} on {self.date}"
+    
+    @property
+    def uptime_percentage(self):
+        if not self.monitored_seconds:
+            return None
+        return round(100 * (1 - self.downtime_seconds / self.monitored_seconds), 3)
+
+
+class ManualCheckJob(models.Model):
+    """Progress and results of a manual check, shared by web and worker processes."""
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    job_id = models.CharField(max_length=32, unique=True)
+    website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name='manual_check_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    total = models.PositiveIntegerField(null=True, blank=True)
+    results = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Manual check of {self.website.name} ({self.status})"
+    
+    def as_dict(self):
+        state = {
+            'job_id': self.job_id,
+            'website_id': self.website_id,
+            'status': self.status,
+            'total': self.total,
+            'completed': len(self.results),
+            'results': self.results,
+        }
+        if self.error:
+            state['error'] = self.error
+        return state
@@ -0,0 +1,81 @@
+"""
+Keyset (seek) pagination over a timestamp column with the primary key as tie-breaker.
+"""
+from datetime import datetime
+from django.db.models import Q
+
+
+def encode_cursor(timestamp, pk):
+    return f"{timestamp.isoformat()}_{pk}"
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, pk) for a cursor string, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        timestamp, pk = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(timestamp), int(pk)
+    except ValueError:
+        return None
+
+
+def seek(queryset, field, cursor, descending=True):
+    """Restrict a queryset to rows strictly after the cursor in the given direction."""
+    timestamp, pk = cursor
+    op = 'lt' if descending else 'gt'
+    # The redundant inclusive bound lets the database turn this into an index range scan
+    return queryset.filter(**{f'{field}__{op}e': timestamp}).filter(
+        Q(**{f'{field}__{op}': timestamp}) | Q(**{f'pk__{op}': pk})
+    )
+
+
+class KeysetPage:
+    """A page of results plus cursors for the older and newer neighbouring pages."""
+
+    def __init__(self, queryset, field, per_page, before=None, after=None):
+        self.field = field
+        newest_first = queryset.order_by(f'-{field}', '-pk')
+
+        if after:
+            rows = list(seek(queryset, field, after, descending=False).order_by(field, 'pk')[:per_page + 1])
+            self.has_previous = len(rows) > per_page
+            rows = rows[:per_page][::-1]
+            self.has_next = True
+        else:
+            if before:
+                newest_first = seek(newest_first, field, before)
+            rows = list(newest_first[:per_page + 1])
+            self.has_next = len(rows) > per_page
+            rows = rows[:per_page]
+            self.has_previous = bool(before)
+
+        self.object_list = rows
+
+        if self.has_previous and after is None and rows:
+            # Only the first page has nothing newer; deep pages check cheaply via the index
+            self.has_previous = seek(queryset, field, self._cursor_tuple(rows[0]), descending=False).exists()
+
+    def _cursor_tuple(self, obj):
+        return getattr(obj, self.field), obj.pk
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return encode_cursor(*self._cursor_tuple(self.object_list[-1]))
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return encode_cursor(*self._cursor_tuple(self.object_list[0]))
+        return None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
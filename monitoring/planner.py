@@ -0,0 +1,69 @@
+"""
+Cycle planner: group targets that would send an identical probe so each is sent once.
+"""
+from urllib.parse import urlsplit, urlunsplit
+from .probes import DEFAULT_PORTS
+from .assertions import assertions_for
+
+# Targets share a probe only if their timeouts fall in the same class
+TIMEOUT_CLASSES = [1, 2, 5, 10, 15, 30, 60, 120]
+
+
+def normalize_url(url):
+    """Canonical form of a URL: lowercase scheme/host, no default port, no fragment, '/' path."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    netloc = host if ':' not in host else f'[{host}]'
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f'{netloc}:{parts.port}'
+    if parts.username:
+        credentials = parts.username + (f':{parts.password}' if parts.password else '')
+        netloc = f'{credentials}@{netloc}'
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+def timeout_class(timeout):
+    return next((limit for limit in TIMEOUT_CLASSES if timeout <= limit), timeout)
+
+
+def probe_key(target):
+    """Everything that makes two targets' probes interchangeable."""
+    return (
+        normalize_url(target.url),
+        target.probe_type,
+        'GET',
+        target.expected_status_code,
+        timeout_class(target.timeout),
+        assertions_for(target).key,
+    )
+
+
+class ProbeGroup:
+    """Targets that subscribe to the result of one shared probe."""
+
+    def __init__(self, key):
+        self.key = key
+        self.targets = []
+
+    @property
+    def leader(self):
+        """The target actually probed: the one with the longest timeout in the group."""
+        return max(self.targets, key=lambda target: target.timeout)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __str__(self):
+        return f"{self.key[0]} ({len(self.targets)} targets)"
+
+
+def plan_cycle(targets):
+    """Group targets by probe key, preserving first-seen order."""
+    groups = {}
+    for target in targets:
+        key = probe_key(target)
+        if key not in groups:
+            groups[key] = ProbeGroup(key)
+        groups[key].targets.append(target)
+    return list(groups.values())
@@ -0,0 +1,393 @@
+"""
+Probe engine: the network side of a monitoring check, independent of the database.
+"""
+import codecs
+import copy
+import socket
+import ssl
+import struct
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.timeout import _DEFAULT_TIMEOUT
+from .dns_cache import get_dns_cache
+from .assertions import assertions_for
+from .certificates import get_certificate_cache
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Ports used by non-HTTP probes when the target URL has no explicit port
+PROBE_DEFAULT_PORTS = {'tls': 443, 'postgres': 5432, 'mysql': 3306, 'redis': 6379}
+
+# Probes that start with a TCP connect to the target's port, so a bare connect can pre-check them
+TCP_PRECHECK_TYPES = {'http', 'tls', 'postgres', 'mysql', 'redis'}
+
+# PostgreSQL SSLRequest packet: length 8, request code 80877103
+POSTGRES_SSL_REQUEST = struct.pack('!II', 8, 80877103)
+
+
+class ProbeResult:
+    """Outcome of a single probe, ready to be stored as a MonitoringCheck."""
+
+    def __init__(self, is_online=False, status_code=None, response_time=None, dns_time=None,
+                 error_message='', response_content='', timed_out=False, connection_error=False):
+        self.is_online = is_online
+        self.status_code = status_code
+        self.response_time = response_time
+        self.dns_time = dns_time
+        self.error_message = error_message
+        self.response_content = response_content
+        self.timed_out = timed_out
+        # Refused/reset connections are worth an immediate retry; timeouts and bad statuses are not
+        self.connection_error = connection_error
+        self.attempts = []
+        self.certificate = None
+
+    def for_timeout(self, timeout):
+        """This result as seen by a target with a shorter timeout than the one probed with."""
+        if self.response_time is None or self.response_time <= timeout:
+            return self
+        result = copy.copy(self)
+        result.is_online = False
+        result.timed_out = True
+        result.status_code = None
+        result.response_content = ''
+        result.error_message = f"Request timed out after {timeout} seconds"
+        return result
+
+    def as_check_fields(self):
+        return {
+            'is_online': self.is_online,
+            'status_code': self.status_code,
+            'response_time': self.response_time,
+            'dns_time': self.dns_time,
+            'error_message': self.error_message,
+            'response_content': self.response_content,
+            'attempts': self.attempts,
+            'cert_expires_at': self.certificate.not_after if self.certificate else None,
+        }
+
+
+def split_host_port(url, default_port=None):
+    """Return (host, port) for a URL, falling back to the given or the scheme's default port."""
+    parts = urlsplit(url)
+    return parts.hostname, parts.port or default_port or DEFAULT_PORTS.get(parts.scheme, 80)
+
+
+def connect_cached(host, port, timeout):
+    """Open a TCP connection using the DNS cache; returns (socket, dns_time)."""
+    start_time = time.time()
+    addresses = get_dns_cache().resolve(host, port)
+    dns_time = round(time.time() - start_time, 3)
+
+    error = None
+    for family, socktype, proto, _, sockaddr in addresses:
+        sock = socket.socket(family, socktype, proto)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(sockaddr)
+            return sock, dns_time
+        except socket.timeout:
+            sock.close()
+            raise
+        except OSError as e:
+            error = e
+            sock.close()
+    raise error or OSError(f"No addresses found for {host}")
+
+
+class _CachedDNSConnectionMixin:
+    """Open sockets using addresses from the shared DNS cache instead of resolving every time."""
+
+    def _new_conn(self):
+        try:
+            addresses = get_dns_cache().resolve(self._dns_host.rstrip('.'), self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+
+        error = None
+        for family, socktype, proto, _, sockaddr in addresses:
+            sock = None
+            try:
+                sock = socket.socket(family, socktype, proto)
+                for option in self.socket_options or []:
+                    sock.setsockopt(*option)
+                if self.timeout is not _DEFAULT_TIMEOUT:
+                    sock.settimeout(self.timeout)
+                if self.source_address:
+                    sock.bind(self.source_address)
+                sock.connect(sockaddr)
+                return sock
+            except socket.timeout as e:
+                if sock is not None:
+                    sock.close()
+                raise ConnectTimeoutError(
+                    self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+                ) from e
+            except OSError as e:
+                error = e
+                if sock is not None:
+                    sock.close()
+
+        raise NewConnectionError(self, f"Failed to establish a new connection: {error}")
+
+
+class CachedDNSHTTPConnection(_CachedDNSConnectionMixin, HTTPConnection):
+    pass
+
+
+class CachedDNSHTTPSConnection(_CachedDNSConnectionMixin, HTTPSConnection):
+    def connect(self):
+        super().connect()
+        # Keep the peer certificate from the handshake that just happened
+        get_certificate_cache().capture(self.host, self.port, self.sock)
+
+
+class CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CachedDNSHTTPConnection
+
+
+class CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CachedDNSHTTPSConnection
+
+
+class DNSCachingAdapter(HTTPAdapter):
+    """requests adapter whose connection pools resolve hostnames through the DNS cache."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CachedDNSHTTPConnectionPool,
+            'https': CachedDNSHTTPSConnectionPool,
+        }
+
+
+def probe_session():
+    """Return a fresh session (no connection reuse between probes) backed by the DNS cache."""
+    session = requests.Session()
+    adapter = DNSCachingAdapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def resolve_url(url):
+    """Resolve a URL's host through the DNS cache and return the time spent in seconds."""
+    host, port = split_host_port(url)
+    start_time = time.time()
+    get_dns_cache().resolve(host, port)
+    return round(time.time() - start_time, 3)
+
+
+def iter_text(response, chunk_size=8192):
+    """Decode a streamed response body chunk by chunk."""
+    try:
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for chunk in response.iter_content(chunk_size):
+        yield decoder.decode(chunk)
+
+
+def http_probe(url, expected_status_code=200, timeout=30, assertions=None):
+    """GET a URL and check the status (and any assertions), timing DNS separately from the request."""
+    try:
+        dns_time = resolve_url(url)
+    except Exception as e:
+        return ProbeResult(error_message=f"Error: DNS resolution failed: {str(e)}")
+    
+    try:
+        with probe_session() as session:
+            start_time = time.time()
+            if assertions:
+                # Stream the body and stop reading once every assertion is decided
+                with session.get(url, timeout=timeout, allow_redirects=True, stream=True) as response:
+                    evaluation = assertions.start(response.status_code, response.headers, expected_status_code)
+                    content = evaluation.read(iter_text(response))
+            else:
+                response = session.get(url, timeout=timeout, allow_redirects=True)
+                content = response.text[:1000]
+            end_time = time.time()
+    except requests.exceptions.Timeout:
+        return ProbeResult(dns_time=dns_time, error_message=f"Request timed out after {timeout} seconds", timed_out=True)
+    except requests.exceptions.ConnectionError as e:
+        result = ProbeResult(dns_time=dns_time, error_message=f"Error: {str(e)}", connection_error=True)
+        if isinstance(e, requests.exceptions.SSLError):
+            # Failed verification (e.g. an expired certificate): report the last certificate seen
+            result.certificate = get_certificate_cache().get(*split_host_port(url))
+        return result
+    except Exception as e:
+        return ProbeResult(dns_time=dns_time, error_message=f"Error: {str(e)}")
+    
+    response_time = round(end_time - start_time, 3)
+    certificate = get_certificate_cache().get(*split_host_port(url)) if url.lower().startswith('https:') else None
+    if assertions:
+        failures = evaluation.failures(response_time)
+    elif response.status_code != expected_status_code:
+        failures = [f"Expected status {expected_status_code}, got {response.status_code}"]
+    else:
+        failures = []
+    result = ProbeResult(
+        is_online=not failures,
+        status_code=response.status_code,
+        response_time=response_time,
+        dns_time=dns_time,
+        error_message="; ".join(failures),
+        response_content=content,
+    )
+    result.certificate = certificate
+    return result
+
+
+def _socket_probe(url, timeout, probe_type, exchange=None):
+    """Connect (and optionally talk a protocol) over TCP; exchange(sock) returns (ok, error)."""
+    host, port = split_host_port(url, PROBE_DEFAULT_PORTS.get(probe_type))
+    dns_time = None
+    try:
+        start_time = time.time()
+        sock, dns_time = connect_cached(host, port, timeout)
+        with sock:
+            ok, error_message = exchange(sock) if exchange else (True, "")
+        end_time = time.time()
+    except socket.gaierror as e:
+        return ProbeResult(error_message=f"Error: DNS resolution failed: {str(e)}")
+    except socket.timeout:
+        return ProbeResult(dns_time=dns_time, error_message=f"Connection timed out after {timeout} seconds", timed_out=True)
+    except ssl.SSLError as e:
+        return ProbeResult(dns_time=dns_time, error_message=f"TLS handshake failed: {str(e)}")
+    except OSError as e:
+        return ProbeResult(dns_time=dns_time, error_message=f"Connection error - server may be down: {str(e)}", connection_error=True)
+    except Exception as e:
+        return ProbeResult(dns_time=dns_time, error_message=f"Connection error - server may be down: {str(e)}")
+
+    return ProbeResult(
+        is_online=ok,
+        response_time=round(end_time - start_time - dns_time, 3),
+        dns_time=dns_time,
+        error_message=error_message,
+    )
+
+
+def _recv_exactly(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by server")
+        data += chunk
+    return data
+
+
+def tcp_probe(url, expected_status_code=None, timeout=30, port_for='tcp'):
+    """Connect-only probe: the target is up if it accepts a TCP connection.
+
+    port_for picks the default port when the URL has none (e.g. 'postgres' -> 5432).
+    """
+    return _socket_probe(url, timeout, port_for)
+
+
+def tls_probe(url, expected_status_code=None, timeout=30):
+    """TCP connect plus a verified TLS handshake, without sending a request."""
+    host, port = split_host_port(url, PROBE_DEFAULT_PORTS['tls'])
+    context = ssl.create_default_context()
+    certificates = get_certificate_cache()
+
+    def handshake(sock):
+        try:
+            with context.wrap_socket(sock, server_hostname=host) as tls_sock:
+                certificates.capture(host, port, tls_sock)
+                return True, ""
+        except ssl.SSLError as e:
+            return False, f"TLS handshake failed: {str(e)}"
+
+    result = _socket_probe(url, timeout, 'tls', handshake)
+    if result.response_time is not None:
+        # Handshake done or rejected; a rejected one (e.g. expired) reports the last certificate seen
+        result.certificate = certificates.get(host, port)
+    return result
+
+
+def dns_probe(url, expected_status_code=None, timeout=30):
+    """Resolve the target host directly (bypassing the cache)."""
+    host, port = split_host_port(url)
+    start_time = time.time()
+    try:
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    except Exception as e:
+        return ProbeResult(error_message=f"DNS query failed: {str(e)}")
+    dns_time = round(time.time() - start_time, 3)
+
+    if dns_time > timeout:
+        return ProbeResult(dns_time=dns_time, error_message=f"DNS query took longer than {timeout} seconds", timed_out=True)
+    return ProbeResult(
+        is_online=True,
+        response_time=dns_time,
+        dns_time=dns_time,
+        response_content=", ".join(sorted({a[4][0] for a in addresses}))[:1000],
+    )
+
+
+def postgres_probe(url, expected_status_code=None, timeout=30):
+    """Send an SSLRequest; any PostgreSQL server answers with a single S or N byte."""
+    def ping(sock):
+        sock.sendall(POSTGRES_SSL_REQUEST)
+        reply = _recv_exactly(sock, 1)
+        if reply in (b'S', b'N'):
+            return True, ""
+        return False, f"Unexpected PostgreSQL reply: {reply!r}"
+
+    return _socket_probe(url, timeout, 'postgres', ping)
+
+
+def mysql_probe(url, expected_status_code=None, timeout=30):
+    """Read the server greeting; MySQL sends it unprompted on connect."""
+    def ping(sock):
+        length = int.from_bytes(_recv_exactly(sock, 4)[:3], 'little')
+        payload = _recv_exactly(sock, length)
+        if payload[:1] == b'\xff':
+            # Error packet, e.g. "Too many connections" or host not allowed: 0xFF, 2-byte code, then the
+            # message, prefixed by '#' and a 5-character SQL state only after the handshake (so rarely here)
+            message = payload[9:] if payload[3:4] == b'#' else payload[3:]
+            return False, f"MySQL error {int.from_bytes(payload[1:3], 'little')}: {message.decode('utf-8', 'replace')}"
+        if payload[:1] == b'\x0a':
+            return True, ""
+        return False, f"Unexpected MySQL protocol version: {payload[:1]!r}"
+
+    return _socket_probe(url, timeout, 'mysql', ping)
+
+
+def redis_probe(url, expected_status_code=None, timeout=30):
+    """Send PING; +PONG (or an auth error, which proves the server is serving) means up."""
+    def ping(sock):
+        sock.sendall(b'PING\r\n')
+        reply = sock.recv(64)
+        if reply.startswith(b'+PONG') or reply.startswith(b'-NOAUTH'):
+            return True, ""
+        if not reply:
+            return False, "Connection closed by server"
+        return False, f"Unexpected Redis reply: {reply.decode('utf-8', 'replace').splitlines()[0]}"
+
+    return _socket_probe(url, timeout, 'redis', ping)
+
+
+PROBES = {
+    'http': http_probe,
+    'tcp': tcp_probe,
+    'tls': tls_probe,
+    'dns': dns_probe,
+    'postgres': postgres_probe,
+    'mysql': mysql_probe,
+    'redis': redis_probe,
+}
+
+
+def run_probe(target, timeout=None):
+    """Dispatch to the probe selected by the target's probe_type, optionally with a shorter deadline."""
+    probe = PROBES.get(target.probe_type, http_probe)
+    if probe is http_probe:
+        return http_probe(target.url, target.expected_status_code, timeout or target.timeout, assertions_for(target))
+    return probe(target.url, target.expected_status_code, timeout or target.timeout)
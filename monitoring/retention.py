@@ -0,0 +1,150 @@
+"""
+Retention engine that trims monitoring history in the background.
+"""
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import Website, InternalApp, MonitoringCheck, MonitoringSettings, RetentionRun
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionService:
+    """Apply count/age retention policies with batched range deletes on check_time."""
+
+    def __init__(self, batch_size=None):
+        self.settings = MonitoringSettings.get_settings()
+        self.batch_size = batch_size or settings.MONITORING_RETENTION_BATCH_SIZE
+
+    @staticmethod
+    def is_due():
+        """Check whether the retention interval has elapsed since the last run."""
+        last_run = RetentionRun.objects.only('started_at').first()
+        if last_run is None:
+            return True
+        return timezone.now() - last_run.started_at >= timedelta(seconds=settings.MONITORING_RETENTION_INTERVAL)
+
+    def get_policy(self, target):
+        """Resolve (max_checks, days) for a target: target override, then website, then global."""
+        sources = [target]
+        if isinstance(target, InternalApp):
+            sources.append(target.website)
+
+        max_checks = next((s.retention_max_checks for s in sources if s.retention_max_checks is not None),
+                          self.settings.retention_max_checks)
+        days = next((s.retention_days for s in sources if s.retention_days is not None),
+                    self.settings.retention_days)
+        return max_checks, days
+
+    def get_cutoff(self, checks, max_checks, days):
+        """Return the check_time before which rows of this queryset can be deleted."""
+        cutoff = None
+
+        if max_checks:
+            nth_newest = list(
+                checks.order_by('-check_time').values_list('check_time', flat=True)[max_checks - 1:max_checks]
+            )
+            if nth_newest:
+                cutoff = nth_newest[0]
+
+        if days:
+            age_cutoff = timezone.now() - timedelta(days=days)
+            cutoff = max(cutoff, age_cutoff) if cutoff else age_cutoff
+
+        return cutoff
+
+    def delete_before(self, checks, cutoff):
+        """Delete rows older than cutoff in batches of range deletes, returning rows deleted."""
+        expired = checks.filter(check_time__lt=cutoff)
+        deleted = 0
+
+        while True:
+            bound = list(
+                expired.order_by('check_time').values_list('check_time', flat=True)[self.batch_size - 1:self.batch_size]
+            )
+            if not bound:
+                count, _ = expired.delete()
+                return deleted + count
+
+            count, _ = expired.filter(check_time__lte=bound[0]).delete()
+            deleted += count
+
+    def apply_policy(self, target, checks):
+        max_checks, days = self.get_policy(target)
+        cutoff = self.get_cutoff(checks, max_checks, days)
+        if cutoff is None:
+            return 0
+        return self.delete_before(checks, cutoff)
+
+    def maintain_database(self, vacuum=False, analyze=False):
+        """Run incremental VACUUM / ANALYZE for the checks table on supported backends."""
+        table = MonitoringCheck._meta.db_table
+        vendor = connection.vendor
+
+        with connection.cursor() as cursor:
+            if vendor == 'sqlite':
+                if vacuum:
+                    cursor.execute('PRAGMA auto_vacuum')
+                    if cursor.fetchone()[0] != 2:
+                        # One-off conversion; afterwards only freed pages are reclaimed
+                        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                        cursor.execute('VACUUM')
+                    cursor.execute('PRAGMA incremental_vacuum')
+                if analyze:
+                    cursor.execute(f'ANALYZE "{table}"')
+            elif vendor == 'postgresql':
+                if vacuum:
+                    cursor.execute(f'VACUUM (ANALYZE) "{table}"' if analyze else f'VACUUM "{table}"')
+                elif analyze:
+                    cursor.execute(f'ANALYZE "{table}"')
+            else:
+                return False, False
+
+        return vacuum, analyze
+
+    def _maintenance_due(self, field, interval):
+        last_run = RetentionRun.objects.filter(**{field: True}).only('started_at').first()
+        return last_run is None or timezone.now() - last_run.started_at >= timedelta(seconds=interval)
+
+    def run(self, vacuum=None, analyze=None):
+        """Run retention for every target and return the recorded RetentionRun."""
+        start_time = time.monotonic()
+        rows_deleted = 0
+        targets_processed = 0
+
+        for website in Website.objects.all():
+            checks = MonitoringCheck.objects.filter(website=website, internal_app__isnull=True)
+            rows_deleted += self.apply_policy(website, checks)
+            targets_processed += 1
+
+        for internal_app in InternalApp.objects.select_related('website'):
+            checks = MonitoringCheck.objects.filter(internal_app=internal_app)
+            rows_deleted += self.apply_policy(internal_app, checks)
+            targets_processed += 1
+
+        if vacuum is None:
+            vacuum = rows_deleted > 0 and self._maintenance_due('vacuumed', settings.MONITORING_VACUUM_INTERVAL)
+        if analyze is None:
+            analyze = self._maintenance_due('analyzed', settings.MONITORING_ANALYZE_INTERVAL)
+
+        try:
+            vacuumed, analyzed = self.maintain_database(vacuum=vacuum, analyze=analyze)
+        except Exception as e:
+            logger.error(f"Error during database maintenance: {str(e)}")
+            vacuumed, analyzed = False, False
+
+        run = RetentionRun.objects.create(
+            duration=round(time.monotonic() - start_time, 3),
+            targets_processed=targets_processed,
+            rows_deleted=rows_deleted,
+            vacuumed=vacuumed,
+            analyzed=analyzed,
+        )
+        logger.info(
+            f"Retention run completed: {rows_deleted} rows deleted across {targets_processed} targets "
+            f"in {run.duration}s (vacuum={vacuumed}, analyze={analyzed})"
+        )
+        return run
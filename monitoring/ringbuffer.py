@@ -0,0 +1,325 @@
+"""
+Recent check results shared between processes through a memory-mapped file.
+
+Every process that records checks (the monitor, Celery workers, manual checks in
+the web process) appends to a fixed-size ring of the latest results per target.
+Web workers on the same host read those rings instead of querying the newest
+checks. Each target slot is guarded by a seqlock: writers make the sequence odd
+while they change the slot and even again when done; readers copy the slot and
+retry if the sequence moved or was odd, so reads never take a lock. Writers
+serialize on a thread lock plus a file lock across processes (flock(), or
+msvcrt.locking() on Windows).
+
+A slot is only trusted once it holds the target's full recent history: it is
+seeded from the database when first written. Anything missing or torn falls
+back to the database.
+"""
+import math
+import mmap
+import os
+import struct
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+import logging
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+logger = logging.getLogger(__name__)
+
+# Results kept per target; matches the "last 20 checks" used for status and uptime
+RESULTS_PER_TARGET = 20
+
+MAGIC = b'WHCR'
+LAYOUT_VERSION = 1
+
+# magic, layout version, slots, results per slot
+FILE_HEADER = struct.Struct('<4sIII')
+# sequence, kind, complete flag, target id, results written
+SLOT_HEADER = struct.Struct('<IBB2xIQ')
+# check time (epoch seconds), response time (NaN if none), status code (0 if none), online
+ENTRY = struct.Struct('<dfH?x')
+
+EMPTY, WEBSITE, INTERNAL_APP, DELETED = 0, 1, 2, 255
+
+# Seqlock read attempts before giving up and using the database
+READ_RETRIES = 100
+
+RecentResult = namedtuple('RecentResult', ['check_time', 'is_online', 'response_time', 'status_code'])
+
+
+def _next(seq, step):
+    return (seq + step) & 0xFFFFFFFF
+
+
+def _lock_file(fd, offset):
+    """Take the exclusive cross-process writer lock (blocks until it is free)."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        # Windows: lock one byte past the data, so the lock never covers bytes being resized or read
+        os.lseek(fd, offset, os.SEEK_SET)
+        while True:
+            try:
+                # LK_LOCK gives up after about 10 seconds; keep waiting like flock() does
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                os.lseek(fd, offset, os.SEEK_SET)
+
+
+def _unlock_file(fd, offset):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        os.lseek(fd, offset, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _target_key(target):
+    from .models import InternalApp
+    return (INTERNAL_APP if isinstance(target, InternalApp) else WEBSITE), target.pk
+
+
+class RecentResults:
+    """Per-target rings of recent results in one mmapped file."""
+
+    def __init__(self, path, slots=4096, capacity=RESULTS_PER_TARGET):
+        self.path = str(path)
+        self.slots = slots
+        self.capacity = capacity
+        self.slot_size = SLOT_HEADER.size + capacity * ENTRY.size
+        self.size = FILE_HEADER.size + slots * self.slot_size
+        self._lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._writer():
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            if os.fstat(self._fd).st_size != self.size or os.read(self._fd, FILE_HEADER.size) != self._header():
+                # New file, or one laid out for other sizes: start over (it is only a cache)
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self.size)
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                os.write(self._fd, self._header())
+        self._mm = mmap.mmap(self._fd, self.size)
+
+    def _header(self):
+        return FILE_HEADER.pack(MAGIC, LAYOUT_VERSION, self.slots, self.capacity)
+
+    class _Writer:
+        def __init__(self, ring):
+            self.ring = ring
+
+        def __enter__(self):
+            self.ring._lock.acquire()
+            try:
+                _lock_file(self.ring._fd, self.ring.size)
+            except BaseException:
+                self.ring._lock.release()
+                raise
+
+        def __exit__(self, *exc):
+            try:
+                _unlock_file(self.ring._fd, self.ring.size)
+            finally:
+                self.ring._lock.release()
+
+    def _writer(self):
+        return self._Writer(self)
+
+    def _offset(self, index):
+        return FILE_HEADER.size + index * self.slot_size
+
+    def _probe(self, kind, target_id):
+        """Slot indexes in lookup order for a key (open addressing, linear probing)."""
+        start = ((kind << 32) | target_id) * 2654435761 % self.slots
+        for step in range(self.slots):
+            yield (start + step) % self.slots
+
+    def _find(self, kind, target_id, create=False):
+        """Index of the key's slot; with create, claims a free one. None if absent (or the file is full)."""
+        free = None
+        for index in self._probe(kind, target_id):
+            _, slot_kind, _, slot_id, _ = SLOT_HEADER.unpack_from(self._mm, self._offset(index))
+            if slot_kind == kind and slot_id == target_id:
+                return index
+            if slot_kind == DELETED and free is None:
+                free = index
+            elif slot_kind == EMPTY:
+                if free is None:
+                    free = index
+                break
+        if not create or free is None:
+            return None
+
+        offset = self._offset(free)
+        seq = SLOT_HEADER.unpack_from(self._mm, offset)[0]
+        SLOT_HEADER.pack_into(self._mm, offset, _next(seq, 1), kind, 0, target_id, 0)
+        SLOT_HEADER.pack_into(self._mm, offset, _next(seq, 2), kind, 0, target_id, 0)
+        return free
+
+    def _write_entries(self, index, results, complete=None):
+        offset = self._offset(index)
+        seq, kind, slot_complete, target_id, count = SLOT_HEADER.unpack_from(self._mm, offset)
+        SLOT_HEADER.pack_into(self._mm, offset, _next(seq, 1), kind, slot_complete, target_id, count)
+        for result in results:
+            ENTRY.pack_into(
+                self._mm, offset + SLOT_HEADER.size + (count % self.capacity) * ENTRY.size,
+                result.check_time.timestamp(),
+                math.nan if result.response_time is None else result.response_time,
+                result.status_code or 0,
+                bool(result.is_online),
+            )
+            count += 1
+        if complete is not None:
+            slot_complete = complete
+        if count >= self.capacity:
+            # A full ring is the complete recent history whether or not seeding worked
+            slot_complete = 1
+        SLOT_HEADER.pack_into(self._mm, offset, _next(seq, 2), kind, slot_complete, target_id, count)
+
+    def publish(self, target, check, history=None):
+        """
+        Append a check to the target's ring. history() is called once, when the slot is new,
+        and must return the results before this check (newest first) or None if unavailable.
+        """
+        kind, target_id = _target_key(target)
+        with self._writer():
+            index = self._find(kind, target_id)
+            if index is None:
+                index = self._find(kind, target_id, create=True)
+                if index is None:
+                    logger.warning(f"Recent results file is full; {target} is served from the database")
+                    return
+                seed = history() if history is not None else None
+                if seed is not None:
+                    self._write_entries(index, list(reversed(seed)), complete=True)
+            self._write_entries(index, [check])
+
+    def discard(self, target):
+        kind, target_id = _target_key(target)
+        with self._writer():
+            index = self._find(kind, target_id)
+            if index is not None:
+                offset = self._offset(index)
+                seq = SLOT_HEADER.unpack_from(self._mm, offset)[0]
+                SLOT_HEADER.pack_into(self._mm, offset, _next(seq, 1), DELETED, 0, 0, 0)
+                SLOT_HEADER.pack_into(self._mm, offset, _next(seq, 2), DELETED, 0, 0, 0)
+
+    def recent(self, target, limit=RESULTS_PER_TARGET):
+        """Newest-first results for a target, or None if the ring can't answer (use the database)."""
+        kind, target_id = _target_key(target)
+        index = self._find(kind, target_id)
+        if index is None:
+            return None
+        offset = self._offset(index)
+
+        for _ in range(READ_RETRIES):
+            data = self._mm[offset:offset + self.slot_size]
+            seq, slot_kind, complete, slot_id, count = SLOT_HEADER.unpack_from(data)
+            if seq % 2:
+                continue
+            if SLOT_HEADER.unpack_from(self._mm, offset)[0] != seq:
+                continue
+            if slot_kind != kind or slot_id != target_id or not complete:
+                return None
+            results = []
+            for n in range(min(limit, count, self.capacity)):
+                position = (count - 1 - n) % self.capacity
+                timestamp, response_time, status_code, is_online = ENTRY.unpack_from(
+                    data, SLOT_HEADER.size + position * ENTRY.size)
+                results.append(RecentResult(
+                    datetime.fromtimestamp(timestamp, tz=dt_timezone.utc),
+                    is_online,
+                    None if math.isnan(response_time) else round(response_time, 3),
+                    status_code or None,
+                ))
+            return results
+        return None
+
+    def raw_slots(self, copy=True):
+        """
+        Every slot as bytes, for vectorized readers; validate rows against the sequences read again
+        afterwards. copy=False returns a live memoryview instead, which must be released before close().
+        """
+        if not copy:
+            return memoryview(self._mm)[FILE_HEADER.size:self.size]
+        return self._mm[FILE_HEADER.size:self.size]
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+
+_recent_results = None
+_recent_results_lock = threading.Lock()
+_unavailable = False
+
+
+def get_recent_results():
+    """The shared recent-results file for this process, or None when disabled or unusable."""
+    global _recent_results, _unavailable
+    if _recent_results is None and not _unavailable:
+        with _recent_results_lock:
+            if _recent_results is None and not _unavailable:
+                path = settings.MONITORING_RECENT_RESULTS_FILE
+                try:
+                    if not path:
+                        raise OSError("disabled")
+                    _recent_results = RecentResults(path, slots=settings.MONITORING_RECENT_RESULTS_SLOTS)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Recent results file unavailable, reading checks from the database: {str(e)}")
+                    _unavailable = True
+    return _recent_results
+
+
+def _db_history(target, exclude_pk=None):
+    from django.db import DatabaseError
+    from .services import target_checks
+    try:
+        checks = target_checks(target).exclude(pk=exclude_pk) if exclude_pk else target_checks(target)
+        return [
+            RecentResult(**row) for row in checks.order_by('-check_time').values(
+                'check_time', 'is_online', 'response_time', 'status_code')[:RESULTS_PER_TARGET - 1]
+        ]
+    except DatabaseError:
+        return None
+
+
+def publish_check(target, check):
+    """Record a just-stored (or spooled) check in the shared rings; never raises."""
+    ring = get_recent_results()
+    if ring is None:
+        return
+    try:
+        ring.publish(target, check, history=lambda: _db_history(target, exclude_pk=check.pk))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not publish check for {target}: {str(e)}")
+
+
+def recent_results(target, limit=RESULTS_PER_TARGET):
+    """Newest-first RecentResults from the shared rings, or None to fall back to the database."""
+    ring = get_recent_results()
+    if ring is None or target.pk is None:
+        return None
+    try:
+        return ring.recent(target, limit)
+    except (OSError, ValueError):
+        return None
+
+
+def discard_target(target):
+    ring = get_recent_results()
+    if ring is not None:
+        try:
+            ring.discard(target)
+        except (OSError, ValueError):
+            pass
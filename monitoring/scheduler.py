@@ -0,0 +1,101 @@
+"""
+Per-probe scheduler: each probe group runs on its own cadence instead of a fixed cycle.
+
+After a state change the group is re-probed every confirm_interval seconds until
+the new state is confirmed; stable groups slow down towards max_check_interval.
+"""
+import threading
+import time
+from .models import InternalApp
+
+# Probes needed to confirm a state change (matches the two-failure alert rule)
+CONFIRM_PROBES = 2
+
+# Consecutive stable probes before the interval is stretched again
+SLOWDOWN_AFTER = 3
+SLOWDOWN_FACTOR = 1.5
+
+
+def check_interval(target):
+    """Configured interval for a target; internal apps follow their website."""
+    if isinstance(target, InternalApp):
+        return target.website.check_interval
+    return target.check_interval
+
+
+class ScheduleEntry:
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_due = 0.0
+        self.last_online = None
+        self.streak = 0
+
+
+class ProbeScheduler:
+    """Tracks when each probe group is next due. Keyed by probe key, like the circuit breaker."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def base_interval(self, group):
+        return min(check_interval(target) for target in group.targets)
+
+    def due(self, groups, now=None):
+        """Groups whose next probe is due; forgets groups that are no longer monitored."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            keys = {group.key for group in groups}
+            for key in list(self._entries):
+                if key not in keys:
+                    del self._entries[key]
+
+            due = []
+            for group in groups:
+                entry = self._entries.get(group.key)
+                if entry is None:
+                    entry = self._entries[group.key] = ScheduleEntry(self.base_interval(group))
+                if now >= entry.next_due:
+                    due.append(group)
+            return due
+
+    def record(self, group, is_online, settings, now=None):
+        """Schedule the group's next probe from its latest result (None = not probed)."""
+        now = time.monotonic() if now is None else now
+        base = self.base_interval(group)
+        with self._lock:
+            entry = self._entries.setdefault(group.key, ScheduleEntry(base))
+            if is_online is None or not settings.adaptive_cadence:
+                entry.interval = base
+            elif is_online != entry.last_online:
+                # State changed (or first result): confirm it quickly
+                entry.streak = 1
+                entry.interval = settings.confirm_interval if entry.last_online is not None else base
+            else:
+                # The interval stays at confirm_interval until CONFIRM_PROBES agree
+                entry.streak += 1
+                if entry.streak == CONFIRM_PROBES:
+                    entry.interval = base
+                elif is_online and (entry.streak - CONFIRM_PROBES) % SLOWDOWN_AFTER == 0:
+                    ceiling = max(base, settings.max_check_interval)
+                    entry.interval = min(ceiling, max(base, entry.interval) * SLOWDOWN_FACTOR)
+
+            if is_online is not None:
+                entry.last_online = is_online
+            entry.next_due = now + entry.interval
+            return entry
+
+    def next_due_in(self, now=None):
+        """Seconds until the earliest scheduled probe (0 if one is already due)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self._entries:
+                return 0
+            return max(0.0, min(entry.next_due for entry in self._entries.values()) - now)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+probe_scheduler = ProbeScheduler()
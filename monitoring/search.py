@@ -0,0 +1,49 @@
+"""
+Full-text search for alerts, backed by SQLite FTS5 or a Postgres tsvector index.
+"""
+import re
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import Website
+
+ALERT_FTS_TABLE = 'monitoring_alertlog_fts'
+ALERT_TSVECTOR = "to_tsvector('simple', subject || ' ' || message)"
+
+_fts_available = None
+
+
+def alert_fts_available():
+    """Check (once per process) whether the SQLite FTS5 alert index exists."""
+    global _fts_available
+    if _fts_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [ALERT_FTS_TABLE])
+            _fts_available = cursor.fetchone() is not None
+    return _fts_available
+
+
+def search_alerts(queryset, query):
+    """Filter an AlertLog queryset by a search string using the backend's full-text index."""
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return queryset
+
+    # Websites are few, so matching on name stays a cheap lookup instead of a JOIN
+    website_match = Q(website_id__in=Website.objects.filter(name__icontains=query).values('id'))
+
+    if connection.vendor == 'sqlite' and alert_fts_available():
+        # Prefix match on every term so results update while typing
+        match = ' '.join(f'"{term}"*' for term in terms)
+        text_match = Q(id__in=RawSQL(
+            f'SELECT rowid FROM {ALERT_FTS_TABLE} WHERE {ALERT_FTS_TABLE} MATCH %s', [match]
+        ))
+    elif connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        text_match = Q(id__in=RawSQL(
+            f"SELECT id FROM monitoring_alertlog WHERE {ALERT_TSVECTOR} @@ to_tsquery('simple', %s)", [tsquery]
+        ))
+    else:
+        text_match = Q(subject__icontains=query) | Q(message__icontains=query)
+
+    return queryset.filter(text_match | website_match)
@@ -1,120 +1,258 @@
-import requests
+import math
+import threading
 import time
+import uuid
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
-from django.db import transaction
+from django.db import DatabaseError, transaction
 from .models import Website, InternalApp, MonitoringCheck, AlertLog, MonitoringSettings
+from .probes import TCP_PRECHECK_TYPES, split_host_port, tcp_probe
+from .breaker import circuit_breaker, PROBE, PRECHECK, SKIP
+from .hedging import probe_with_hedging
+from .http2 import batch_by_origin, probe_many
+from .config import get_config
+from .dns_cache import get_dns_cache
+from .spool import get_spool
+from .maintenance import in_maintenance, target_key
+from .ringbuffer import RecentResult, RESULTS_PER_TARGET, publish_check, recent_results
+from . import anomaly, sla, statuspage
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Latency samples needed before adaptive timeouts kick in
+ADAPTIVE_MIN_SAMPLES = 5
+
+# While a target is down, every Nth probe uses the full timeout so a slow recovery is still seen
+FULL_TIMEOUT_EVERY = 5
+
+# Probes of each down target since it went down, per process
+_down_probes = {}
+_down_probes_lock = threading.Lock()
+
+
+def count_down_probe(target, is_down):
+    """Count a probe of a target that is down (or reset the count once it is up); returns the count."""
+    key = target_key(target)
+    with _down_probes_lock:
+        if not is_down:
+            _down_probes.pop(key, None)
+            return 0
+        _down_probes[key] = _down_probes.get(key, 0) + 1
+        return _down_probes[key]
+
+
+def latency_p95(history):
+    """p95 of the successful response times in a check history, or None with too few samples."""
+    latencies = sorted(
+        c['response_time'] for c in history if c['is_online'] and c['response_time'] is not None
+    )
+    if len(latencies) < ADAPTIVE_MIN_SAMPLES:
+        return None
+    return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def target_checks(target):
+    """Queryset of a website's own checks or an internal app's checks."""
+    if isinstance(target, InternalApp):
+        return MonitoringCheck.objects.filter(internal_app=target)
+    return MonitoringCheck.objects.filter(website=target, internal_app__isnull=True)
+
+
+def recent_checks(target, limit=RESULTS_PER_TARGET):
+    """Newest-first RecentResults of a target: from the shared rings, or the database if they can't answer."""
+    results = recent_results(target, limit)
+    if results is not None:
+        return results
+    return [
+        RecentResult(**row) for row in target_checks(target).order_by('-check_time').values(
+            'check_time', 'is_online', 'response_time', 'status_code')[:limit]
+    ]
+
 
 class MonitoringService:
     def __init__(self):
-        self.settings = MonitoringSettings.get_settings()
+        # Shared, cached settings: no query per service instance
+        self.settings = get_config().settings
     
-    def check_website(self, website):
-        try:
-            start_time = time.time()
-            response = requests.get(website.url, timeout=website.timeout, allow_redirects=True)
-            end_time = time.time()
-            response_time = round(end_time - start_time, 3)
-            
-            # Create monitoring check
-            check = MonitoringCheck.objects.create(
-                website=website,
-                check_time=timezone.now(),
-                is_online=response.status_code == website.expected_status_code,
-                response_time=response_time,
-                status_code=response.status_code,
-                error_message="" if response.status_code == website.expected_status_code else f"Expected status {website.expected_status_code}, got {response.status_code}",
-                response_content=response.text[:1000]
-            )
-            
-            # Handle alerts
-            self.handle_website_alerts(website, check)
-            
-            return check
-            
-        except requests.exceptions.Timeout:
-            check = MonitoringCheck.objects.create(
-                website=website,
-                check_time=timezone.now(),
-                is_online=False,
-                response_time=None,
-                status_code=None,
-                error_message=f"Request timed out after {website.timeout} seconds",
-                response_content=""
-            )
-            self.handle_website_alerts(website, check)
+    def record_check(self, result, website, internal_app=None):
+        """Store a probe result as a MonitoringCheck, spooling it locally if the database can't take it."""
+        check = MonitoringCheck(
+            website=website,
+            internal_app=internal_app,
+            check_time=timezone.now(),
+            spool_id=uuid.uuid4(),
+            **result.as_check_fields()
+        )
+        check = get_spool().save(check)
+        if check.pk is not None:
+            # Spooled checks are added to the SLA totals when replayed
+            sla.record_safely(check, website, internal_app)
+        # Web workers read the latest results from the shared rings instead of the database
+        publish_check(internal_app or website, check)
+        statuspage.mark_dirty()
+        return check
+    
+    def get_adaptive_timeout(self, target, history):
+        """Deadline from the p95 of recent successful latencies, or None to use the full timeout."""
+        p95 = latency_p95(history)
+        if p95 is None:
+            return None
+        
+        deadline = max(self.settings.adaptive_timeout_floor, p95 * self.settings.adaptive_timeout_factor)
+        if deadline >= target.timeout:
+            return None
+        return round(deadline, 2)
+    
+    def get_hedge_delay(self, target, history):
+        """Hedge a first attempt once it outlives the target's p95 latency."""
+        p95 = latency_p95(history)
+        if p95 is None or p95 >= target.timeout:
+            return None
+        return p95
+    
+    def probe_target(self, target):
+        """Probe a target, with adaptive deadlines, hedging and retries as configured."""
+        history = []
+        if (self.settings.adaptive_timeouts or self.settings.hedged_probes) and get_spool().database_available():
+            try:
+                history = list(
+                    target_checks(target).order_by('-check_time').values('is_online', 'response_time')[:20]
+                )
+            except DatabaseError as e:
+                # Probe with the full timeout rather than not at all
+                logger.warning(f"No check history for {target}: {str(e)}")
+        deadline = self.get_adaptive_timeout(target, history) if self.settings.adaptive_timeouts else None
+        is_down = bool(history) and not history[0]['is_online']
+        down_probes = count_down_probe(target, is_down)
+        if down_probes and down_probes % FULL_TIMEOUT_EVERY == 0:
+            # Already down: the short deadline keeps it from holding a worker, except on every Nth probe
+            deadline = None
+        hedge_after = self.get_hedge_delay(target, history) if self.settings.hedged_probes else None
+        retries = self.settings.probe_retries
+        
+        result = probe_with_hedging(target, deadline, hedge_after, retries)
+        if deadline is not None and result.timed_out and not is_down:
+            # Up -> down: confirm with the full timeout before declaring the target down
+            attempts = result.attempts
+            result = probe_with_hedging(target, None, hedge_after, retries)
+            result.attempts = attempts + result.attempts
+        return result
+    
+    def check_website(self, website, result=None):
+        result = result or self.probe_target(website)
+        check = self.record_check(result, website)
+        if check.pk is None:
+            # Spooled while the database is unavailable; alerting resumes once it's back
             return check
-            
-        except Exception as e:
-            check = MonitoringCheck.objects.create(
-                website=website,
-                check_time=timezone.now(),
-                is_online=False,
-                response_time=None,
-                status_code=None,
-                error_message=f"Error: {str(e)}",
-                response_content=""
-            )
-            self.handle_website_alerts(website, check)
+        if in_maintenance(website):
+            # Manual check during a maintenance window: recorded, never alerted on
             return check
+        
+        # Handle alerts
+        self.handle_website_alerts(website, check)
+        self.handle_certificate_alerts(website, website, result.certificate)
+        
+        return check
     
-    def check_internal_app(self, internal_app):
-        try:
-            start_time = time.time()
-            response = requests.get(internal_app.url, timeout=internal_app.timeout, allow_redirects=True)
-            end_time = time.time()
-            response_time = round(end_time - start_time, 3)
-            
-            # Create monitoring check
-            check = MonitoringCheck.objects.create(
-                internal_app=internal_app,
-                website=internal_app.website,
-                check_time=timezone.now(),
-                is_online=response.status_code == internal_app.expected_status_code,
-                response_time=response_time,
-                status_code=response.status_code,
-                error_message="" if response.status_code == internal_app.expected_status_code else f"Expected status {internal_app.expected_status_code}, got {response.status_code}",
-                response_content=response.text[:1000]
-            )
-            
-            # Handle alerts
-            self.handle_internal_app_alerts(internal_app, check)
-            
+    def check_internal_app(self, internal_app, result=None):
+        result = result or self.probe_target(internal_app)
+        check = self.record_check(result, internal_app.website, internal_app)
+        if check.pk is None:
+            # Spooled while the database is unavailable; alerting resumes once it's back
             return check
-            
-        except requests.exceptions.Timeout:
-            check = MonitoringCheck.objects.create(
-                internal_app=internal_app,
-                website=internal_app.website,
-                check_time=timezone.now(),
-                is_online=False,
-                response_time=None,
-                status_code=None,
-                error_message=f"Request timed out after {internal_app.timeout} seconds",
-                response_content=""
-            )
-            self.handle_internal_app_alerts(internal_app, check)
+        if in_maintenance(internal_app):
+            # Manual check during a maintenance window: recorded, never alerted on
             return check
+        
+        # Handle alerts
+        self.handle_internal_app_alerts(internal_app, check)
+        self.handle_certificate_alerts(internal_app.website, internal_app, result.certificate)
+        
+        return check
+    
+    def check_group(self, group, result=None):
+        """Probe a group's shared URL once and fan the result out to every subscribing target."""
+        if result is None:
+            decision = circuit_breaker.before_probe(group.key, self.settings)
+            if decision == SKIP:
+                # Still backing off a persistently-down target: no probe, no writes
+                return []
             
-        except Exception as e:
-            check = MonitoringCheck.objects.create(
-                internal_app=internal_app,
-                website=internal_app.website,
-                check_time=timezone.now(),
-                is_online=False,
-                response_time=None,
-                status_code=None,
-                error_message=f"Error: {str(e)}",
-                response_content=""
-            )
-            self.handle_internal_app_alerts(internal_app, check)
-            return check
+            leader = group.leader
+            if decision == PRECHECK and leader.probe_type in TCP_PRECHECK_TYPES:
+                # Cheap TCP connect to the port the probe uses; only escalate to the full probe if it answers
+                precheck = tcp_probe(leader.url, timeout=leader.timeout, port_for=leader.probe_type)
+                if not precheck.is_online:
+                    precheck.error_message = f"Circuit open, TCP pre-check failed: {precheck.error_message}"
+                    result = precheck
+            if result is None:
+                result = self.probe_target(leader)
+        
+        state = circuit_breaker.record(group.key, result.is_online, self.settings)
+        if state is not None and state.backoff:
+            logger.info(f"Circuit open for {group}: {state.failures} failures, next attempt in {state.backoff}s")
+        
+        checks = []
+        for target in group.targets:
+            if in_maintenance(target):
+                # A window started while the probe was in flight
+                continue
+            try:
+                if isinstance(target, InternalApp):
+                    checks.append(self.check_internal_app(target, result.for_timeout(target.timeout)))
+                else:
+                    checks.append(self.check_website(target, result.for_timeout(target.timeout)))
+            except Exception as e:
+                logger.error(f"Error recording check for {target}: {str(e)}")
+        return checks
+    
+    def check_batch(self, groups):
+        """
+        Check groups that share an origin, multiplexing their probes over HTTP/2 when possible.
+        Returns {group key: checks}.
+        """
+        if len(groups) == 1:
+            return {groups[0].key: self.check_group(groups[0])}
+        
+        # Only closed circuits are multiplexed; backed-off groups go through check_group as usual
+        probed = [g for g in groups if circuit_breaker.before_probe(g.key, self.settings) == PROBE]
+        results = dict(zip((g.key for g in probed), probe_many([g.leader for g in probed]))) if probed else {}
+        
+        checks = {}
+        for group in groups:
+            result = results.get(group.key)
+            if result is not None and result.connection_error:
+                # HTTP/2 connection failed: fall back to the HTTP/1.1 engine (with its retries)
+                result = None
+            try:
+                checks[group.key] = self.check_group(group, result)
+            except Exception as e:
+                logger.error(f"Error checking {group}: {str(e)}")
+                checks[group.key] = []
+        return checks
+    
+    def prefetch_dns(self, targets):
+        """Warm the DNS cache for every target host before probing starts."""
+        if not settings.MONITORING_DNS_PREFETCH:
+            return 0
+        host_ports = set()
+        for target in targets:
+            host, port = split_host_port(target.url)
+            if host:
+                host_ports.add((host, port))
+        return get_dns_cache().prefetch(host_ports, max_workers=self.settings.max_concurrent_checks)
+    
+    def is_flapping(self, checks):
+        """True if the target changed state at least flap_threshold times within the flap window."""
+        if not self.settings.flap_threshold:
+            return False
+        window_start = timezone.now() - timedelta(minutes=self.settings.flap_window_minutes)
+        states = [c.is_online for c in checks if c.check_time >= window_start]
+        changes = sum(1 for newer, older in zip(states, states[1:]) if newer != older)
+        return changes >= self.settings.flap_threshold
     
     def handle_website_alerts(self, website, check):
         # Suppress alerts if website is not active (e.g., maintenance or inactive)
@@ -123,13 +261,13 @@ class MonitoringService:
             
         if not check.is_online:
             # Get up to the last 20 checks to find consecutive failures
-            recent_checks = MonitoringCheck.objects.filter(
+            history = MonitoringCheck.objects.filter(
                 website=website,
                 internal_app__isnull=True
             ).order_by('-check_time')[:20]
             
             consecutive_failures = 0
-            for c in recent_checks:
+            for c in history:
                 if not c.is_online:
                     consecutive_failures += 1
                 else:
@@ -137,6 +275,11 @@ class MonitoringService:
                     
             # (Requires 2 consecutive failures to trigger an alert - i.e. 5 minutes)
             should_alert = consecutive_failures >= 2
+            
+            # A flapping target would alert on every dip; hold alerts until it settles
+            if should_alert and self.is_flapping(history):
+                logger.warning(f"{website.name} is flapping, suppressing down alert")
+                should_alert = False
                 
             # Website is down - send alert only if it's been down for two consecutive checks
             if should_alert and AlertLog.should_send_alert(website, 'down'):
@@ -178,12 +321,12 @@ Web Health Checker System
             
         if not check.is_online:
             # Get up to the last 20 checks to find consecutive failures
-            recent_checks = MonitoringCheck.objects.filter(
+            history = MonitoringCheck.objects.filter(
                 internal_app=internal_app
             ).order_by('-check_time')[:20]
             
             consecutive_failures = 0
-            for c in recent_checks:
+            for c in history:
                 if not c.is_online:
                     consecutive_failures += 1
                 else:
@@ -191,6 +334,10 @@ Web Health Checker System
                     
             # Only alert if there are at least 2 consecutive failures
             should_alert = consecutive_failures >= 2
+            
+            if should_alert and self.is_flapping(history):
+                logger.warning(f"Internal app {internal_app.name} is flapping, suppressing down alert")
+                should_alert = False
                 
             # Internal app is down - send alert only if it's been down for two consecutive checks
             if should_alert and AlertLog.should_send_alert(internal_app.website, 'down'):
@@ -226,35 +373,100 @@ Web Health Checker System
             # Internal app is online - nothing to do here
             pass
     
+    def handle_certificate_alerts(self, website, target, certificate):
+        """Alert once each time a target's certificate crosses an expiry threshold."""
+        if certificate is None or website.status != 'active':
+            return
+        thresholds = self.settings.get_cert_expiry_thresholds()
+        if not thresholds:
+            return
+        
+        days_left = certificate.days_left()
+        crossed = [t for t in [0] + thresholds if days_left <= t]
+        if not crossed:
+            return
+        threshold = crossed[0]
+        
+        # One alert per threshold for each target and certificate; renewal changes the serial and not_after, re-arming it
+        kind = 'internal_app' if isinstance(target, InternalApp) else 'website'
+        alert_key = f"{kind}:{target.pk}:{certificate.serial}:{certificate.issuer}"[:200]
+        entered_at = certificate.not_after - timedelta(days=threshold)
+        if AlertLog.objects.filter(
+            website=website, alert_type='cert_expiry', alert_key=alert_key, sent_at__gte=entered_at
+        ).exists():
+            return
+        
+        if days_left <= 0:
+            subject = f"🚨 URGENT: TLS certificate for {target.name} has EXPIRED"
+        else:
+            subject = f"⚠️ TLS certificate for {target.name} expires in {math.ceil(days_left)} days"
+        message = f"""
+Dear Administrator,
+
+Monitoring Alert: the TLS certificate served for {target.name} expires on {certificate.not_after.strftime('%Y-%m-%d %H:%M UTC')}.
+
+Certificate Details:
+- URL: {target.url}
+- Subject: {certificate.subject}
+- Issuer: {certificate.issuer}
+- Names: {', '.join(certificate.sans) or 'n/a'}
+- Days left: {max(0, math.ceil(days_left))}
+
+Please renew the certificate before it expires to avoid an outage.
+
+Best regards,
+Web Health Checker System
+        """
+        
+        AlertLog.send_alert(
+            website=website,
+            alert_type='cert_expiry',
+            subject=subject,
+            message=message,
+            email_to=website.alert_email,
+            alert_key=alert_key
+        )
+    
+    def replay_spool(self):
+        """Load results spooled during a database outage, once the database is back."""
+        try:
+            replayed = get_spool().replay_if_due()
+            if replayed:
+                logger.info(f"Replayed {replayed} spooled checks")
+            return replayed
+        except Exception as e:
+            logger.error(f"Error replaying spooled checks: {str(e)}")
+            return 0
+    
     def run_monitoring_cycle(self):
         if not self.settings.is_monitoring_active:
             logger.info("Monitoring is disabled")
             return
         
-        # Get all active websites
-        websites = Website.objects.filter(status='active')
-        
-        # Get all active internal apps
-        internal_apps = InternalApp.objects.filter(is_active=True, website__status='active')
-        
-        total_checks = websites.count() + internal_apps.count()
+        # Active websites and internal apps from the shared config snapshot
+        config = get_config()
+        targets = config.targets
         
-        if total_checks > 0:
-            logger.info(f"Running {total_checks} monitoring checks")
+        if targets:
+            # Probe each unique URL once and fan the result out to all its targets, except those in maintenance
+            groups = config.active_groups()
+            logger.info(f"Running {sum(len(g) for g in groups)} of {len(targets)} monitoring checks ({len(groups)} unique probes)")
+            self.prefetch_dns(targets)
+            self.replay_spool()
             
-            # Check all websites
-            for website in websites:
+            for batch in batch_by_origin(groups):
                 try:
-                    self.check_website(website)
+                    self.check_batch(batch)
                 except Exception as e:
-                    logger.error(f"Error checking website {website.name}: {str(e)}")
+                    logger.error(f"Error checking {batch[0]}: {str(e)}")
             
-            # Check all internal apps
-            for internal_app in internal_apps:
-                try:
-                    self.check_internal_app(internal_app)
-                except Exception as e:
-                    logger.error(f"Error checking internal app {internal_app.name}: {str(e)}")
+            run = anomaly.run_detection(self.settings, targets)
+            if run is not None:
+                logger.info(f"Latency anomalies: {run}")
+            
+            written = statuspage.publish_if_dirty()
+            if written:
+                logger.info(f"Public status page updated: {', '.join(written)}")
             
             logger.info("Monitoring cycle completed")
         else:
@@ -265,14 +477,9 @@ class MonitoringStats:
     
     @staticmethod
     def get_website_stats(website):
-        from django.utils import timezone
-        
-        checks = MonitoringCheck.objects.filter(
-            website=website,
-            internal_app__isnull=True
-        ).order_by('-check_time')[:20]
+        checks = recent_checks(website)
         
-        if not checks.exists():
+        if not checks:
             return {
                 'total_checks': 0,
                 'online_checks': 0,
@@ -308,16 +515,22 @@ class MonitoringStats:
         websites = Website.objects.filter(status='active')
         internal_apps = InternalApp.objects.filter(is_active=True, website__status='active')
         
-        total_websites = websites.count()
-        online_websites = sum(1 for w in websites if w.is_online)
+        # Latest results come from the shared rings; only targets they can't answer hit the database
+        website_checks = [recent_checks(w) for w in websites]
+        total_websites = len(website_checks)
+        online_websites = sum(1 for checks in website_checks if checks and checks[0].is_online)
         
-        total_internal_apps = internal_apps.count()
-        online_internal_apps = sum(1 for app in internal_apps if app.is_online)
+        app_checks = [recent_checks(app, 1) for app in internal_apps]
+        total_internal_apps = len(app_checks)
+        online_internal_apps = sum(1 for checks in app_checks if checks and checks[0].is_online)
         
         # Calculate average uptime percentage across all websites
         avg_uptime = 0
-        if websites.exists():
-            avg_uptime = sum(w.uptime_percentage for w in websites) / total_websites
+        if total_websites:
+            avg_uptime = sum(
+                100 * sum(1 for c in checks if c.is_online) / len(checks) if checks else 0
+                for checks in website_checks
+            ) / total_websites
             
         return {
             'total_websites': total_websites,
@@ -1,12 +1,34 @@
+import threading
+from contextlib import contextmanager
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import Website
+from .models import Website, InternalApp, MonitoringSettings, ResponseAssertion, MaintenanceWindow
+from . import assertions, config
+from .ringbuffer import discard_target
+
+_local = threading.local()
+
+
+@contextmanager
+def suppress_notifications():
+    """Skip per-website added/removed emails in this thread; bulk operations send one summary instead."""
+    previous = getattr(_local, 'suppressed', False)
+    _local.suppressed = True
+    try:
+        yield
+    finally:
+        _local.suppressed = previous
+
+
+def notifications_suppressed():
+    return getattr(_local, 'suppressed', False)
+
 
 @receiver(post_save, sender=Website)
 def website_added_alert(sender, instance, created, **kwargs):
-    if created:
+    if created and not notifications_suppressed():
         subject = f"🆕 Website Added to Monitoring: {instance.name}"
         message = f"""
 Dear Administrator,
@@ -37,6 +59,8 @@ Web Health Checker System
 
 @receiver(post_delete, sender=Website)
 def website_deleted_alert(sender, instance, **kwargs):
+    if notifications_suppressed():
+        return
     subject = f"🗑️ Website Removed from Monitoring: {instance.name}"
     message = f"""
 Dear Administrator,
@@ -62,3 +86,24 @@ Web Health Checker System
         )
     except Exception:
         pass
+
+@receiver([post_save, post_delete], sender=ResponseAssertion)
+def response_assertion_changed(sender, instance, **kwargs):
+    # Recompile on next probe instead of waiting for the cache TTL
+    target = instance.internal_app or instance.website
+    if target is not None:
+        assertions.invalidate(target)
+
+@receiver([post_save, post_delete], sender=Website)
+@receiver([post_save, post_delete], sender=InternalApp)
+@receiver([post_save, post_delete], sender=MonitoringSettings)
+@receiver([post_save, post_delete], sender=ResponseAssertion)
+@receiver([post_save, post_delete], sender=MaintenanceWindow)
+def monitoring_config_changed(sender, **kwargs):
+    # Other processes notice through the updated_at watermark
+    config.invalidate()
+
+@receiver(post_delete, sender=Website)
+@receiver(post_delete, sender=InternalApp)
+def discard_recent_results(sender, instance, **kwargs):
+    discard_target(instance)
@@ -0,0 +1,174 @@
+"""
+SLA accounting: running uptime totals per target per day.
+
+Every stored check adds the time since the target's previous check (or its
+check interval, when there is no recent previous check) to that day's
+DailyUptime row, as downtime if the check failed. SLA reports for any date
+range sum those rows in one grouped query, so they don't depend on how much
+raw history retention keeps. Checks taken while a website is in maintenance
+(by status or a scheduled window) are counted separately and never affect
+uptime.
+"""
+import calendar
+import csv
+import io
+from datetime import date
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from .models import Website, InternalApp, DailyUptime
+from .config import get_config
+from .scheduler import check_interval
+from .maintenance import in_maintenance
+import logging
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMATS = ['json', 'csv']
+
+CSV_FIELDS = [
+    'website_id', 'website', 'internal_app_id', 'internal_app', 'uptime_percentage',
+    'downtime_minutes', 'monitored_minutes', 'checks', 'failed_checks', 'maintenance_checks',
+]
+
+
+def covered_seconds(target, check_time, last_check_at, monitoring_settings):
+    """Time a check accounts for: the gap since the previous check, unless that looks like monitoring stopped."""
+    interval = check_interval(target)
+    longest = max(interval, monitoring_settings.max_check_interval if monitoring_settings.adaptive_cadence else 0)
+    if last_check_at is not None:
+        gap = (check_time - last_check_at).total_seconds()
+        if 0 < gap <= 2 * longest:
+            return gap
+    return interval
+
+
+def record(check, website, internal_app=None, monitoring_settings=None):
+    """Add a stored check to its target's daily totals. Must run once per check."""
+    monitoring_settings = monitoring_settings or get_config().settings
+    rows = DailyUptime.objects.filter(website=website, internal_app=internal_app)
+    day = check.check_time.date()
+
+    if website.status == 'maintenance' or in_maintenance(internal_app or website, check.check_time):
+        increments = {'maintenance_checks': 1}
+    else:
+        last_check_at = rows.filter(date__lte=day).exclude(last_check_at=None).order_by('-date') \
+            .values_list('last_check_at', flat=True).first()
+        seconds = covered_seconds(internal_app or website, check.check_time, last_check_at, monitoring_settings)
+        increments = {'checks': 1, 'monitored_seconds': seconds}
+        if not check.is_online:
+            increments.update(failed_checks=1, downtime_seconds=seconds)
+
+    updates = {field: F(field) + value for field, value in increments.items()}
+    # Replayed checks can arrive out of order; keep the newest
+    updates['last_check_at'] = Greatest(Coalesce('last_check_at', Value(check.check_time)), Value(check.check_time))
+    if rows.filter(date=day).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            DailyUptime.objects.create(
+                website=website, internal_app=internal_app, date=day, last_check_at=check.check_time, **increments
+            )
+    except IntegrityError:
+        # Another process created the day's row first
+        rows.filter(date=day).update(**updates)
+
+
+def record_safely(check, website, internal_app=None):
+    """record() for the probe path: errors are logged, never raised."""
+    try:
+        record(check, website, internal_app)
+    except DatabaseError as e:
+        logger.warning(f"Could not update SLA totals for {internal_app or website}: {str(e)}")
+
+
+def record_many(checks):
+    """Add replayed checks to the daily totals, oldest first."""
+    monitoring_settings = get_config().settings
+    websites = Website.objects.in_bulk({c.website_id for c in checks})
+    apps = InternalApp.objects.in_bulk({c.internal_app_id for c in checks if c.internal_app_id})
+    for check in sorted(checks, key=lambda c: c.check_time):
+        app = apps.get(check.internal_app_id)
+        if app is not None:
+            app.website = websites[check.website_id]
+        record(check, websites[check.website_id], app, monitoring_settings)
+
+
+def month_range(month):
+    """First and last day of a 'YYYY-MM' month."""
+    try:
+        year, number = (int(part) for part in month.split('-'))
+        last_day = calendar.monthrange(year, number)[1]
+    except (ValueError, calendar.IllegalMonthError):
+        raise ValueError(f"Invalid month '{month}', expected YYYY-MM")
+    return date(year, number, 1), date(year, number, last_day)
+
+
+def _totals(row):
+    monitored = row['monitored_seconds'] or 0
+    downtime = row['downtime_seconds'] or 0
+    return {
+        'uptime_percentage': round(100 * (1 - downtime / monitored), 3) if monitored else None,
+        'downtime_minutes': round(downtime / 60, 1),
+        'monitored_minutes': round(monitored / 60, 1),
+        'checks': row['checks'] or 0,
+        'failed_checks': row['failed_checks'] or 0,
+        'maintenance_checks': row['maintenance_checks'] or 0,
+    }
+
+
+def build_report(start, end, websites=None):
+    """
+    SLA figures per website (its own checks) with its internal apps, for start..end inclusive.
+    websites defaults to every website that isn't inactive.
+    """
+    if websites is None:
+        websites = Website.objects.exclude(status='inactive')
+    websites = list(websites.order_by('name'))
+
+    totals = {
+        (row['website_id'], row['internal_app_id']): row
+        for row in DailyUptime.objects.filter(
+            date__gte=start, date__lte=end, website__in=websites,
+        ).values('website_id', 'internal_app_id').annotate(
+            checks=Sum('checks'),
+            failed_checks=Sum('failed_checks'),
+            maintenance_checks=Sum('maintenance_checks'),
+            monitored_seconds=Sum('monitored_seconds'),
+            downtime_seconds=Sum('downtime_seconds'),
+        ).order_by()
+    }
+    empty = {'checks': 0, 'failed_checks': 0, 'maintenance_checks': 0, 'monitored_seconds': 0, 'downtime_seconds': 0}
+
+    apps = {}
+    for app in InternalApp.objects.filter(website__in=websites).order_by('name'):
+        apps.setdefault(app.website_id, []).append(app)
+
+    report = []
+    for website in websites:
+        report.append({
+            'id': website.id,
+            'name': website.name,
+            'url': website.url,
+            **_totals(totals.get((website.id, None), empty)),
+            'internal_apps': [
+                {'id': app.id, 'name': app.name, **_totals(totals.get((website.id, app.id), empty))}
+                for app in apps.get(website.id, [])
+            ],
+        })
+    return {'start': start.isoformat(), 'end': end.isoformat(), 'websites': report}
+
+
+def report_csv(report):
+    """One CSV row per website and internal app."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for website in report['websites']:
+        writer.writerow({**website, 'website_id': website['id'], 'website': website['name']})
+        for app in website['internal_apps']:
+            writer.writerow({
+                **app, 'website_id': website['id'], 'website': website['name'],
+                'internal_app_id': app['id'], 'internal_app': app['name'],
+            })
+    return output.getvalue()
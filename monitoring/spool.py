@@ -0,0 +1,258 @@
+"""
+Local durable spool for check results the database can't take right now.
+
+When a write fails (or is slow), the result is appended to a per-process,
+append-only file of length-prefixed records and the database is bypassed for
+MONITORING_SPOOL_RETRY seconds, so probing never waits on it. Writes are fsynced
+in batches. Once the database answers again the spool is replayed with
+bulk_create; every check carries a spool_id assigned at probe time, so a replay
+interrupted halfway can simply be run again.
+"""
+import atexit
+import glob
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from . import sla
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Record header: payload length and CRC32, big-endian
+HEADER = struct.Struct('>II')
+
+# fsync after this many records or this many seconds, whichever comes first
+FSYNC_EVERY = 32
+FSYNC_INTERVAL = 1.0
+
+# Checks inserted per bulk_create during replay
+REPLAY_BATCH_SIZE = 500
+
+# Fields stored per record; check_time and spool_id are always included
+FIELDS = [
+    'website_id', 'internal_app_id', 'is_online', 'response_time', 'dns_time', 'status_code',
+    'error_message', 'response_content', 'attempts', 'cert_expires_at',
+]
+DATETIME_FIELDS = ['check_time', 'cert_expires_at']
+
+
+def encode(check):
+    """Compact, length-prefixed record for a MonitoringCheck."""
+    record = {name: getattr(check, name) for name in FIELDS}
+    record['check_time'] = check.check_time
+    record['spool_id'] = check.spool_id.hex
+    for name in DATETIME_FIELDS:
+        if record[name] is not None:
+            record[name] = record[name].isoformat()
+    payload = json.dumps(record, separators=(',', ':')).encode()
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode(data):
+    """Records in a spool file's bytes; a torn or corrupt tail ends the read."""
+    records, offset = [], 0
+    while offset + HEADER.size <= len(data):
+        length, crc = HEADER.unpack_from(data, offset)
+        payload = data[offset + HEADER.size:offset + HEADER.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append(json.loads(payload))
+        offset += HEADER.size + length
+    if offset < len(data):
+        logger.warning(f"Discarding {len(data) - offset} bytes of incomplete spool data")
+    return records
+
+
+def _to_check(record):
+    from .models import MonitoringCheck
+    for name in DATETIME_FIELDS:
+        if record.get(name):
+            record[name] = datetime.fromisoformat(record[name])
+    record['spool_id'] = uuid.UUID(record['spool_id'])
+    return MonitoringCheck(**record)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CheckSpool:
+    """Write-through to the database, falling back to an append-only local file."""
+
+    def __init__(self, directory, retry=30, slow_write=2.0):
+        self.directory = str(directory)
+        self.retry = retry
+        self.slow_write = slow_write
+        self.path = os.path.join(self.directory, f'checks-{os.getpid()}.spool')
+        self._file = None
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._bypass_until = 0.0
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+
+    def database_available(self):
+        return time.monotonic() >= self._bypass_until
+
+    def mark_unavailable(self, reason):
+        if self.database_available():
+            logger.warning(f"Spooling check results for {self.retry}s: {reason}")
+        self._bypass_until = time.monotonic() + self.retry
+
+    def save(self, check):
+        """Insert a check, or spool it if the database is down, locked or slow. Spooled checks keep pk None."""
+        if not self.database_available():
+            self.append(check)
+            return check
+
+        started = time.monotonic()
+        try:
+            check.save()
+        except DatabaseError as e:
+            check.pk = None
+            connection.close_if_unusable_or_obsolete()
+            self.mark_unavailable(str(e))
+            self.append(check)
+            return check
+
+        elapsed = time.monotonic() - started
+        if elapsed > self.slow_write:
+            self.mark_unavailable(f"check insert took {elapsed:.1f}s")
+        return check
+
+    def append(self, check):
+        record = encode(check)
+        with self._lock:
+            if self._file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._file = open(self.path, 'ab')
+            self._file.write(record)
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= FSYNC_EVERY or time.monotonic() - self._synced_at >= FSYNC_INTERVAL:
+                self._sync()
+
+    def _sync(self):
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def _rotate(self):
+        """Move this process's live spool (and any left by dead processes) aside for replay."""
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+            candidates = glob.glob(os.path.join(self.directory, 'checks-*.spool'))
+            for path in candidates:
+                pid = os.path.basename(path)[len('checks-'):-len('.spool')]
+                if path != self.path and pid.isdigit() and _pid_alive(int(pid)):
+                    continue
+                try:
+                    os.replace(path, f"{path[:-len('.spool')]}-{time.time_ns()}.replay")
+                except FileNotFoundError:
+                    pass
+        return sorted(glob.glob(os.path.join(self.directory, 'checks-*.replay')))
+
+    def pending(self):
+        """Spool files waiting for replay (this process's live one included)."""
+        return glob.glob(os.path.join(self.directory, 'checks-*.spool')) + \
+            glob.glob(os.path.join(self.directory, 'checks-*.replay'))
+
+    def replay(self):
+        """Bulk-insert spooled checks; returns the number of records replayed."""
+        from .models import MonitoringCheck, Website, InternalApp
+
+        with self._replay_lock:
+            replayed = 0
+            for path in self._rotate():
+                try:
+                    with open(path, 'rb') as f:
+                        records = decode(f.read())
+                except FileNotFoundError:
+                    # Another process replayed it first
+                    continue
+
+                try:
+                    # Targets deleted since the probe would fail the whole batch on their foreign key
+                    website_ids = set(Website.objects.filter(
+                        id__in={r['website_id'] for r in records}).values_list('id', flat=True))
+                    app_ids = set(InternalApp.objects.filter(
+                        id__in={r['internal_app_id'] for r in records if r['internal_app_id']}).values_list('id', flat=True))
+                    checks = [
+                        _to_check(r) for r in records
+                        if r['website_id'] in website_ids and (r['internal_app_id'] is None or r['internal_app_id'] in app_ids)
+                    ]
+                    with transaction.atomic():
+                        # Only checks not stored by an earlier, interrupted replay count towards the SLA totals
+                        stored = set()
+                        for i in range(0, len(checks), REPLAY_BATCH_SIZE):
+                            stored.update(MonitoringCheck.objects.filter(
+                                spool_id__in=[c.spool_id for c in checks[i:i + REPLAY_BATCH_SIZE]],
+                            ).values_list('spool_id', flat=True))
+                        checks = [c for c in checks if c.spool_id not in stored]
+                        MonitoringCheck.objects.bulk_create(checks, batch_size=REPLAY_BATCH_SIZE, ignore_conflicts=True)
+                        sla.record_many(checks)
+                except DatabaseError as e:
+                    connection.close_if_unusable_or_obsolete()
+                    self.mark_unavailable(f"spool replay failed: {str(e)}")
+                    break
+
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                replayed += len(checks)
+                logger.info(f"Replayed {len(checks)} spooled checks from {os.path.basename(path)}")
+            return replayed
+
+    def replay_if_due(self):
+        """Replay once the bypass window has passed and something is spooled."""
+        if not self.database_available() or not self.pending():
+            return 0
+        return self.replay()
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_spool():
+    """Return the check spool shared by every probe in this process."""
+    global _spool
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                _spool = CheckSpool(
+                    settings.MONITORING_SPOOL_DIR,
+                    retry=settings.MONITORING_SPOOL_RETRY,
+                    slow_write=settings.MONITORING_SPOOL_SLOW_WRITE,
+                )
+                atexit.register(_spool.close)
+    return _spool
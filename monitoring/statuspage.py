@@ -0,0 +1,278 @@
+"""
+Static public status page.
+
+After monitoring runs, the public page and its JSON are rendered into
+MONITORING_STATUS_PAGE_DIR for nginx or a CDN to serve without Django. Each
+section (summary, incidents, one per website) is re-rendered only when its data
+changed, and a file is rewritten only when its bytes changed; writes go through
+a temporary file and an atomic rename, so readers never see a partial page.
+Only names and states are published: no URLs, error messages or emails.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils import timezone
+from .models import Website, InternalApp
+from .maintenance import get_index, in_maintenance
+import logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = '.manifest.json'
+
+_dirty = threading.Event()
+
+# Maintenance index marker at the last publish: windows starting or ending change the page without new results
+_maintenance_marker = None
+
+
+def mark_dirty():
+    """Note that new results exist; the next publish_if_dirty() regenerates."""
+    _dirty.set()
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _context_digest(context):
+    return _digest(json.dumps(context, sort_keys=True, default=str).encode())
+
+
+def write_atomic(path, content):
+    """Replace path with content via a synced temporary file in the same directory."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _target_state(target, checks):
+    if getattr(target, 'status', 'active') == 'maintenance' or in_maintenance(target):
+        return 'maintenance'
+    if not checks:
+        return 'unknown'
+    if not checks[0].is_online:
+        return 'offline'
+    return 'degraded' if target.is_degraded else 'online'
+
+
+def _down_since(checks):
+    """Time of the first failed check of the current outage (checks newest first)."""
+    since = None
+    for check in checks:
+        if check.is_online:
+            break
+        since = check.check_time
+    return since
+
+
+def _incident(website, app, checks):
+    """The outage of a target from its checks (newest first), or None when the newest check is up."""
+    since = _down_since(checks)
+    if since is None:
+        return None
+    return {
+        'website': website.name,
+        'app': app.name if app else None,
+        'since': since.strftime('%Y-%m-%d %H:%M UTC'),
+    }
+
+
+def collect():
+    """Public view of every monitored website: (summary, incidents, websites, volatile JSON details)."""
+    from .services import recent_checks
+
+    websites = list(Website.objects.exclude(status='inactive').order_by('name'))
+    apps = {}
+    for app in InternalApp.objects.filter(is_active=True, website__in=websites).order_by('name'):
+        apps.setdefault(app.website_id, []).append(app)
+
+    sections, details, incidents = [], {}, []
+    for website in websites:
+        checks = recent_checks(website)
+        uptime = round(100 * sum(1 for c in checks if c.is_online) / len(checks), 1) if checks else None
+        state = _target_state(website, checks)
+        incident = _incident(website, None, checks) if state == 'offline' else None
+        if incident:
+            incidents.append(incident)
+        app_states = []
+        for app in apps.get(website.id, []):
+            # One read for both the state and the incident, so a result landing in between can't split them
+            app_checks = recent_checks(app)
+            app_state = 'maintenance' if website.status == 'maintenance' else _target_state(app, app_checks)
+            incident = _incident(website, app, app_checks) if app_state == 'offline' else None
+            if incident:
+                incidents.append(incident)
+            app_states.append({'name': app.name, 'type': app.get_app_type_display(), 'state': app_state})
+        sections.append({
+            'id': website.id,
+            'name': website.name,
+            'state': state,
+            'uptime': uptime,
+            'apps': app_states,
+        })
+        details[website.id] = [
+            {'time': c.check_time.isoformat(), 'up': c.is_online, 'response_time': c.response_time}
+            for c in checks
+        ]
+
+    states = [s['state'] for s in sections if s['state'] != 'maintenance']
+    down = states.count('offline') + sum(
+        1 for s in sections if s['state'] != 'maintenance' for a in s['apps'] if a['state'] == 'offline'
+    )
+    if states and all(state == 'offline' for state in states):
+        overall = 'major_outage'
+    elif down:
+        overall = 'partial_outage'
+    elif any(s['state'] == 'degraded' or any(a['state'] == 'degraded' for a in s['apps']) for s in sections):
+        overall = 'degraded'
+    elif any(s['state'] == 'maintenance' for s in sections):
+        overall = 'maintenance'
+    else:
+        overall = 'operational'
+    summary = {
+        'overall': overall,
+        'websites': len(sections),
+        'online': states.count('online') + states.count('degraded'),
+        'offline': states.count('offline'),
+    }
+
+    # Targets that are down right now, most recent outage first
+    incidents.sort(key=lambda incident: incident['since'], reverse=True)
+    return summary, incidents, sections, details
+
+
+class StatusPageGenerator:
+    """Renders the public status page into a directory, rewriting only what changed."""
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self._fragments = {}
+        self._lock = threading.Lock()
+        self._manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _fragment(self, key, template, context):
+        digest = _context_digest(context)
+        cached = self._fragments.get(key)
+        if cached is None or cached[0] != digest:
+            cached = (digest, render_to_string(template, context))
+            self._fragments[key] = cached
+        return cached[1]
+
+    def _write(self, name, content, written):
+        digest = _digest(content)
+        path = os.path.join(self.directory, name)
+        if self._manifest.get(name) == digest and os.path.exists(path):
+            return
+        write_atomic(path, content)
+        self._manifest[name] = digest
+        written.append(name)
+
+    def generate(self, force=False):
+        """Render and write changed files; returns the names written."""
+        with self._lock:
+            if force:
+                self._fragments.clear()
+                self._manifest = {}
+            summary, incidents, sections, details = collect()
+            written = []
+
+            fragments = [self._fragment('summary', 'monitoring/public/_summary.html', {'summary': summary})]
+            fragments.append(self._fragment('incidents', 'monitoring/public/_incidents.html', {'incidents': incidents}))
+            fragments += [
+                self._fragment(f"website-{s['id']}", 'monitoring/public/_website.html', {'website': s})
+                for s in sections
+            ]
+            live = {'summary', 'incidents'} | {f"website-{s['id']}" for s in sections}
+            for key in [k for k in self._fragments if k not in live]:
+                del self._fragments[key]
+
+            page = render_to_string('monitoring/public/index.html', {'sections': fragments})
+            self._write('index.html', page.encode(), written)
+
+            for section in sections:
+                self._write(f"websites/{section['id']}.json", json.dumps(
+                    {**section, 'checks': details[section['id']]}, indent=2).encode(), written)
+
+            # The generation time lives only here, so the HTML stays untouched while nothing changes
+            self._write('status.json', json.dumps({
+                'generated_at': timezone.now().isoformat(),
+                'summary': summary,
+                'incidents': incidents,
+                'websites': sections,
+            }, indent=2).encode(), written)
+
+            stale = [
+                name for name in self._manifest
+                if name.startswith('websites/') and name not in {f"websites/{s['id']}.json" for s in sections}
+            ]
+            for name in stale:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                del self._manifest[name]
+
+            if written or stale:
+                write_atomic(os.path.join(self.directory, MANIFEST), json.dumps(self._manifest).encode())
+            return written
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    """The status page generator for this process, or None when MONITORING_STATUS_PAGE_DIR is empty."""
+    global _generator
+    if _generator is None and settings.MONITORING_STATUS_PAGE_DIR:
+        with _generator_lock:
+            if _generator is None:
+                _generator = StatusPageGenerator(settings.MONITORING_STATUS_PAGE_DIR)
+    return _generator
+
+
+def publish_if_dirty():
+    """Regenerate if results came in (or a maintenance window started or ended) since the last run; returns the files written."""
+    global _maintenance_marker
+    generator = get_generator()
+    if generator is None:
+        return []
+    try:
+        marker = get_index().marker()
+    except Exception:
+        marker = _maintenance_marker
+    if marker != _maintenance_marker:
+        _maintenance_marker = marker
+        _dirty.set()
+    if not _dirty.is_set():
+        return []
+    _dirty.clear()
+    try:
+        return generator.generate()
+    except Exception as e:
+        _dirty.set()
+        logger.error(f"Error generating status page: {str(e)}")
+        return []
@@ -54,6 +54,26 @@ def check_single_internal_app(internal_app_id):
         raise
 
 
+@shared_task
+def run_manual_check_job(job_id, website_id):
+    """Celery task to run a manual check job submitted from the dashboard."""
+    from .jobs import run_manual_check
+    state = run_manual_check(job_id, website_id)
+    return f"Manual check job {job_id}: {state.get('status')}"
+
+
+@shared_task
+def run_retention():
+    """Celery task to trim monitoring history and maintain the database."""
+    try:
+        from .retention import RetentionService
+        run = RetentionService().run()
+        return f"Retention completed: {run.rows_deleted} rows deleted in {run.duration}s"
+    except Exception as e:
+        logger.error(f"Error in retention task: {str(e)}")
+        raise
+
+
 
 
 
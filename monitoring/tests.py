@@ -0,0 +1,832 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from unittest import mock, skipIf
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.middleware.csrf import CSRF_SECRET_LENGTH
+from django.db import DatabaseError, connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from .models import Website, InternalApp, MonitoringCheck, AlertLog, MonitoringSettings, ResponseAssertion
+from .probes import ProbeResult, mysql_probe
+from .planner import normalize_url, plan_cycle
+from .breaker import CircuitBreaker, PROBE, PRECHECK, SKIP
+from .scheduler import ProbeScheduler
+from .hedging import probe_with_hedging
+from .certificates import CertificateCache, CertificateInfo
+from .spool import CheckSpool, decode, encode
+from .ringbuffer import RecentResult, RecentResults, SLOT_HEADER, WEBSITE
+from .assertions import CompiledAssertions, compile_assertion, PREVIEW_CHARS
+from . import anomaly, config, services, sla, statuspage
+from .signals import suppress_notifications
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Changelist query counts must not grow with the number of rows on the page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def add_websites(self, count):
+        with suppress_notifications():
+            for i in range(Website.objects.count(), Website.objects.count() + count):
+                website = Website.objects.create(
+                    name=f'Site {i}', url=f'https://site{i}.example.com', alert_email='ops@example.com'
+                )
+                app = InternalApp.objects.create(website=website, name=f'App {i}', url=f'https://app{i}.example.com')
+                MonitoringCheck.objects.create(website=website, is_online=True, response_time=0.1, status_code=200)
+                MonitoringCheck.objects.create(website=website, internal_app=app, is_online=False)
+                AlertLog.objects.create(
+                    website=website, alert_type='down', email_sent_to='ops@example.com', subject='Down', message='Down'
+                )
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:monitoring_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, model):
+        self.add_websites(3)
+        expected = self.changelist_queries(model)
+        self.add_websites(30)
+        url = reverse(f'admin:monitoring_{model}_changelist')
+        with self.assertNumQueries(expected):
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+
+    def test_website_changelist(self):
+        self.assert_constant_queries('website')
+
+    def test_internal_app_changelist(self):
+        self.assert_constant_queries('internalapp')
+
+    def test_monitoring_check_changelist(self):
+        self.assert_constant_queries('monitoringcheck')
+
+    def test_alert_log_changelist(self):
+        self.assert_constant_queries('alertlog')
+
+
+class TargetsApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True, HTTP_HOST='localhost')
+        self.client.force_login(self.admin_user)
+
+    def csrf_token(self):
+        token = get_random_string(CSRF_SECRET_LENGTH)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = token
+        return token
+
+    def test_posts_require_csrf_token(self):
+        for name in ['api_targets', 'api_targets_delete']:
+            response = self.client.post(reverse(f'monitoring:{name}'), '{"urls": []}', content_type='application/json')
+            self.assertEqual(response.status_code, 403)
+
+    def test_delete_rejects_non_list_urls(self):
+        token = self.csrf_token()
+        for body in ['{"urls": "https://example.com"}', '{"urls": [1]}', '{"urls": {"a": 1}}', '[]']:
+            response = self.client.post(
+                reverse('monitoring:api_targets_delete'), body,
+                content_type='application/json', HTTP_X_CSRFTOKEN=token,
+            )
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_delete_by_url(self):
+        with suppress_notifications():
+            Website.objects.create(name='Site', url='https://site.example.com', alert_email='ops@example.com')
+        response = self.client.post(
+            reverse('monitoring:api_targets_delete'), '{"urls": ["https://site.example.com"]}',
+            content_type='application/json', HTTP_X_CSRFTOKEN=self.csrf_token(),
+        )
+        self.assertEqual(response.json()['deleted'], ['https://site.example.com'])
+        self.assertFalse(Website.objects.exists())
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(self.admin_user)
+
+    def test_requires_staff(self):
+        self.client.logout()
+        for kind in ['checks', 'alerts']:
+            response = self.client.get(reverse('monitoring:export_data', args=[kind]))
+            self.assertEqual(response.status_code, 403)
+
+    def test_invalid_filters_are_rejected_before_streaming(self):
+        url = reverse('monitoring:export_data', args=['checks'])
+        for params in [{'since': '2026-02-30T00:00:00'}, {'until': 'yesterday'}, {'website': 'abc'}]:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_valid_filters_stream(self):
+        url = reverse('monitoring:export_data', args=['checks'])
+        response = self.client.get(url, {'since': '2026-01-01T00:00:00Z', 'website': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'id,'))
+
+
+def create_website(name='Site', **fields):
+    with suppress_notifications():
+        return Website.objects.create(
+            name=name, url=f'https://{name.lower().replace(" ", "-")}.example.com', alert_email='ops@example.com', **fields
+        )
+
+
+def add_checks(website, states, response_time=0.1, internal_app=None):
+    """Checks oldest first, one a minute up to now."""
+    now = timezone.now()
+    for i, is_online in enumerate(states):
+        MonitoringCheck.objects.create(
+            website=website, internal_app=internal_app, is_online=is_online,
+            response_time=response_time if is_online else None, check_time=now - timedelta(minutes=len(states) - i),
+        )
+
+
+class AdaptiveTimeoutTests(TestCase):
+
+    def setUp(self):
+        self.website = create_website(timeout=30)
+        self.service = services.MonitoringService()
+        self.service.settings = MonitoringSettings(adaptive_timeouts=True, probe_retries=0)
+        services._down_probes.clear()
+
+    def probe(self, result):
+        with mock.patch.object(services, 'probe_with_hedging', return_value=result) as probe:
+            self.service.probe_target(self.website)
+        return [c.args[1] for c in probe.call_args_list]
+
+    def test_timeout_of_up_target_is_confirmed_with_full_timeout(self):
+        add_checks(self.website, [True] * 10)
+        deadlines = self.probe(ProbeResult(timed_out=True))
+        self.assertEqual(len(deadlines), 2)
+        self.assertIsNotNone(deadlines[0])
+        self.assertIsNone(deadlines[1])
+
+    def test_down_target_keeps_short_deadline_except_every_nth_probe(self):
+        add_checks(self.website, [True] * 10 + [False])
+        deadlines = [self.probe(ProbeResult(timed_out=True)) for _ in range(services.FULL_TIMEOUT_EVERY)]
+        self.assertTrue(all(len(d) == 1 and d[0] is not None for d in deadlines[:-1]))
+        self.assertEqual(deadlines[-1], [None])
+
+
+class SerialExecutor:
+    """Stands in for a ThreadPoolExecutor: threads can't share the in-memory test database."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+
+class ManualCheckJobTests(TestCase):
+
+    def setUp(self):
+        self.website = create_website()
+        InternalApp.objects.create(website=self.website, name='API', url='https://api.example.com')
+
+    def test_job_state_is_stored_in_the_database(self):
+        from . import jobs
+        with mock.patch.object(jobs, '_broker_available', return_value=False), \
+                mock.patch.object(jobs, '_get_executor') as executor:
+            job_id = jobs.submit_manual_check(self.website)
+        self.assertEqual(jobs.get_job(job_id)['status'], 'queued')
+
+        # Run as a worker process would; the state is visible to any process polling the database
+        online = ProbeResult(is_online=True, status_code=200, response_time=0.1)
+        with mock.patch.object(services.MonitoringService, 'probe_target', return_value=online), \
+                mock.patch.object(jobs, 'ThreadPoolExecutor', SerialExecutor), \
+                mock.patch.object(jobs.connection, 'close'):
+            jobs.run_manual_check(*executor.return_value.submit.call_args.args[1:])
+        job = jobs.get_job(job_id)
+        self.assertEqual((job['status'], job['total'], job['completed']), ('done', 2, 2))
+        self.assertTrue(all(result['is_online'] for result in job['results']))
+
+    def test_expired_jobs_are_not_pollable(self):
+        from . import jobs
+        from .models import ManualCheckJob
+        ManualCheckJob.objects.create(job_id='old', website=self.website)
+        ManualCheckJob.objects.filter(job_id='old').update(
+            created_at=timezone.now() - timedelta(seconds=jobs.JOB_TTL + 1)
+        )
+        self.assertIsNone(jobs.get_job('old'))
+
+    def test_broker_check_is_cached(self):
+        from . import jobs
+        jobs._broker_checked = (0.0, False)
+        with self.settings(CELERY_TASK_ALWAYS_EAGER=False), \
+                mock.patch('server_checker.celery.app.connection_for_write', side_effect=OSError('down')) as connect:
+            self.assertFalse(jobs._broker_available())
+            self.assertFalse(jobs._broker_available())
+        self.assertEqual(connect.call_count, 1)
+        jobs._broker_checked = (0.0, False)
+
+
+class AssertionTests(SimpleTestCase):
+
+    def evaluate(self, rows, chunks, status_code=200, headers=None, response_time=0.1):
+        """Failures of assertion rows [(type, target, value)] over a streamed body; also returns unread chunks."""
+        assertions = CompiledAssertions([
+            compile_assertion(ResponseAssertion(assertion_type=kind, target=target, value=value))
+            for kind, target, value in rows
+        ])
+        chunks = iter(chunks)
+        evaluation = assertions.start(status_code, headers or {}, 200)
+        evaluation.read(chunks)
+        return evaluation.failures(response_time), list(chunks)
+
+    def test_body_contains_split_across_chunks_stops_reading(self):
+        padding = 'x' * PREVIEW_CHARS
+        failures, unread = self.evaluate([('body_contains', '', 'healthy')], [padding + 'hea', 'lthy', 'rest'])
+        self.assertEqual(failures, [])
+        self.assertEqual(unread, ['rest'])
+
+    def test_body_not_contains(self):
+        failures, _ = self.evaluate([('body_not_contains', '', 'error')], ['all good, no err', 'or here'])
+        self.assertEqual(failures, ["Body contains 'error'"])
+
+    def test_regex_split_across_chunks(self):
+        failures, _ = self.evaluate([('body_regex', '', r'status: ok+')], ['{"stat', 'us: ok"}'])
+        self.assertEqual(failures, [])
+
+    def test_anchored_regex_is_matched_against_the_full_body(self):
+        # "ok$" matches the end of the first chunk, but not the end of the body
+        failures, _ = self.evaluate([('body_regex', '', r'ok$')], ['ok', ' and more'])
+        self.assertEqual(failures, ['Body does not match /ok$/'])
+        failures, _ = self.evaluate([('body_regex', '', r'\bok')], ['x' + 'ok' + 'y' * 2000, 'z'])
+        self.assertEqual(len(failures), 1)
+        failures, _ = self.evaluate([('body_regex', '', r'^{"ok')], ['{"o', 'k": true}'])
+        self.assertEqual(failures, [])
+
+    def test_json_path_and_header(self):
+        rows = [('json_path_equals', 'data.items.0.state', 'up'), ('header_matches', 'Content-Type', 'json')]
+        failures, _ = self.evaluate(rows, ['{"data": {"items": [{"state": "up"}]}}'], headers={'Content-Type': 'application/json'})
+        self.assertEqual(failures, [])
+        failures, _ = self.evaluate(rows, ['{"data": {}}'], headers={})
+        self.assertEqual(failures, ['JSON path data.items.0.state not found', 'Header Content-Type missing'])
+
+    def test_status_list_replaces_expected_status(self):
+        failures, _ = self.evaluate([('status_in', '', '200-299,301')], [''], status_code=204)
+        self.assertEqual(failures, [])
+        failures, _ = self.evaluate([('status_in', '', '200-299,301')], [''], status_code=302)
+        self.assertEqual(failures, ['Status 302 not in 200-299,301'])
+
+    def test_max_response_time(self):
+        failures, _ = self.evaluate([('max_response_time', '', '0.5')], [''], response_time=0.8)
+        self.assertEqual(failures, ['Response took 0.8s (max 0.5s)'])
+
+    def test_invalid_assertions_are_rejected(self):
+        for kind, value in [('body_regex', '('), ('status_in', 'abc'), ('max_response_time', 'soon')]:
+            with self.assertRaises(ValueError):
+                compile_assertion(ResponseAssertion(assertion_type=kind, target='', value=value))
+
+
+class SLATests(TestCase):
+
+    def setUp(self):
+        self.website = create_website(check_interval=60)
+        self.app = InternalApp.objects.create(website=self.website, name='API', url='https://api.example.com')
+        self.start = datetime(2026, 3, 10, 12, 0, tzinfo=dt_timezone.utc)
+
+    def record(self, states, internal_app=None, step=60):
+        for i, is_online in enumerate(states):
+            check = MonitoringCheck(check_time=self.start + timedelta(seconds=i * step), is_online=is_online)
+            sla.record(check, self.website, internal_app, MonitoringSettings())
+
+    def test_checks_cover_the_gap_since_the_previous_one(self):
+        self.record([True, False, True])
+        report = sla.build_report(date(2026, 3, 1), date(2026, 3, 31))
+        website = report['websites'][0]
+        self.assertEqual((website['checks'], website['failed_checks']), (3, 1))
+        self.assertEqual(website['monitored_minutes'], 3.0)
+        self.assertEqual(website['downtime_minutes'], 1.0)
+        self.assertEqual(website['uptime_percentage'], 66.667)
+
+    def test_long_gaps_count_one_interval(self):
+        # Monitoring stopped for an hour: the check after the gap covers one interval, not the hour
+        self.record([True, False], step=3600)
+        website = sla.build_report(date(2026, 3, 10), date(2026, 3, 10))['websites'][0]
+        self.assertEqual((website['monitored_minutes'], website['downtime_minutes']), (2.0, 1.0))
+
+    def test_apps_are_reported_under_their_website(self):
+        self.record([True, True])
+        self.record([False, False], internal_app=self.app)
+        website = sla.build_report(date(2026, 3, 10), date(2026, 3, 10))['websites'][0]
+        self.assertEqual(website['uptime_percentage'], 100.0)
+        self.assertEqual(website['internal_apps'][0]['uptime_percentage'], 0.0)
+        rows = sla.report_csv(sla.build_report(date(2026, 3, 10), date(2026, 3, 10))).splitlines()
+        self.assertEqual(len(rows), 3)
+
+    def test_maintenance_checks_do_not_affect_uptime(self):
+        self.website.status = 'maintenance'
+        self.record([False, False])
+        website = sla.build_report(date(2026, 3, 10), date(2026, 3, 10), Website.objects.all())['websites'][0]
+        self.assertEqual((website['checks'], website['maintenance_checks']), (0, 2))
+        self.assertIsNone(website['uptime_percentage'])
+
+    def test_month_range(self):
+        self.assertEqual(sla.month_range('2024-02'), (date(2024, 2, 1), date(2024, 2, 29)))
+        with self.assertRaises(ValueError):
+            sla.month_range('2024-13')
+
+    def test_api_requires_staff(self):
+        client = Client(HTTP_HOST='localhost')
+        url = reverse('monitoring:api_sla')
+        self.assertEqual(client.get(url).status_code, 403)
+        client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = client.get(url, {'month': '2026-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['websites'][0]['name'], self.website.name)
+
+
+class QueryPlanTests(TestCase):
+    """The hot query shapes check_query_plans knows about must keep using indexes."""
+
+    def test_hot_queries_use_indexes(self):
+        from .management.commands.check_query_plans import Command
+        command = Command()
+        website, internal_app = command.seed(5000, 20)
+        for name, queryset in command.get_query_shapes(website, internal_app):
+            with self.subTest(name):
+                self.assertEqual(command.get_plan_problems(queryset.explain()), [])
+
+
+def serve_once(reply):
+    """Listen on a local port, send reply to the first client and close; returns the port."""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def answer():
+        client, _ = server.accept()
+        with client:
+            client.sendall(reply)
+        server.close()
+
+    threading.Thread(target=answer, daemon=True).start()
+    return server.getsockname()[1]
+
+
+def mysql_packet(payload):
+    return len(payload).to_bytes(3, 'little') + b'\x00' + payload
+
+
+class MySQLProbeTests(SimpleTestCase):
+
+    def probe(self, payload):
+        return mysql_probe(f'mysql://127.0.0.1:{serve_once(mysql_packet(payload))}', timeout=5)
+
+    def test_greeting_means_up(self):
+        self.assertTrue(self.probe(b'\x0a8.0.36\x00' + b'\x00' * 20).is_online)
+
+    def test_error_before_handshake_keeps_the_whole_message(self):
+        result = self.probe(b'\xff\x10\x04Too many connections')
+        self.assertFalse(result.is_online)
+        self.assertEqual(result.error_message, 'MySQL error 1040: Too many connections')
+
+    def test_error_with_sql_state(self):
+        result = self.probe(b'\xff\x15\x04#28000Access denied')
+        self.assertEqual(result.error_message, 'MySQL error 1045: Access denied')
+
+
+class StatusPageTests(TestCase):
+
+    def setUp(self):
+        self.website = create_website()
+        self.app = InternalApp.objects.create(website=self.website, name='API', url='https://api.example.com')
+        add_checks(self.website, [True] * 3)
+        # The shared rings outlive the test database: read checks from the database
+        patcher = mock.patch.object(services, 'recent_results', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_down_app_is_an_incident(self):
+        add_checks(self.website, [True, False, False], internal_app=self.app)
+        summary, incidents, sections, _ = statuspage.collect()
+        self.assertEqual(summary['overall'], 'partial_outage')
+        self.assertEqual(sections[0]['apps'][0]['state'], 'offline')
+        self.assertEqual([(i['website'], i['app']) for i in incidents], [('Site', 'API')])
+
+    def test_app_recovering_during_collect_does_not_break_the_page(self):
+        add_checks(self.website, [True, False], internal_app=self.app)
+        recovered = [services.RecentResult(timezone.now(), True, 0.1, 200)]
+        reads = []
+
+        def recent_checks(target, limit=services.RESULTS_PER_TARGET):
+            if target == self.app:
+                reads.append(limit)
+                if len(reads) > 1:
+                    return recovered
+            return original(target, limit)
+
+        original = services.recent_checks
+        with mock.patch.object(services, 'recent_checks', recent_checks):
+            _, incidents, sections, _ = statuspage.collect()
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(sections[0]['apps'][0]['state'], 'offline')
+        self.assertEqual(len(incidents), 1)
+
+
+class PlannerTests(TestCase):
+
+    def setUp(self):
+        self.website = create_website(timeout=30)
+        self.app = InternalApp.objects.create(
+            website=self.website, name='Home', url='HTTPS://Site.Example.com:443/#top', timeout=20
+        )
+
+    def test_normalize_url(self):
+        self.assertEqual(normalize_url('HTTPS://Example.COM:443#top'), 'https://example.com/')
+        self.assertEqual(normalize_url('http://example.com:8080/a?b=1'), 'http://example.com:8080/a?b=1')
+
+    def test_identical_probes_are_grouped(self):
+        other = create_website('Other')
+        slow = create_website('Slow', timeout=31)
+        slow.url = self.website.url
+        groups = plan_cycle([self.website, self.app, other, slow])
+        self.assertEqual([g.targets for g in groups], [[self.website, self.app], [other], [slow]])
+        self.assertEqual(groups[0].leader, self.website)
+
+    def test_group_is_probed_once_and_fanned_out(self):
+        service = services.MonitoringService()
+        service.settings = MonitoringSettings(breaker_failure_threshold=0)
+        group = plan_cycle([self.website, self.app])[0]
+        result = ProbeResult(is_online=True, status_code=200, response_time=25)
+        with mock.patch.object(service, 'probe_target', return_value=result) as probe:
+            checks = service.check_group(group)
+        probe.assert_called_once_with(self.website)
+        # The app's 20s timeout would have expired before the 25s answer
+        self.assertEqual([(c.website_id, c.internal_app_id, c.is_online) for c in checks],
+                         [(self.website.pk, None, True), (self.website.pk, self.app.pk, False)])
+
+
+class CircuitBreakerTests(TestCase):
+
+    def setUp(self):
+        self.settings = MonitoringSettings(breaker_failure_threshold=2, breaker_base_backoff=10, breaker_max_backoff=30)
+        self.breaker = CircuitBreaker()
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertIsNone(self.breaker.record('key', True, self.settings))
+        backoffs = [self.breaker.record('key', False, self.settings).backoff for _ in range(5)]
+        self.assertEqual(backoffs, [0, 10, 20, 30, 30])
+        self.assertEqual(self.breaker.before_probe('key', self.settings), SKIP)
+        self.assertEqual(self.breaker.before_probe('other', self.settings), PROBE)
+
+    def test_precheck_once_backoff_elapsed_and_recovery_closes(self):
+        for _ in range(2):
+            self.breaker.record('key', False, self.settings)
+        with mock.patch('monitoring.breaker.time.monotonic', return_value=time.monotonic() + 11):
+            self.assertEqual(self.breaker.before_probe('key', self.settings), PRECHECK)
+        self.breaker.record('key', True, self.settings)
+        self.assertEqual(self.breaker.before_probe('key', self.settings), PROBE)
+        self.assertFalse(self.breaker.is_open('key', self.settings))
+
+    def test_failed_precheck_skips_the_full_probe(self):
+        website = create_website()
+        service = services.MonitoringService()
+        service.settings = self.settings
+        group = plan_cycle([website])[0]
+        self.addCleanup(services.circuit_breaker.reset)
+        with mock.patch.object(services.circuit_breaker, 'before_probe', return_value=PRECHECK), \
+                mock.patch.object(services, 'tcp_probe', return_value=ProbeResult(error_message='refused')), \
+                mock.patch.object(service, 'probe_target') as probe:
+            checks = service.check_group(group)
+        probe.assert_not_called()
+        self.assertEqual(checks[0].error_message, 'Circuit open, TCP pre-check failed: refused')
+
+        with mock.patch.object(services.circuit_breaker, 'before_probe', return_value=SKIP):
+            self.assertEqual(service.check_group(group), [])
+
+
+class CadenceTests(TestCase):
+
+    def setUp(self):
+        self.website = create_website(check_interval=60)
+        self.settings = MonitoringSettings(
+            adaptive_cadence=True, confirm_interval=10, max_check_interval=120, flap_threshold=3, flap_window_minutes=60
+        )
+
+    def test_state_changes_are_confirmed_quickly_then_stable_targets_slow_down(self):
+        scheduler = ProbeScheduler()
+        group = plan_cycle([self.website])[0]
+        states = [True, True, False, False, True] + [True] * 7
+        intervals = [scheduler.record(group, is_online, self.settings, now=0).interval for is_online in states]
+        self.assertEqual(intervals, [60, 60, 10, 60, 10, 60, 60, 60, 90, 90, 90, 120])
+
+        self.assertEqual(scheduler.due([group], now=119), [])
+        self.assertEqual(scheduler.due([group], now=120), [group])
+        # Not probed (e.g. breaker backoff): back to the configured interval
+        self.assertEqual(scheduler.record(group, None, self.settings, now=0).interval, 60)
+
+    def test_flapping_target_does_not_alert(self):
+        service = services.MonitoringService()
+        service.settings = self.settings
+        add_checks(self.website, [True, False, True, False, False])
+        service.handle_website_alerts(self.website, self.website.checks.latest('check_time'))
+        self.assertFalse(AlertLog.objects.exists())
+
+        MonitoringCheck.objects.all().delete()
+        add_checks(self.website, [True, True, True, False, False])
+        service.handle_website_alerts(self.website, self.website.checks.latest('check_time'))
+        self.assertEqual(AlertLog.objects.get().alert_type, 'down')
+
+
+class HedgingTests(TestCase):
+
+    def probe(self, results, **kwargs):
+        with mock.patch('monitoring.hedging.run_probe', side_effect=results) as run_probe:
+            result = probe_with_hedging(object(), **kwargs)
+        return result, [a['kind'] for a in result.attempts], run_probe.call_count
+
+    def test_connection_error_is_retried_at_once(self):
+        result, kinds, calls = self.probe([ProbeResult(connection_error=True), ProbeResult(is_online=True)], retries=1)
+        self.assertTrue(result.is_online)
+        self.assertEqual(kinds, ['primary', 'retry'])
+
+    def test_timeout_is_not_retried(self):
+        result, kinds, calls = self.probe([ProbeResult(timed_out=True)], retries=2)
+        self.assertFalse(result.is_online)
+        self.assertEqual(calls, 1)
+
+    def test_slow_attempt_is_hedged(self):
+        released = threading.Event()
+        self.addCleanup(released.set)
+        calls = []
+
+        def slow_then_fast(target, timeout=None):
+            calls.append(target)
+            if len(calls) == 1:
+                # The primary hangs past the hedge delay; the hedge answers straight away
+                released.wait(5)
+                return ProbeResult(timed_out=True)
+            return ProbeResult(is_online=True)
+
+        started = time.monotonic()
+        result, kinds, calls = self.probe(slow_then_fast, hedge_after=0.05)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertTrue(result.is_online)
+        self.assertEqual(kinds, ['hedge', 'abandoned'])
+
+    def test_hedge_delay_is_the_p95_below_the_timeout(self):
+        service = services.MonitoringService()
+        history = [{'is_online': True, 'response_time': t} for t in [0.1] * 19 + [2.0]]
+        self.assertEqual(service.get_hedge_delay(Website(timeout=30), history), 2.0)
+        self.assertIsNone(service.get_hedge_delay(Website(timeout=1), history))
+
+
+def peercert(serial='01', days=10):
+    not_after = timezone.now() + timedelta(days=days)
+    return {
+        'subject': ((('commonName', 'site.example.com'),),),
+        'issuer': ((('organizationName', 'Example CA'),),),
+        'serialNumber': serial,
+        'notAfter': not_after.strftime('%b %d %H:%M:%S %Y GMT'),
+        'subjectAltName': (('DNS', 'site.example.com'), ('DNS', 'www.example.com')),
+    }
+
+
+class CertificateTests(TestCase):
+
+    def test_cache_parses_once_per_certificate(self):
+        cache = CertificateCache(ttl=60)
+        cache.store('Site.example.com', 443, peercert())
+        cache.store('www.example.com', 443, peercert())
+        info = cache.get('site.example.com', 443)
+        self.assertEqual((info.subject, info.issuer, info.serial), ('site.example.com', 'Example CA', '01'))
+        self.assertEqual(info.sans, ['site.example.com', 'www.example.com'])
+        self.assertIs(cache.get('www.example.com', 443), info)
+
+        sock = mock.Mock()
+        cache.capture('site.example.com', 443, sock)
+        sock.getpeercert.assert_not_called()
+        self.assertIsNone(cache.get('other.example.com', 443))
+
+    def test_alert_once_per_threshold_until_renewed(self):
+        website = create_website()
+        service = services.MonitoringService()
+        service.settings = MonitoringSettings(cert_expiry_thresholds='30,7')
+
+        def alert(certificate):
+            service.handle_certificate_alerts(website, website, certificate)
+            return AlertLog.objects.filter(alert_type='cert_expiry').count()
+
+        self.assertEqual(alert(CertificateInfo.from_peercert(peercert(days=60))), 0)
+        self.assertEqual(alert(CertificateInfo.from_peercert(peercert(days=20))), 1)
+        self.assertEqual(alert(CertificateInfo.from_peercert(peercert(days=20))), 1)
+        # Two weeks later the 7-day threshold is crossed
+        AlertLog.objects.update(sent_at=timezone.now() - timedelta(days=14))
+        self.assertEqual(alert(CertificateInfo.from_peercert(peercert(days=6))), 2)
+        # A renewed certificate that is still short-lived alerts again
+        self.assertEqual(alert(CertificateInfo.from_peercert(peercert(serial='02', days=6))), 3)
+
+
+class ConfigSnapshotTests(TestCase):
+
+    def setUp(self):
+        self.website = create_website()
+        MonitoringSettings.get_settings()
+        config.invalidate()
+        self.addCleanup(config.invalidate)
+
+    def test_snapshot_is_shared_until_the_refresh_interval(self):
+        snapshot = config.get_config()
+        self.assertEqual(snapshot.websites, (self.website,))
+        with self.assertNumQueries(0):
+            self.assertIs(config.get_config(), snapshot)
+        with self.assertRaises(AttributeError):
+            snapshot.websites = ()
+
+    def test_saves_here_invalidate_at_once(self):
+        snapshot = config.get_config()
+        other = create_website('Other')
+        self.assertEqual(set(config.get_config().websites), {self.website, other})
+        self.assertIsNot(config.get_config(), snapshot)
+
+    @override_settings(MONITORING_CONFIG_REFRESH=0)
+    def test_edits_elsewhere_are_seen_through_the_watermark(self):
+        snapshot = config.get_config()
+        with self.assertNumQueries(5):
+            self.assertIs(config.get_config(), snapshot)
+        # A queryset update sends no signals, as if another process had made it
+        Website.objects.filter(pk=self.website.pk).update(status='maintenance', updated_at=timezone.now())
+        self.assertEqual(config.get_config().websites, ())
+
+
+class SpoolTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.spool = CheckSpool(directory.name, retry=60)
+        self.addCleanup(self.spool.close)
+        self.website = create_website()
+
+    def check(self, **fields):
+        return MonitoringCheck(website=self.website, check_time=timezone.now(), spool_id=uuid.uuid4(), **fields)
+
+    def test_torn_tail_is_discarded(self):
+        first, second = encode(self.check(is_online=True)), encode(self.check(is_online=False))
+        records = decode(first + second[:-1])
+        self.assertEqual(len(records), 1)
+        self.assertTrue(records[0]['is_online'])
+
+    def test_failed_write_spools_and_bypasses_the_database(self):
+        check = self.check(is_online=True)
+        with mock.patch.object(MonitoringCheck, 'save', side_effect=DatabaseError('locked')) as save:
+            self.assertIsNone(self.spool.save(check).pk)
+            self.spool.save(self.check(is_online=False))
+        self.assertEqual(save.call_count, 1)
+        self.assertFalse(self.spool.database_available())
+        self.assertEqual(len(self.spool.pending()), 1)
+
+    def test_replay_inserts_each_check_once(self):
+        checks = [self.check(is_online=True), self.check(is_online=False)]
+        gone = create_website('Gone')
+        for check in checks + [MonitoringCheck(website=gone, check_time=timezone.now(), spool_id=uuid.uuid4())]:
+            self.spool.append(check)
+        gone.delete()
+
+        self.assertEqual(self.spool.replay(), 2)
+        self.assertEqual(self.spool.pending(), [])
+        # Replaying a spool whose checks were already stored adds nothing
+        self.spool.append(checks[0])
+        self.assertEqual(self.spool.replay(), 0)
+        self.assertEqual(
+            sorted(MonitoringCheck.objects.values_list('spool_id', flat=True)), sorted(c.spool_id for c in checks)
+        )
+
+
+def recent_result(minutes_ago, is_online=True):
+    return RecentResult(
+        datetime(2024, 1, 1, 12, 0, tzinfo=dt_timezone.utc) - timedelta(minutes=minutes_ago), is_online, 0.25, 200
+    )
+
+
+class RecentResultsTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/recent.ring'
+        self.ring = RecentResults(self.path, slots=4, capacity=3)
+        self.addCleanup(self.ring.close)
+        self.website = Website(pk=1)
+
+    def test_seeded_ring_keeps_the_latest_results(self):
+        history = [recent_result(2), recent_result(3, is_online=False)]
+        self.ring.publish(self.website, recent_result(1), history=lambda: history)
+        self.assertEqual(self.ring.recent(self.website), [recent_result(1)] + history)
+        self.ring.publish(self.website, recent_result(0, is_online=False))
+        self.assertEqual(self.ring.recent(self.website, 2), [recent_result(0, is_online=False), recent_result(1)])
+        # Another process mapping the same file reads the same rings
+        other = RecentResults(self.path, slots=4, capacity=3)
+        self.addCleanup(other.close)
+        self.assertEqual(other.recent(self.website), self.ring.recent(self.website))
+        self.assertIsNone(self.ring.recent(InternalApp(pk=1)))
+
+    def test_unseeded_slot_is_trusted_once_full(self):
+        self.ring.publish(self.website, recent_result(2), history=lambda: None)
+        self.ring.publish(self.website, recent_result(1))
+        self.assertIsNone(self.ring.recent(self.website))
+        self.ring.publish(self.website, recent_result(0))
+        self.assertEqual(len(self.ring.recent(self.website)), 3)
+        self.ring.discard(self.website)
+        self.assertIsNone(self.ring.recent(self.website))
+
+    def test_reader_never_returns_a_slot_being_written(self):
+        self.ring.publish(self.website, recent_result(0), history=lambda: [])
+        index = self.ring._find(WEBSITE, self.website.pk)
+        offset = self.ring._offset(index)
+        seq, *rest = SLOT_HEADER.unpack_from(self.ring._mm, offset)
+        SLOT_HEADER.pack_into(self.ring._mm, offset, seq + 1, *rest)
+        self.assertIsNone(self.ring.recent(self.website))
+        SLOT_HEADER.pack_into(self.ring._mm, offset, seq + 2, *rest)
+        self.assertEqual(self.ring.recent(self.website), [recent_result(0)])
+
+
+@skipIf(anomaly.np is None, "NumPy is not installed")
+class AnomalyTests(TestCase):
+
+    def test_detect_flags_only_large_jumps_over_a_judged_baseline(self):
+        np = anomaly.np
+        baseline = [0.10, 0.11, 0.09, 0.10, 0.12, 0.10, 0.11, 0.09, 0.10, 0.10]
+        nan = np.nan
+        latencies = np.array([
+            [0.5, 0.6, 0.5] + baseline,      # degraded
+            [0.1, 0.11, 0.1] + baseline,     # steady
+            [0.13, 0.14, 0.13] + baseline,   # many MADs out, but not twice as slow
+            [nan, 0.6, 0.5] + baseline,      # newest check failed: not judged
+            [0.5, 0.6, 0.5] + baseline[:7] + [nan] * 3,  # too little baseline
+        ], dtype=np.float32)
+        degraded, judged = anomaly.detect(latencies, threshold=4.0, ratio=2.0)
+        self.assertEqual(degraded.tolist(), [True, False, False, False, False])
+        self.assertEqual(judged.tolist(), [True, True, True, False, False])
+
+    def test_ring_matrix_matches_the_ring_reads(self):
+        np = anomaly.np
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        ring = RecentResults(f'{directory.name}/recent.ring', slots=4, capacity=5)
+        self.addCleanup(ring.close)
+        website = Website(pk=7)
+        ring.publish(website, recent_result(10), history=lambda: [])
+        for minute in range(9, 2, -1):
+            ring.publish(website, recent_result(minute, is_online=minute != 5)._replace(response_time=minute / 10))
+
+        kinds, ids, latencies = anomaly.latency_matrix_from_rings(ring)
+        self.assertEqual(ids.tolist(), [7])
+        expected = [r.response_time if r.is_online else np.nan for r in ring.recent(website)]
+        np.testing.assert_allclose(latencies[0], expected, rtol=1e-6)
+
+    def test_degraded_target_is_flagged_alerted_and_recovers(self):
+        website = create_website()
+        self.addCleanup(statuspage._dirty.clear)
+        monitoring_settings = MonitoringSettings(latency_anomaly_alerts=True)
+        add_checks(website, [True] * 20, response_time=0.1)
+        latest = website.checks.order_by('-check_time').values_list('pk', flat=True)[:3]
+        MonitoringCheck.objects.filter(pk__in=list(latest)).update(response_time=1.0)
+
+        with mock.patch.object(anomaly, 'get_recent_results', return_value=None), \
+                mock.patch.object(services, 'recent_results', return_value=None):
+            run = anomaly.LatencyAnomalyDetector(monitoring_settings).run([website])
+            self.assertEqual(run.degraded, [website])
+            website.refresh_from_db()
+            self.assertTrue(website.is_degraded)
+            self.assertEqual(AlertLog.objects.get().alert_type, 'degraded')
+
+            MonitoringCheck.objects.filter(pk__in=list(latest)).update(response_time=0.1)
+            run = anomaly.LatencyAnomalyDetector(monitoring_settings).run([website])
+        self.assertEqual(run.recovered, [website.pk])
+        website.refresh_from_db()
+        self.assertFalse(website.is_degraded)
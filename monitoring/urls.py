@@ -25,6 +25,11 @@ urlpatterns = [
     
     # API endpoints
     path('api/status/', views.api_status, name='api_status'),
+    path('api/export/<str:kind>/', views.export_data, name='export_data'),
+    path('api/check/<str:job_id>/', views.manual_check_status, name='manual_check_status'),
+    path('api/targets/', views.api_targets, name='api_targets'),
+    path('api/targets/delete/', views.api_targets_delete, name='api_targets_delete'),
+    path('api/sla/', views.api_sla, name='api_sla'),
     
     # Alert management
     path('alert/<int:alert_id>/clear/', views.clear_alert, name='clear_alert'),
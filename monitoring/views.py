@@ -2,17 +2,24 @@
 Views for the monitoring application.
 """
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, Http404
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from django.core.paginator import Paginator
-from django.db.models import Q
 from .models import Website, InternalApp, MonitoringCheck, AlertLog
 from .services import MonitoringStats
+from .search import search_alerts
+from .pagination import KeysetPage, decode_cursor
+from .exports import EXPORTS, CONTENT_TYPES, iter_export
 from .forms import WebsiteForm, InternalAppForm
+from .daemon import read_loop_stats
+from .sla import REPORT_FORMATS as SLA_FORMATS, build_report, month_range, report_csv
+from .bulk import TARGET_FORMATS, CONTENT_TYPES as TARGET_CONTENT_TYPES, TargetImportError, import_targets, export_targets, delete_targets
 import json
+from datetime import date
 from django.core.mail import send_mail
 from django.conf import settings
 
@@ -185,20 +192,17 @@ def manual_check(request, website_id):
     website = get_object_or_404(Website, id=website_id)
     
     try:
-        from .services import MonitoringService
-        monitoring_service = MonitoringService()
+        from .jobs import submit_manual_check
         
-        # Manually check this specific website
-        monitoring_service.check_website(website)
-        
-        # Also manually check its active internal apps
-        for app in website.internal_apps.filter(is_active=True):
-            monitoring_service.check_internal_app(app)
+        # Probe the website and its internal apps in the background; the page polls for progress
+        job_id = submit_manual_check(website)
         
         return JsonResponse({
             'success': True,
-            'message': f'Manual check triggered for {website.name}'
-        })
+            'message': f'Manual check triggered for {website.name}',
+            'job_id': job_id,
+            'status_url': reverse('monitoring:manual_check_status', args=[job_id]),
+        }, status=202)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -206,6 +210,15 @@ def manual_check(request, website_id):
         })
 
 
+def manual_check_status(request, job_id):
+    from .jobs import get_job
+    
+    job = get_job(job_id)
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'Unknown or expired job'}, status=404)
+    return JsonResponse({'success': True, **job})
+
+
 def api_status(request):
     global_stats = MonitoringStats.get_global_stats()
     
@@ -228,6 +241,7 @@ def api_status(request):
         {
             'global_stats': global_stats,
             'websites': website_data,
+            'monitor_loop': read_loop_stats(),
             'timestamp': timezone.now().isoformat(),
             'back_to_dashboard': request.build_absolute_uri('/')
         },
@@ -235,13 +249,41 @@ def api_status(request):
     )
 
 
-def alerts_page(request):
-    alerts = AlertLog.objects.all().order_by('-sent_at')
+def api_sla(request):
+    """SLA report: ?month=YYYY-MM (default: current month) or ?start=&end= dates, optional &website=<id>."""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Staff login required'}, status=403)
     
-    # Pagination
-    paginator = Paginator(alerts, 50)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    export_format = request.GET.get('format', 'json')
+    if export_format not in SLA_FORMATS:
+        return JsonResponse({'success': False, 'message': f'Unsupported format: {export_format}'}, status=400)
+    
+    try:
+        if request.GET.get('start') or request.GET.get('end'):
+            start = date.fromisoformat(request.GET.get('start', ''))
+            end = date.fromisoformat(request.GET.get('end', ''))
+        else:
+            start, end = month_range(request.GET.get('month') or timezone.now().strftime('%Y-%m'))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    if start > end:
+        return JsonResponse({'success': False, 'message': 'start must not be after end'}, status=400)
+    
+    websites = None
+    website_ids = [w for w in request.GET.getlist('website') if w.isdigit()]
+    if website_ids:
+        websites = Website.objects.filter(id__in=website_ids)
+    
+    report = build_report(start, end, websites)
+    if export_format == 'csv':
+        response = HttpResponse(report_csv(report), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="sla-{start}-{end}.csv"'
+        return response
+    return JsonResponse({'success': True, **report}, json_dumps_params={'indent': 4})
+
+
+def alerts_page(request):
+    alerts = AlertLog.objects.select_related('website')
     
     # Filtering
     search_query = request.GET.get('search', '')
@@ -251,15 +293,14 @@ def alerts_page(request):
         alerts = alerts.filter(is_cleared=False)
         
     if search_query:
-        alerts = alerts.filter(
-            Q(website__name__icontains=search_query) |
-            Q(subject__icontains=search_query) |
-            Q(message__icontains=search_query)
-        )
+        alerts = search_alerts(alerts, search_query)
     
-    # Re-fetch page_obj after filtering
-    paginator = Paginator(alerts, 50)
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination on (sent_at, id) so deep pages cost the same as the first
+    page_obj = KeysetPage(
+        alerts, 'sent_at', 50,
+        before=decode_cursor(request.GET.get('before')),
+        after=decode_cursor(request.GET.get('after')),
+    )
     
     context = {
         'page_obj': page_obj,
@@ -270,6 +311,86 @@ def alerts_page(request):
     return render(request, 'monitoring/alerts_page.html', context)
 
 
+def export_data(request, kind):
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Staff login required'}, status=403)
+    if kind not in EXPORTS:
+        raise Http404("Unknown export")
+    
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in CONTENT_TYPES:
+        return JsonResponse({'success': False, 'message': f'Unsupported format: {export_format}'}, status=400)
+    
+    # Validate up front: errors inside the streaming generator would cut the download off mid-way
+    website_id = request.GET.get('website') or None
+    if website_id is not None and not website_id.isdigit():
+        return JsonResponse({'success': False, 'message': f'Invalid website id: {website_id}'}, status=400)
+    filters = {'website_id': website_id}
+    for name in ['since', 'until']:
+        value = request.GET.get(name)
+        try:
+            filters[name] = parse_datetime(value) if value else None
+        except ValueError:
+            filters[name] = None
+        if value and filters[name] is None:
+            return JsonResponse({'success': False, 'message': f'Invalid datetime for {name}: {value}'}, status=400)
+    
+    response = StreamingHttpResponse(
+        iter_export(kind, export_format, **filters),
+        content_type=CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{export_format}"'
+    return response
+
+
+@require_http_methods(["GET", "POST"])
+def api_targets(request):
+    """GET exports every target; POST imports the request body (upsert by URL). POSTs need the CSRF token."""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Staff login required'}, status=403)
+    
+    fmt = request.GET.get('format', 'json')
+    if fmt not in TARGET_FORMATS:
+        return JsonResponse({'success': False, 'message': f'Unsupported format: {fmt}'}, status=400)
+    
+    try:
+        if request.method == 'GET':
+            response = HttpResponse(export_targets(fmt), content_type=TARGET_CONTENT_TYPES[fmt])
+            response['Content-Disposition'] = f'attachment; filename="targets.{fmt}"'
+            return response
+        
+        result = import_targets(
+            request.body.decode('utf-8-sig'),
+            fmt,
+            dry_run=request.GET.get('dry_run') == 'true',
+        )
+    except (TargetImportError, UnicodeDecodeError) as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    
+    return JsonResponse({'success': result.ok, 'message': str(result), **result.as_dict()})
+
+
+@require_http_methods(["POST"])
+def api_targets_delete(request):
+    """Delete websites by URL: body {"urls": [...]}. Needs the CSRF token."""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Staff login required'}, status=403)
+    
+    try:
+        urls = json.loads(request.body)['urls']
+    except (ValueError, KeyError, TypeError):
+        urls = None
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        return JsonResponse({'success': False, 'message': 'Expected {"urls": [...]} with a list of URL strings'}, status=400)
+    
+    deleted = delete_targets(urls)
+    return JsonResponse({
+        'success': True,
+        'message': f'Deleted {len(deleted)} websites',
+        'deleted': [w.url for w in deleted],
+    })
+
+
 @require_http_methods(["POST"])
 def clear_alert(request, alert_id):
     alert = get_object_or_404(AlertLog, id=alert_id)
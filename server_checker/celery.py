@@ -23,6 +23,10 @@ app.conf.beat_schedule = {
         'task': 'monitoring.tasks.run_monitoring_checks',
         'schedule': 300.0,  # Run every 5 minutes
     },
+    'run-retention': {
+        'task': 'monitoring.tasks.run_retention',
+        'schedule': 3600.0,  # Run every hour
+    },
 }
 
 # Timezone
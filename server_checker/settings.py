@@ -138,5 +138,22 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 # Monitoring settings
 MONITORING_INTERVAL = config('MONITORING_INTERVAL', default=300, cast=int)  # 5 minutes in seconds
-
-
+MONITORING_RETENTION_INTERVAL = config('MONITORING_RETENTION_INTERVAL', default=3600, cast=int)  # Seconds between retention runs
+MONITORING_RETENTION_BATCH_SIZE = config('MONITORING_RETENTION_BATCH_SIZE', default=500, cast=int)  # Rows per range delete
+MONITORING_VACUUM_INTERVAL = config('MONITORING_VACUUM_INTERVAL', default=86400, cast=int)  # Seconds between incremental VACUUM runs
+MONITORING_ANALYZE_INTERVAL = config('MONITORING_ANALYZE_INTERVAL', default=21600, cast=int)  # Seconds between ANALYZE runs
+MONITORING_DNS_CACHE_TTL = config('MONITORING_DNS_CACHE_TTL', default=300, cast=int)  # Max seconds to cache a DNS answer
+MONITORING_DNS_CACHE_SIZE = config('MONITORING_DNS_CACHE_SIZE', default=1024, cast=int)  # Max cached hostnames
+MONITORING_DNS_STALE_TTL = config('MONITORING_DNS_STALE_TTL', default=0, cast=int)  # Serve expired answers this long while refreshing (0 = off)
+MONITORING_DNS_PREFETCH = config('MONITORING_DNS_PREFETCH', default=True, cast=bool)  # Resolve all target hosts at cycle start
+MONITORING_HTTP2 = config('MONITORING_HTTP2', default=False, cast=bool)  # Multiplex probes per HTTPS origin over HTTP/2 (needs httpx[http2])
+MONITORING_CERT_CACHE_TTL = config('MONITORING_CERT_CACHE_TTL', default=3600, cast=int)  # Seconds before a host's certificate is re-read from a handshake
+MONITORING_CONFIG_REFRESH = config('MONITORING_CONFIG_REFRESH', default=10, cast=int)  # Seconds between checks for settings/target edits made in other processes
+MONITORING_SPOOL_DIR = config('MONITORING_SPOOL_DIR', default=str(BASE_DIR / 'spool'))  # Local spool for check results while the database is unavailable
+MONITORING_SPOOL_RETRY = config('MONITORING_SPOOL_RETRY', default=30, cast=int)  # Seconds to spool before trying the database again
+MONITORING_SPOOL_SLOW_WRITE = config('MONITORING_SPOOL_SLOW_WRITE', default=2.0, cast=float)  # Spool instead when a check insert takes longer than this
+MONITORING_DRAIN_TIMEOUT = config('MONITORING_DRAIN_TIMEOUT', default=20, cast=int)  # Seconds in-flight checks get to finish after SIGTERM
+MONITORING_LOOP_STATS_FILE = config('MONITORING_LOOP_STATS_FILE', default=str(BASE_DIR / 'monitor_loop.json'))  # Lag/overrun metrics written by background_monitor.py
+MONITORING_RECENT_RESULTS_FILE = config('MONITORING_RECENT_RESULTS_FILE', default=str(BASE_DIR / 'recent_results.ring'))  # Shared-memory rings of recent results per target ('' = read from the database)
+MONITORING_RECENT_RESULTS_SLOTS = config('MONITORING_RECENT_RESULTS_SLOTS', default=4096, cast=int)  # Max targets in the shared rings
+MONITORING_STATUS_PAGE_DIR = config('MONITORING_STATUS_PAGE_DIR', default=str(BASE_DIR / 'public_status'))  # Static public status page output ('' = don't generate)